@@ -0,0 +1,490 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module runs every audit from Audit_Simple.py, StreetTypeAudit.py and TagCounting.py in a single pass through
+the OSM file. Each kind of check is written as a "visitor" that the engine calls as it walks through the file:
+
+    wants_key(k): returns True if the visitor's visit_tag should be called for child tags with key k. The engine
+                    only asks this once per distinct key, so dispatching a tag to the visitors interested in it
+                    is a single dict lookup.
+    start_element(elem_type, attrib): called once for each node/way, before any of its child tags are visited.
+    visit_tag(elem_type, attrib, k, v): called for each child tag of a node/way whose key the visitor wants.
+    visit_any(tag, count): only called for visitors with counts_all = True; called for every XML element type with
+                    the number of elements of that type just seen (e.g. ('tag', 3) for a node with 3 child tags).
+    report(): pretty-prints the results, using the same headings as Audit_Simple.audit
+
+Each visitor's results are available as its results attribute once the engine is done.
+'''
+from array import array
+import pprint
+import re
+from collections import defaultdict
+
+import OSMParser as parser
+import StreetTypeAudit as street_audit
+
+
+class AuditVisitor(object):
+    '''
+    Base class for all audit visitors, which by default do nothing. Subclasses override the hooks they need.
+    '''
+    #the option name used to ask for this audit, e.g. in Audit_Simple.audit
+    name = None
+    counts_all = False
+
+    def wants_key(self, k):
+        return False
+
+    def start_element(self, elem_type, attrib):
+        pass
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        pass
+
+    def visit_any(self, tag, count=1):
+        pass
+
+    def report(self):
+        pprint.pprint(self.results)
+
+
+
+class TagCountVisitor(AuditVisitor):
+    '''
+    Counts how many XML elements of each type (node, way, tag, nd, etc.) are in the file. Same as
+    Audit_Simple.count_tags and TagCounting.count_tags.
+    '''
+    name = 'counting'
+    counts_all = True
+
+    def __init__(self):
+        self.results = defaultdict(int)
+
+    def visit_any(self, tag, count=1):
+        self.results[tag] += count
+
+    def report(self):
+        print("Tags Found")
+        pprint.pprint(dict(self.results))
+
+
+
+class ZipVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.zipCheck. results is a tuple of the form (zip length dict, known zips, known zip tag keys).
+    '''
+    name = 'zips'
+    zip_re = re.compile('postcode|zip', re.IGNORECASE)  # @UndefinedVariable
+
+    def __init__(self, digits=5, tags_to_ignore=()):
+        self.zip_tags_ignored = tags_to_ignore
+        self.results = ({digits: 0, "Non-number": 0}, set(), set())
+
+    def wants_key(self, k):
+        return self.zip_re.search(k) is not None and k not in self.zip_tags_ignored
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        zip_length_dict, knownZips, known_zip_tags = self.results
+
+        tempZip = v.strip()
+        knownZips.add(tempZip + " - {}".format(elem_type))
+        known_zip_tags.add(k)
+
+        if tempZip.isdigit():
+            zip_length_dict[len(tempZip)] = zip_length_dict.get(len(tempZip), 0) + 1
+        else:
+            zip_length_dict["Non-number"] += 1
+
+    def report(self):
+        zip_length_dict, knownZips, known_zip_tags = self.results
+        print("\nZip Lengths")
+        pprint.pprint(zip_length_dict)
+        print("\nUnique Zip Codes")
+        pprint.pprint(knownZips)
+        print("\nZip Code Tag Keys Found")
+        pprint.pprint(known_zip_tags)
+
+
+
+class CountyStateCountVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.countyStateTypeCounter. results is a tuple of the form (county tag counts, state tag counts).
+    '''
+    name = 'county/state counting'
+    county_re = re.compile('county', re.IGNORECASE)  # @UndefinedVariable
+    state_re = re.compile('state', re.IGNORECASE)  # @UndefinedVariable
+    state_re_2 = re.compile('ST')
+
+    def __init__(self, tags_to_ignore=('state_capital', 'source:hgv:state_network', 'hgv:state_network')):
+        self.tags_to_ignore = tags_to_ignore
+        self.results = ({}, {})
+
+    def wants_key(self, k):
+        return k not in self.tags_to_ignore and (self.county_re.search(k) is not None or
+                                                 self.state_re.search(k) is not None or
+                                                 self.state_re_2.search(k) is not None)
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        county_types, state_types = self.results
+
+        if self.county_re.search(k) is not None:
+            county_types[k] = county_types.get(k, 0) + 1
+        else:
+            state_types[k] = state_types.get(k, 0) + 1
+
+    def report(self):
+        county_types, state_types = self.results
+        print("\nTypes of County Tags")
+        pprint.pprint(county_types)
+        print("\nTypes of State Tags")
+        pprint.pprint(state_types)
+
+
+
+class CountyStateReportVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.countyStateReporter. results is a tuple of the form (counties found, states found).
+    '''
+    name = 'county/state reporting'
+
+    def __init__(self, county_keys=('gnis:County', 'gnis:County_num', 'gnis:county_id', 'gnis:county_name',
+                                    'is_in:county', 'tiger:county'),
+                 state_keys=('addr:state', 'gnis:ST_alpha', 'gnis:state_id', 'nist:state_fips', 'ST_num')):
+        self.county_keys = frozenset(county_keys)
+        self.state_keys = frozenset(state_keys)
+        self.results = (set(), set())
+
+    def wants_key(self, k):
+        return k in self.state_keys or k in self.county_keys
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        counties, states = self.results
+
+        if k in self.state_keys:
+            states.add(v)
+        else:
+            counties.add(v)
+
+    def report(self):
+        counties, states = self.results
+        print("\nStates Identified")
+        pprint.pprint(states)
+        print("\nCounties Identified")
+        pprint.pprint(counties)
+
+
+
+def lat_long_bounds(ids, lats, lons, targetLatRange=(37.15, 39.05), targetLongRange=(-82.67, -80.20)):
+    '''
+    Vectorized version of Audit_Simple.lat_long_checker for nodes held in columns (e.g. a NodeStore's ids and coords,
+    or the columns of the nodes table). Returns a dict of NumPy arrays with one entry per node lying outside the target
+    ranges: 'id', 'lat', 'lon', and the booleans 'bad_lat' and 'bad_lon'.
+    
+    ids: array-like of int. Node IDs.
+    lats, lons: array-like of float. Latitude and longitude of each node in ids.
+    targetLatRange: tuple of 2 floats; the lowest and highest latitude allowed.
+    targetLongRange: tuple of 2 floats; the lowest and highest longitude allowed.
+    '''
+    import numpy as np
+    
+    ids = np.asarray(ids, dtype=np.int64)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    
+    bad_lat = (lats < targetLatRange[0]) | (lats > targetLatRange[1])
+    bad_lon = (lons < targetLongRange[0]) | (lons > targetLongRange[1])
+    bad = bad_lat | bad_lon
+    
+    return {'id': ids[bad], 'lat': lats[bad], 'lon': lons[bad], 'bad_lat': bad_lat[bad], 'bad_lon': bad_lon[bad]}
+
+
+
+class LatLongVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.lat_long_checker. results is a dict of node IDs mapped to lists of "Bad lat"/"Bad lon".
+    
+    Rather than checking each node as it's visited, node IDs and coordinates are gathered into typed arrays and
+    checked chunk_size nodes at a time with lat_long_bounds. The offending nodes are also available as arrays
+    (bad_nodes) or as a pandas DataFrame (to_frame()).
+    '''
+    name = 'lat/long'
+    chunk_size = 65536
+
+    def __init__(self, targetLatRange=(37.15, 39.05), targetLongRange=(-82.67, -80.20)):
+        self.targetLatRange = targetLatRange
+        self.targetLongRange = targetLongRange
+        
+        self.ids = array('q')
+        self.lats = array('d')
+        self.lons = array('d')
+        self.bad_chunks = []
+
+    def start_element(self, elem_type, attrib):
+        if elem_type == 'node':
+            self.ids.append(int(attrib['id']))
+            self.lats.append(float(attrib['lat']))
+            self.lons.append(float(attrib['lon']))
+            
+            if len(self.ids) >= self.chunk_size:
+                self.check_chunk()
+
+    def check_chunk(self):
+        '''
+        Checks every node gathered since the last chunk and starts a new chunk.
+        '''
+        if self.ids:
+            self.bad_chunks.append(lat_long_bounds(self.ids, self.lats, self.lons,
+                                                   self.targetLatRange, self.targetLongRange))
+            self.ids = array('q')
+            self.lats = array('d')
+            self.lons = array('d')
+
+    @property
+    def bad_nodes(self):
+        '''
+        dict of NumPy arrays describing every node outside the target ranges (see lat_long_bounds).
+        '''
+        import numpy as np
+        
+        self.check_chunk()
+        
+        if not self.bad_chunks:
+            return lat_long_bounds([], [], [])
+        
+        self.bad_chunks = [{column: np.concatenate([chunk[column] for chunk in self.bad_chunks])
+                            for column in self.bad_chunks[0]}]
+        return self.bad_chunks[0]
+
+    @property
+    def results(self):
+        bad_nodes = self.bad_nodes
+        results = defaultdict(list)
+        
+        for node_id, bad_lat, bad_lon in zip(bad_nodes['id'].tolist(), bad_nodes['bad_lat'].tolist(),
+                                             bad_nodes['bad_lon'].tolist()):
+            if bad_lat:
+                results[str(node_id)].append("Bad lat")
+            if bad_lon:
+                results[str(node_id)].append("Bad lon")
+        
+        return results
+
+    def to_frame(self):
+        import pandas as pd
+        
+        return pd.DataFrame(self.bad_nodes, columns=['id', 'lat', 'lon', 'bad_lat', 'bad_lon'])
+
+    def report(self):
+        print("\nNodes with Incorrect Latitudes and/or Longitudes")
+        pprint.pprint(self.results)
+
+
+
+class AmenityVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.amenityFinder. results is a dict of sets of the values seen for each amenity-type key.
+    '''
+    name = 'amenities'
+
+    def __init__(self, allowed_tag_keys=('amenity', 'shop', 'healthcare')):
+        self.allowed_tag_keys = frozenset(allowed_tag_keys)
+        self.results = defaultdict(set)
+
+    def wants_key(self, k):
+        return k in self.allowed_tag_keys
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        self.results[k].add(v)
+
+    def report(self):
+        print("\nUnique Amenity and Shop Types Identified")
+        pprint.pprint(self.results)
+
+
+
+class PropertyTypeVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.propertyType. results is a dict of sets of the landuse and building values seen.
+    '''
+    name = 'property types'
+
+    def __init__(self):
+        self.results = defaultdict(set)
+
+    def wants_key(self, k):
+        return k == 'landuse' or k == 'building'
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        self.results[k].add(v)
+
+    def report(self):
+        print("\nUnique Landuse Types")
+        pprint.pprint(self.results)
+
+
+
+#Landuse/building values counted by PropertyCountVisitor
+ALLOWED_PROPERTY_TYPES = {'landuse': ['residential', 'village_green', 'recreation_ground', 'allotments',
+                                      'commercial', 'depot', 'industrial', 'landfill', 'orchard', 'plant_nursery',
+                                      'port', 'quarry', 'retail'],
+                          'building': ['apartments', 'farm', 'house', 'detached', 'residential', 'dormitory',
+                                       'houseboat', 'bungalow', 'static_caravan', 'cabin', 'hotel', 'commercial',
+                                       'industrial', 'retail', 'warehouse', 'kiosk', 'hospital', 'stadium']
+                          }
+
+class PropertyCountVisitor(AuditVisitor):
+    '''
+    Same as Audit_Simple.propertyCounter. results is a dict counting each "landuse:value"/"building:value" seen.
+    '''
+    name = 'property type counts'
+
+    def __init__(self, allowed_property_types=ALLOWED_PROPERTY_TYPES):
+        self.allowed_property_types = {k: frozenset(values) for k, values in allowed_property_types.items()}
+        self.results = defaultdict(int)
+
+    def wants_key(self, k):
+        return k in self.allowed_property_types
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        if v in self.allowed_property_types[k]:
+            self.results[k + ":" + v] += 1
+
+    def report(self):
+        print("\nCounts of Relevant Landuse Types")
+        pprint.pprint(self.results)
+
+
+
+class StreetTypeVisitor(AuditVisitor):
+    '''
+    Same as StreetTypeAudit.audit. results is a dict of sets, mapping each non-ideal street type to the street names
+    using it. Street types not yet in StreetTypeAudit.mapping are added to StreetTypeAudit.to_be_mapped.
+    '''
+    name = 'street types'
+
+    def __init__(self):
+        self.results = defaultdict(set)
+
+    def wants_key(self, k):
+        return k == 'addr:street'
+
+    def visit_tag(self, elem_type, attrib, k, v):
+        street_audit.audit_street_type(self.results, v)
+
+    def report(self):
+        print("\nNon-ideal Street Types")
+        pprint.pprint(dict(self.results))
+        print("\nNeed to map these:")
+        pprint.pprint(street_audit.to_be_mapped)
+
+
+
+#All of the available visitors, in the order their reports are printed
+VISITORS = [TagCountVisitor,
+            ZipVisitor,
+            CountyStateCountVisitor,
+            CountyStateReportVisitor,
+            LatLongVisitor,
+            AmenityVisitor,
+            PropertyTypeVisitor,
+            PropertyCountVisitor,
+            StreetTypeVisitor]
+
+
+def build_visitors(options):
+    '''
+    Returns a list with a (default-configured) visitor for each audit named in options, in the same order as VISITORS.
+
+    options: list of str. Names of the audits to run (see the name attribute of each class in VISITORS).
+    '''
+    return [visitor() for visitor in VISITORS if visitor.name in options]
+
+
+
+class AuditEngine(object):
+    '''
+    Walks through an OSM file a single time, handing each node/way and its child tags to every registered visitor
+    that is interested in them. Parent tags are cleared once visited, so memory use stays flat.
+    '''
+
+    def __init__(self, visitors=None):
+        '''
+        visitors: list of AuditVisitor objects.
+        '''
+        self.visitors = []
+        self.dispatch = {}
+
+        for visitor in visitors or []:
+            self.register(visitor)
+
+
+    def register(self, visitor):
+        '''
+        Adds visitor to those run by the engine.
+
+        visitor: AuditVisitor object.
+        '''
+        self.visitors.append(visitor)
+
+        #The set of visitors changed, so the key -> visitor dispatch table needs to be rebuilt
+        self.dispatch = {}
+
+
+    def handlers_for(self, k):
+        '''
+        Returns the list of visit_tag methods that should be called for a child tag with key k.
+
+        k: str. Tag key.
+        '''
+        handlers = self.dispatch.get(k)
+
+        if handlers is None:
+            handlers = [visitor.visit_tag for visitor in self.visitors if visitor.wants_key(k)]
+            self.dispatch[k] = handlers
+
+        return handlers
+
+
+    def run(self, osmfile, backend=None):
+        '''
+        Audits osmfile with every registered visitor and returns a dict mapping each visitor's name to its results.
+
+        osmfile: str. Filepath to the OSM file being audited
+        backend: str. Name of the XML parser backend to use (see OSMParser.BACKENDS), or None for the default.
+        '''
+        counters = [visitor for visitor in self.visitors if visitor.counts_all]
+        starters = [visitor for visitor in self.visitors
+                    if type(visitor).start_element is not AuditVisitor.start_element]
+
+        #Counting needs every element, the other audits only nodes and ways
+        types = None if counters else ('node', 'way')
+
+        for record in parser.iter_records(osmfile, types, backend):
+            for visitor in counters:
+                visitor.visit_any(record.type)
+                for child_type, children in [('tag', record.tags), ('nd', record.nds), ('member', record.members)]:
+                    if children:
+                        visitor.visit_any(child_type, len(children))
+
+            if record.type == 'node' or record.type == 'way':
+                elem_type = record.type
+                attrib = record.attrs
+
+                for visitor in starters:
+                    visitor.start_element(elem_type, attrib)
+
+                for k, v in record.tags:
+                    for handler in self.handlers_for(k):
+                        handler(elem_type, attrib, k, v)
+
+        return {visitor.name: visitor.results for visitor in self.visitors}
+
+
+    def report(self):
+        '''
+        Prints the results of every registered visitor.
+        '''
+        for visitor in self.visitors:
+            visitor.report()
@@ -10,18 +10,35 @@ audits will be contained within their own dedicated modules (which right now is
 
 
 
-import xml.etree.cElementTree as ET
-import pprint
 import re
 from collections import defaultdict
 
 #OSMFILE = "../data_sample_100_elemsWithTags_UTF-8Encoding.osm"
 OSMFILE = "../SW_WestVirginia.osm"
 
+#makes sure any tag key with the text 'zip' or 'postcode' is accounted for
+ZIP_RE = re.compile('postcode|zip',re.IGNORECASE)  # @UndefinedVariable
 
-def audit(osmfile, options=None):
+#Tag keys known (from auditing) to describe counties, states and amenities, respectively
+COUNTY_KEYS = frozenset(['gnis:County',
+                         'gnis:County_num',
+                         'gnis:county_id',
+                         'gnis:county_name',
+                         'is_in:county',
+                         'tiger:county'])
+STATE_KEYS = frozenset(['addr:state',
+                        'gnis:ST_alpha',
+                        'gnis:state_id',
+                        'nist:state_fips',
+                        'gnis:ST_num'])
+AMENITY_KEYS = frozenset(['amenity', 'shop', 'healthcare'])
+
+
+def audit(osmfile, options=None, backend=None):
     '''
-    Audits the OSM file using the different audit functions defined herein.
+    Audits the OSM file using the different audit functions defined herein, printing the results of each. All of 
+    the requested audits are run together in a single pass through the file (see AuditEngine.py). Returns a dict
+    mapping each option to the results of that audit.
     
     osm_file: str. Filepath to the OSM file being audited
     options: list of str. Dictates what types of audits are run. Allowed options values:
@@ -33,141 +50,21 @@ def audit(osmfile, options=None):
                         'amenities'
                         'property types'
                         'property type counts'
+                        'street types' (same as StreetTypeAudit.audit)
+    backend: str. Name of the XML parser backend to use (see OSMParser.BACKENDS), or None for the default.
     
     '''
+    #imported here as AuditEngine itself relies on this module's sibling audits
+    import AuditEngine as engine
     
-    with open(osmfile, "rb") as fileIn:
-        if options:
-            #Setting up the necessary beginning parameters for each function
-            if 'counting' in options:
-                tag_counts = {}
-            if 'zips' in options:
-                zipLength = 5
-                zipLengthDict = {zipLength:0, "Non-number": 0}
-                known_zips = set()
-                knownZipTags = set()
-                zip_tags_ignored = []
-            if 'county/state counting' in options:
-                county_tags = {}
-                state_tags = {}
-                state_tags_ignored = ['state_capital', 'source:hgv:state_network', 'hgv:state_network']
-            if 'county/state reporting' in options:
-                counties_found = set()
-                states_found = set()
-                countyKeys = ['gnis:County',
-                              'gnis:County_num',
-                              'gnis:county_id',
-                              'gnis:county_name',
-                              'is_in:county',
-                              'tiger:county']
-                stateKeys = ['addr:state',
-                             'gnis:ST_alpha',
-                             'gnis:state_id',
-                             'nist:state_fips',
-                             'ST_num']
-            if 'lat/long' in options:
-                badNodes = defaultdict(list) #ensures that each new key will automatically have an empty list value
-            if 'amenities' in options:
-                known_amenities=defaultdict(set)
-            if 'property types' in options:
-                propTypes = defaultdict(set)
-            if 'property type counts' in options:
-                propRecords = defaultdict(int)
-                allowed_propTypes = {'landuse': ['residential',
-                                                 'village_green',
-                                                 'recreation_ground',
-                                                 'allotments',
-                                                 'commercial',
-                                                 'depot',
-                                                 'industrial',
-                                                 'landfill',
-                                                 'orchard',
-                                                 'plant_nursery',
-                                                 'port',
-                                                 'quarry',
-                                                 'retail'],
-                                     'building': ['apartments',
-                                                  'farm',
-                                                  'house',
-                                                  'detached',
-                                                  'residential',
-                                                  'dormitory',
-                                                  'houseboat',
-                                                  'bungalow',
-                                                  'static_caravan',
-                                                  'cabin',
-                                                  'hotel',
-                                                  'commercial',
-                                                  'industrial',
-                                                  'retail',
-                                                  'warehouse',
-                                                  'kiosk',
-                                                  'hospital',
-                                                  'stadium']
-                                     }
-                
-    #----------------------------------------------------------------------
-            #Iterating through the XML file
-            for _, elem in ET.iterparse(fileIn):
-                if 'counting' in options:
-                    tag_counts = count_tags(elem, tag_counts)
-                
-                if 'zips' in options:
-                    zipLengthDict, known_zips, knownZipTags = zipCheck(elem, zipLengthDict, known_zips, \
-                                                                       knownZipTags, zip_tags_ignored, digits=zipLength)
-                
-                if 'county/state counting' in options:
-                    county_tags, state_tags = countyStateTypeCounter(elem, county_tags, state_tags, state_tags_ignored)
-                    
-                if 'county/state reporting' in options:
-                    counties_found, states_found = countyStateReporter(elem, countyKeys, stateKeys, counties_found, states_found)
-                    
-                if 'lat/long' in options:
-                    badNodes = lat_long_checker(elem, badNodes)
-                    
-                if 'amenities' in options:
-                    known_amenities = amenityFinder(elem, known_amenities)
-                    
-                if 'property types' in options:
-                    propTypes = propertyType(elem, propTypes)
-                
-                if 'property type counts' in options:
-                    propRecords = propertyCounter(elem, allowed_propTypes, propRecords)
-    
-    #----------------------------------------------------------------------    
-            #printing everything once done iterating
-            if 'counting' in options:
-                print("Tags Found")
-                pprint.pprint(tag_counts)
-            if 'zips' in options:
-                print("\nZip Lengths")
-                pprint.pprint(zipLengthDict) 
-                print("\nUnique Zip Codes")
-                pprint.pprint(known_zips)
-                print("\nZip Code Tag Keys Found")
-                pprint.pprint(knownZipTags)
-            if 'county/state counting' in options:
-                print("\nTypes of County Tags")
-                pprint.pprint(county_tags)
-                print("\nTypes of State Tags")
-                pprint.pprint(state_tags)
-            if 'county/state reporting' in options:
-                print("\nStates Identified")
-                pprint.pprint(states_found)
-                print("\nCounties Identified")
-                pprint.pprint(counties_found)
-            if 'lat/long' in options:
-                print("\nNodes with Incorrect Latitudes and/or Longitudes")
-                pprint.pprint(badNodes)
-            if 'amenities' in options:
-                print("\nUnique Amenity and Shop Types Identified")
-                pprint.pprint(known_amenities)
-            if 'property types' in options:
-                print("\nUnique Landuse Types")
-                pprint.pprint(propTypes)                
-            if 'property type counts' in options:
-                print("\nCounts of Relevant Landuse Types")
-                pprint.pprint(propRecords)
+    if options:
+        audit_engine = engine.AuditEngine(engine.build_visitors(options))
+        results = audit_engine.run(osmfile, backend)
+        
+        #printing everything once done iterating
+        audit_engine.report()
+        
+        return results
     
     
 
@@ -251,9 +148,7 @@ def isZipCode(elem):
     elem: ET element that represents a child tag to a node/way parent tag.
     '''
     
-    #makes sure any tag key with the text 'zip' or 'postcode' is accounted for
-    zip_re = re.compile('postcode|zip',re.IGNORECASE)  # @UndefinedVariable
-    zip_match = zip_re.search(elem.attrib['k'])
+    zip_match = ZIP_RE.search(elem.attrib['k'])
     
     return zip_match is not None
 
@@ -263,13 +158,7 @@ def isState(elem):
     
     elem: ET element that represents a child tag to a node/way parent tag.
     '''
-    state_keys = ['addr:state',
-                 'gnis:ST_alpha',
-                 'gnis:state_id',
-                 'nist:state_fips',
-                 'gnis:ST_num']
-    
-    return elem.attrib['k'] in state_keys
+    return elem.attrib['k'] in STATE_KEYS
 
 def state_name_transform(state_name_text):
     '''
@@ -302,14 +191,7 @@ def isCounty(elem):
     
     elem: ET element that represents a child tag to a node/way parent tag.
     '''
-    county_keys = ['gnis:County',
-                  'gnis:County_num',
-                  'gnis:county_id',
-                  'gnis:county_name',
-                  'is_in:county',
-                  'tiger:county']
-    
-    return elem.attrib['k'] in county_keys
+    return elem.attrib['k'] in COUNTY_KEYS
     
 
 def countyStateTypeCounter(elem, county_types={}, state_types={}, tags_to_ignore=[]):
@@ -397,7 +279,8 @@ def lat_long_checker(elem, badNodes=defaultdict(list), targetLatRange=[37.15,39.
     '''
     Checks that the latitude and longitude of all nodes in the OSM file are within the bounds 
     expected for the region of interest. Returns a dict wherein the keys are node IDs and the value for each key
-    is a list with up to 2 values, "Bad lon" and/or "Bad lat" to indicate what needs to be corrected.
+    is a list with up to 2 values, "Bad lon" and/or "Bad lat" to indicate what needs to be corrected. To check 
+    many nodes at once (e.g. the arrays of a NodeStore), use AuditEngine.lat_long_bounds instead.
     
     elem: ET element.
     badNodes: dict. Keys are integer node IDs, values are lists of strings indicating if the latitude and/or 
@@ -425,9 +308,7 @@ def isAmenity(elem):
     elem: ET element that represents a child tag to a node/way parent tag.
     '''
     
-    allowed_tag_keys = ['amenity', 'shop', 'healthcare']
-    
-    return elem.attrib['k'] in allowed_tag_keys
+    return elem.attrib['k'] in AMENITY_KEYS
 
 
 def amenityFinder(elem, amenities=defaultdict(set)):
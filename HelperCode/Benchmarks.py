@@ -0,0 +1,378 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module times each stage of the wrangling pipeline (correct_and_record, Audit_Simple.audit, StreetTypeAudit.audit
+and FIPS_to_Name), along with each XML parser backend available in OSMParser.py, on the sample OSM files bundled with
+the project, as well as on copies of them scaled up by replication (with IDs offset so every copy's nodes/ways are
+distinct). It also times a set of typical queries against
+a database loaded from a scaled-up sample, both with and without the indexes in data_wrangling_schema.sql. Results
+are reported as JSON so runs can be compared against each other to catch performance regressions before processing
+the full state file.
+
+Each stage is run in its own child process so that the peak RSS (resident memory) reported belongs to that stage
+alone.
+
+Usage (from within HelperCode):
+    python Benchmarks.py [osm files...] [--scales 1 10 100] [--query-scale 10] [--skip-queries] [--output bench.json]
+'''
+import argparse
+import contextlib
+from functools import partial
+import io
+import json
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError: #not available on Windows
+    resource = None
+
+import Audit_Simple
+import DataCorrection_and_CSVExport as correction
+import FIPSCodeMapper as fips
+import OSMParser
+import StreetTypeAudit
+import TableSinks
+
+
+FIXTURES = ['../data_sample.osm',
+            '../data_sample_100_elemsWithTags.osm',
+            '../data_sample_1000_elemsWithTags.osm',
+            '../test_osm.osm']
+SCALES = [1, 10, 100]
+
+#Added to every ID once per extra copy when scaling up a fixture. Larger than any real OSM ID (currently ~10^10).
+ID_OFFSET = 10**11
+
+#Every ID and reference to one in an OSM file (node/way/relation ids, nd refs and relation member refs)
+ID_ATTRIB = re.compile(rb'\b(id|ref)="(\d+)"')
+
+#Number of FIPS code lookups timed for the FIPS_to_Name stage
+FIPS_LOOKUPS = 100000
+
+#Typical queries against the corrected data, timed with and without the schema's indexes. Single-element lookups use
+#the largest node/way ID, found through the tables' primary keys so that finding it is equally fast either way.
+QUERIES = {'postcode count': '''SELECT COUNT(*) FROM nodes_tags WHERE key = 'postcode' ''',
+           'amenity tags joined to nodes': '''SELECT nodes.id, nodes.lat, nodes.lon, nodes_tags.value
+                                              FROM nodes_tags JOIN nodes ON nodes_tags.id = nodes.id
+                                              WHERE nodes_tags.key = 'amenity' ''',
+           'tags of one node': '''SELECT key, value FROM nodes_tags WHERE id = (SELECT MAX(id) FROM nodes)''',
+           'way geometry': '''SELECT ways_nodes.node_id FROM ways_nodes
+                              WHERE ways_nodes.id = (SELECT MAX(id) FROM ways) ORDER BY ways_nodes.position''',
+           'ways using one node': '''SELECT id FROM ways_nodes WHERE node_id = (SELECT MAX(id) FROM nodes)'''}
+QUERY_SCALE = 10
+QUERY_REPEATS = 20
+
+
+def scale_fixture(osm_file, factor, output_file):
+    '''
+    Writes a version of osm_file with all of its nodes/ways/relations repeated factor times. Each copy has every ID
+    (and reference to an ID) offset by a multiple of ID_OFFSET, so the copies don't collide with each other.
+
+    osm_file: str. Filepath for the OSM file to be scaled up.
+    factor: int. Number of copies of osm_file's contents to write.
+    output_file: str. Filepath the scaled-up OSM file is written to.
+    '''
+    with open(output_file, 'wb') as fileOut:
+        fileOut.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<osm>\n')
+
+        for copy in range(factor):
+            offset = copy * ID_OFFSET
+
+            def shift(match):
+                return match.group(1) + b'="' + str(int(match.group(2)) + offset).encode() + b'"'
+
+            with open(osm_file, 'rb') as fileIn:
+                for chunk in correction.iter_chunks(fileIn):
+                    fileOut.write(ID_ATTRIB.sub(shift, chunk) if offset else chunk)
+
+        fileOut.write(b'</osm>\n')
+
+
+
+def count_elements(osm_file):
+    '''
+    Returns a tuple of the form (number of nodes/ways/relations, number of child tags) in osm_file. These are the
+    denominators used for the elements/sec and tags/sec rates.
+
+    osm_file: str. Filepath for the OSM file of interest.
+    '''
+    elements = 0
+    tags = 0
+
+    with open(osm_file, 'rb') as fileIn:
+        for chunk in correction.iter_chunks(fileIn):
+            elements += len(correction.TOP_LEVEL_START.findall(chunk))
+            tags += chunk.count(b'<tag ')
+
+    return elements, tags
+
+
+
+######## STAGES ########
+#Each stage takes the OSM file to work on and a scratch directory it may write to
+
+def stage_correct_and_record(osm_file, scratch_dir):
+    correction.correct_and_record(osm_file, output_dir=scratch_dir, streaming=True)
+
+
+def stage_audit_simple(osm_file, scratch_dir):
+    options = ['counting', 'zips', 'county/state counting', 'county/state reporting', 'lat/long', 'amenities',
+               'property types', 'property type counts']
+
+    #We're only interested in how long the audit takes, not its printout
+    with contextlib.redirect_stdout(io.StringIO()):
+        Audit_Simple.audit(osm_file, options)
+
+
+def stage_street_type_audit(osm_file, scratch_dir):
+    StreetTypeAudit.audit(osm_file)
+
+
+def stage_fips_to_name(osm_file, scratch_dir):
+    #Cycle through every county in the Census file, looking each one up by its 5-digit and 3-digit (+ state) codes
+    resolver = fips.get_resolver(correction.CENSUS_FILE)
+    codes = list(resolver.counties_by_full_FIPS.keys())
+
+    for i in range(FIPS_LOOKUPS // 2):
+        code = codes[i % len(codes)]
+        fips.FIPS_to_Name(correction.CENSUS_FILE, code)
+        fips.FIPS_to_Name(correction.CENSUS_FILE, code[2:], state_FIPS=code[:2])
+
+
+def stage_parse(osm_file, scratch_dir, backend):
+    for _ in OSMParser.iter_records(osm_file, backend=backend):
+        pass
+
+
+#Stages run on every (scaled) fixture
+FILE_STAGES = {'correct_and_record': stage_correct_and_record,
+               'Audit_Simple.audit': stage_audit_simple,
+               'StreetTypeAudit.audit': stage_street_type_audit}
+
+for parser_backend in OSMParser.available_backends():
+    FILE_STAGES['OSMParser.iter_records ({})'.format(parser_backend)] = partial(stage_parse, backend=parser_backend)
+
+#Stages run once, independent of any fixture
+OTHER_STAGES = {'FIPS_to_Name': stage_fips_to_name}
+
+
+
+def peak_rss_bytes():
+    '''
+    Returns the peak resident memory of this process so far, in bytes (or None if that can't be determined).
+    '''
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    #Linux reports this in KiB, macOS in bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_stage(stage_name):
+    '''
+    Returns the function for the stage called stage_name, raising ValueError if there's no such stage.
+    '''
+    if stage_name in FILE_STAGES:
+        return FILE_STAGES[stage_name]
+    if stage_name in OTHER_STAGES:
+        return OTHER_STAGES[stage_name]
+
+    raise ValueError('Unknown stage {!r}; expected one of {}'.format(stage_name,
+                                                                     sorted(list(FILE_STAGES) + list(OTHER_STAGES))))
+
+
+def _run_stage(stage_name, osm_file):
+    '''
+    Runs a single stage and returns a tuple of the form (wall time in seconds, peak RSS in bytes). Meant to be run in
+    a fresh child process (see time_stage).
+    '''
+    stage = get_stage(stage_name)
+    scratch_dir = tempfile.mkdtemp()
+
+    try:
+        start = time.perf_counter()
+        stage(osm_file, scratch_dir)
+        wall_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(scratch_dir)
+
+    return wall_time, peak_rss_bytes()
+
+
+def time_stage(stage_name, osm_file=None):
+    '''
+    Runs a stage in its own child process and returns a tuple of the form (wall time in seconds, peak RSS in bytes).
+
+    stage_name: str. Key of FILE_STAGES or OTHER_STAGES.
+    osm_file: str. Filepath for the OSM file the stage is run on (not used by OTHER_STAGES).
+    '''
+    #Fail here, rather than in the child process, on a mistyped stage name
+    get_stage(stage_name)
+
+    with multiprocessing.Pool(1) as pool:
+        return pool.apply(_run_stage, (stage_name, osm_file))
+
+
+
+def time_query(conn, sql, repeats=QUERY_REPEATS):
+    '''
+    Returns a tuple of the form (mean wall time in seconds, number of rows returned) for running sql repeats times,
+    after one untimed run to warm SQLite's page cache.
+
+    conn: sqlite3 Connection.
+    sql: str. The query to time.
+    repeats: int. Number of timed runs.
+    '''
+    rows = len(conn.execute(sql).fetchall())
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        conn.execute(sql).fetchall()
+
+    return (time.perf_counter() - start) / repeats, rows
+
+
+def run_query_benchmarks(osm_file=FIXTURES[0], scale=QUERY_SCALE, queries=QUERIES, repeats=QUERY_REPEATS):
+    '''
+    Loads a scaled-up copy of osm_file into a scratch SQLite database and times each query on it, first with the
+    schema's indexes and then with them dropped. Returns a list of dicts, one per query.
+
+    osm_file: str. Filepath for the OSM file the database is built from.
+    scale: int. Replication factor osm_file is scaled up by.
+    queries: dict. Maps query names to their SQL.
+    repeats: int. Number of timed runs of each query.
+    '''
+    scratch_dir = tempfile.mkdtemp()
+    results = []
+
+    try:
+        scaled_file = os.path.join(scratch_dir, 'scaled.osm')
+        scale_fixture(osm_file, scale, scaled_file)
+
+        db_name = os.path.join(scratch_dir, 'bench.db')
+        correction.correct_and_record(scaled_file, sink=TableSinks.SQLiteSink(db_name, spatial_index=False))
+
+        conn = sqlite3.connect(db_name)
+
+        try:
+            indexed = {name: time_query(conn, sql, repeats) for name, sql in queries.items()}
+
+            #Only the schema's own indexes have any SQL (SQLite's automatic ones don't)
+            index_names = [name for (name,) in
+                           conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")]
+            for name in index_names:
+                conn.execute('DROP INDEX {}'.format(name))
+
+            unindexed = {name: time_query(conn, sql, repeats) for name, sql in queries.items()}
+        finally:
+            conn.close()
+
+        for name in queries:
+            results.append({'query': name,
+                            'fixture': os.path.basename(osm_file),
+                            'scale': scale,
+                            'rows': indexed[name][1],
+                            'indexed_s': indexed[name][0],
+                            'unindexed_s': unindexed[name][0],
+                            'speedup': unindexed[name][0] / indexed[name][0] if indexed[name][0] else None})
+
+    finally:
+        shutil.rmtree(scratch_dir)
+
+    return results
+
+
+
+def run_benchmarks(fixtures=FIXTURES, scales=SCALES, query_scale=QUERY_SCALE):
+    '''
+    Runs every stage on every fixture at every scale, returning the results as a dict that can be dumped to JSON.
+
+    fixtures: list of str. Filepaths for the OSM files to benchmark with.
+    scales: list of int. Replication factors each fixture is scaled up by.
+    query_scale: int. Replication factor for the query benchmark's database (built from the first fixture), or None
+                      to skip the query benchmark.
+    '''
+    results = {'python': platform.python_version(),
+               'platform': platform.platform(),
+               'cpu_count': os.cpu_count(),
+               'runs': []}
+
+    scaled_dir = tempfile.mkdtemp()
+
+    try:
+        for fixture in fixtures:
+            for scale in scales:
+                if scale == 1:
+                    osm_file = fixture
+                else:
+                    osm_file = os.path.join(scaled_dir, 'x{}_{}'.format(scale, os.path.basename(fixture)))
+                    scale_fixture(fixture, scale, osm_file)
+
+                elements, tags = count_elements(osm_file)
+
+                for stage_name in FILE_STAGES:
+                    wall_time, peak_rss = time_stage(stage_name, osm_file)
+
+                    results['runs'].append({'stage': stage_name,
+                                            'fixture': os.path.basename(fixture),
+                                            'scale': scale,
+                                            'bytes': os.path.getsize(osm_file),
+                                            'elements': elements,
+                                            'tags': tags,
+                                            'wall_time_s': wall_time,
+                                            'elements_per_s': elements / wall_time if wall_time else None,
+                                            'tags_per_s': tags / wall_time if wall_time else None,
+                                            'peak_rss_bytes': peak_rss})
+
+                if scale != 1:
+                    os.remove(osm_file)
+
+    finally:
+        shutil.rmtree(scaled_dir)
+
+    wall_time, peak_rss = time_stage('FIPS_to_Name')
+    results['runs'].append({'stage': 'FIPS_to_Name',
+                            'lookups': FIPS_LOOKUPS,
+                            'wall_time_s': wall_time,
+                            'lookups_per_s': FIPS_LOOKUPS / wall_time if wall_time else None,
+                            'peak_rss_bytes': peak_rss})
+
+    if query_scale:
+        results['queries'] = run_query_benchmarks(fixtures[0], query_scale)
+
+    return results
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the OSM wrangling pipeline on sample files.')
+    parser.add_argument('fixtures', nargs='*', default=FIXTURES, help='OSM files to benchmark with')
+    parser.add_argument('--scales', nargs='+', type=int, default=SCALES, help='replication factors to scale by')
+    parser.add_argument('--query-scale', type=int, default=QUERY_SCALE,
+                        help='replication factor for the query benchmark database')
+    parser.add_argument('--skip-queries', action='store_true', help="don't run the query benchmark")
+    parser.add_argument('--output', help='file to write the JSON results to (default: stdout)')
+    args = parser.parse_args()
+
+    query_scale = None if args.skip_queries else args.query_scale
+    report = json.dumps(run_benchmarks(args.fixtures, args.scales, query_scale), indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as fileOut:
+            fileOut.write(report)
+    else:
+        print(report)
@@ -0,0 +1,118 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module keeps an existing OpenStreetMap SQL database (e.g. one built by correct_and_record with a
+TableSinks.SQLiteSink) up to date using an osmChange (.osc) diff, rather than rebuilding the whole database every
+time the source extract changes. Created and modified nodes/ways/relations are run through the same data correction
+as a full ingest and their rows replace whatever the database had for them; deleted ones have all of their rows
+removed. The time this takes is proportional to the size of the diff, not the size of the database.
+'''
+import sqlite3
+
+import DataCorrection_and_CSVExport as correction
+import OSMParser as parser
+import SpatialIndex as spatial
+import TableSinks as sinks
+
+
+DATABASE = '../SW_WV_OSM.db'
+OSCFILE = '../test_osm_change.osc'
+
+#The tables holding data for each type of parent tag. All of them have the parent's ID in their 'id' column.
+ELEMENT_TABLES = {'node': ['nodes', 'nodes_tags'],
+                  'way': ['ways', 'ways_tags', 'ways_nodes'],
+                  'relation': ['relations', 'relations_tags', 'relations_members']}
+
+#Without these, every delete below (and the spatial index update) would be a full table scan. They match the indexes
+#in data_wrangling_schema.sql, so IF NOT EXISTS means databases loaded with that schema aren't affected.
+LOOKUP_INDEXES = ['CREATE INDEX IF NOT EXISTS nodes_tags_id_idx ON nodes_tags (id)',
+                  'CREATE INDEX IF NOT EXISTS ways_tags_id_idx ON ways_tags (id)',
+                  'CREATE INDEX IF NOT EXISTS ways_nodes_id_idx ON ways_nodes (id, position, node_id)',
+                  'CREATE INDEX IF NOT EXISTS ways_nodes_node_id_idx ON ways_nodes (node_id)',
+                  'CREATE INDEX IF NOT EXISTS relations_tags_id_idx ON relations_tags (id)',
+                  'CREATE INDEX IF NOT EXISTS relations_members_id_idx ON relations_members (id, position)']
+
+
+def iter_changes(fileIn, backend=None):
+    '''
+    Yields a tuple of the form (action, record) for each node/way/relation in an osmChange file, wherein action is 
+    'create', 'modify' or 'delete' and record is the fully-parsed OSMParser.OSMElement.
+
+    fileIn: file object (opened in binary mode) for the osmChange file of interest.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    action = None
+
+    for record in parser.iter_records(fileIn, ('create', 'modify', 'delete') + parser.ENTITY_TYPES, backend):
+        if record.type in ELEMENT_TABLES:
+            yield action, record
+        else:
+            action = record.type
+
+
+
+def delete_element(conn, elem_type, elem_id):
+    '''
+    Removes every row belonging to a single node, way or relation from the database.
+
+    conn: sqlite3 Connection to the database being updated.
+    elem_type: str. One of 'node', 'way' or 'relation'.
+    elem_id: str. ID of the node, way or relation.
+    '''
+    for table in ELEMENT_TABLES[elem_type]:
+        conn.execute('DELETE FROM {} WHERE id = ?'.format(table), (elem_id,))
+
+
+
+def apply_changes(osc_file, db_name=DATABASE, backend=None):
+    '''
+    Applies an osmChange diff to the database. Everything is done in a single transaction, so the database is left
+    untouched if anything goes wrong partway through. Returns a dict counting how many nodes/ways/relations were 
+    created, modified and deleted.
+
+    osc_file: str. Filepath for the osmChange (.osc) file of interest, which may be compressed (e.g. .osc.gz).
+    db_name: str. Filepath of the SQLite database to update. Its tables must follow data_wrangling_schema.sql.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    counts = {'create': 0, 'modify': 0, 'delete': 0}
+    changed_ids = {'node': [], 'way': [], 'relation': []}
+    inserts = {table: sinks.insert_statement(table) for table in sinks.TABLES}
+
+    conn = sqlite3.connect(db_name, isolation_level=None)
+
+    try:
+        for statement in LOOKUP_INDEXES:
+            conn.execute(statement)
+
+        conn.execute('BEGIN')
+
+        with parser.open_osm(osc_file) as fileIn:
+            for action, record in iter_changes(fileIn, backend):
+                #Created elements are cleared out too, so that applying the same diff twice does no harm
+                delete_element(conn, record.type, record.attrs['id'])
+
+                if action != 'delete':
+                    for table, rows in correction.shape_element(record).items():
+                        conn.executemany(inserts[table], rows)
+
+                counts[action] += 1
+                changed_ids[record.type].append(record.attrs['id'])
+
+        #Keep the spatial index (if the database has one) in line with the nodes/ways that just changed
+        spatial.update_spatial_index(conn, changed_ids['node'], changed_ids['way'])
+
+        conn.execute('COMMIT')
+
+    #Closing without a COMMIT (i.e. if anything above failed) discards the whole transaction
+    finally:
+        conn.close()
+
+    return counts
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    print(apply_changes(OSCFILE))
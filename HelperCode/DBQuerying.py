@@ -5,41 +5,199 @@ Created on Feb 2, 2018
 
 This code allows for queries to be sent and results received from our OpenStreetMap SQL database
 
+Queries go through a QueryClient, which keeps a small pool of read-only connections open to its database (each with
+its own prepared statement cache). This makes running many small queries in a row (e.g. from a notebook) much cheaper
+than connecting for every one. Queries run with cache=True also have their results remembered until the database (or
+its write-ahead log) changes; only use this for deterministic queries, i.e. not ones using random() or datetime('now').
+
 '''
+from collections import OrderedDict
+import os
+import queue
 import sqlite3
-import pandas as pd
+import threading
+import urllib.request
 
 
 DATABASE = "../SW_WV_OSM.db"
 
-def run_query(query_list, db_name):
+
+class QueryClient(object):
     '''
-    Runs the query specified on the database specified, printing the results to the console
-    
-    query_text: str. Contains the text of your query. New lines of SQL comprising the same query (e.g.
-                separating the SELECT statement from the FROM statement) should be separated with the \n newline
-    db_name: str. Name of the database located one directory above this code's working directory.    
+    Runs queries against a single SQLite database, reusing up to pool_size read-only connections between queries.
+    Safe to share between threads; each connection is only ever used by one query at a time.
     '''
     
-    query = "\n".join(query_list) + ";"
+    def __init__(self, db_name, pool_size=4, cached_statements=256, result_cache_size=128):
+        '''
+        db_name: str. Filepath of the SQLite database. It must already exist, as it's opened read-only.
+        pool_size: int. Maximum number of connections kept open at once.
+        cached_statements: int. Number of prepared statements each connection keeps, so that repeated queries
+                                aren't parsed again.
+        result_cache_size: int. Number of query results remembered for queries run with cache=True. Results are only
+                                reused while the modification times and sizes of the database file and its
+                                write-ahead log (if any) are unchanged. Set to 0 to turn this off.
+        '''
+        self.db_name = db_name
+        self.uri = 'file:{}?mode=ro'.format(urllib.request.pathname2url(os.path.abspath(db_name)))
+        self.pool_size = pool_size
+        self.cached_statements = cached_statements
+        self.result_cache_size = result_cache_size
+        
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+    
+    
+    def _acquire(self):
+        '''
+        Returns an idle connection, opening a new one if none are free and the pool isn't full yet (otherwise waits
+        for one to be released).
+        '''
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self.lock:
+            open_new = self.opened < self.pool_size
+            if open_new:
+                self.opened += 1
+        
+        if not open_new:
+            return self.idle.get()
+        
+        try:
+            return sqlite3.connect(self.uri, uri=True, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+        except sqlite3.Error:
+            with self.lock:
+                self.opened -= 1
+            raise
+    
     
-    conn = sqlite3.connect(db_name) # @UndefinedVariable
+    def _db_version(self):
+        '''
+        Returns a tuple that changes whenever the database is written to. In WAL mode, writes only go to the -wal
+        file until it's checkpointed, so that file is checked too.
+        '''
+        stat = os.stat(self.db_name)
+        
+        try:
+            wal_stat = os.stat(self.db_name + '-wal')
+        except FileNotFoundError:
+            return stat.st_mtime_ns, stat.st_size, None, None
+        
+        return stat.st_mtime_ns, stat.st_size, wal_stat.st_mtime_ns, wal_stat.st_size
     
-    #print("Single-line query text: {};\n\n".format(" ".join(query_list)))
-    #print("**** QUERY TEXT ****\n\n{}\n\n".format(query))
     
-    results_df = pd.read_sql_query(query, conn)    
-    #print("**** QUERY RESULTS ****\n")
-    #print(results_df)
-    #print("RESULTS PRINT SUPPRESSED")
+    def query(self, sql, params=(), as_frame=True, cache=False):
+        '''
+        Runs a single SQL statement and returns its results, either as a pandas DataFrame or as a list of row tuples.
+        
+        sql: str. The query, with ? (or :name) placeholders wherever a value is needed.
+        params: tuple or dict. Values bound to the placeholders in sql.
+        as_frame: bool. If True, returns a DataFrame (a copy, if it came from the result cache). If False, returns a
+                        list of tuples, skipping the cost of building a DataFrame.
+        cache: bool. If True, the result is remembered (and a remembered result is returned, if the database hasn't
+                        changed since). Only use this for deterministic queries.
+        '''
+        key = None
+        
+        if cache and self.result_cache_size:
+            bound = tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params)
+            key = (sql, bound, as_frame, self._db_version())
+            
+            with self.lock:
+                if key in self.results:
+                    self.results.move_to_end(key)
+                    result = self.results[key]
+                    return result.copy() if as_frame else list(result)
+        
+        conn = self._acquire()
+        try:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchall()
+            columns = [column[0] for column in cursor.description] if cursor.description else []
+        finally:
+            self.idle.put(conn)
+        
+        if as_frame:
+            #pandas takes a while to import, so only do so once it's actually needed
+            import pandas as pd
+            result = pd.DataFrame.from_records(rows, columns=columns)
+        else:
+            result = rows
+        
+        if key is not None:
+            with self.lock:
+                self.results[key] = result
+                while len(self.results) > self.result_cache_size:
+                    self.results.popitem(last=False)
+            
+            return result.copy() if as_frame else list(result)
+        
+        return result
+    
+    
+    def clear_cache(self):
+        with self.lock:
+            self.results.clear()
+    
+    
+    def close(self):
+        '''
+        Closes every idle connection and forgets all cached results.
+        '''
+        self.clear_cache()
+        
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.opened -= 1
+
+
+
+_clients = {}
+
+def get_client(db_name):
+    '''
+    Returns the QueryClient for db_name, creating it the first time it's requested.
+    
+    db_name: str. Filepath of the SQLite database.
+    '''
+    if db_name not in _clients:
+        _clients[db_name] = QueryClient(db_name)
+    
+    return _clients[db_name]
+
+
+def run_query(query_list, db_name, params=(), cache=False):
+    '''
+    Runs the query specified on the database specified and returns the results as a pandas DataFrame. Connections
+    are reused between calls, as are results if cache is True (see QueryClient).
+    
+    query_list: list of str. Lines of your query (e.g. the SELECT statement and the FROM statement), which are
+                joined with newlines.
+    db_name: str. Name of the database located one directory above this code's working directory.
+    params: tuple or dict. Values bound to any ? (or :name) placeholders in the query. Prefer these to building
+                values into the query text.
+    cache: bool. If True, the results are remembered and reused until the database changes. Only use this for
+                deterministic queries (e.g. not ones using random() or datetime('now')).
+    '''
+    query = "\n".join(query_list) + ";"
     
-    conn.close()
-    return results_df
+    return get_client(db_name).query(query, params, cache=cache)
     
 ###########     MAIN CODE EXECUTION SPACE       ###########
 '''base_query = ["SELECT COUNT(value)",
          "FROM nodes_tags",
-         "WHERE (key = 'amenity' or key = 'shope') and (value = 'ATV Trails' or value = 'Tiles')"]
+         "WHERE (key = 'amenity' or key = 'shope') and (value = ? or value = ?)"]
         #"LIMIT 10"]
 
-df = run_query(base_query, DATABASE)'''
\ No newline at end of file
+df = run_query(base_query, DATABASE, params=('ATV Trails', 'Tiles'))'''
\ No newline at end of file
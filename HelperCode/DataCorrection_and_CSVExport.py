@@ -11,154 +11,556 @@ database ingestion.
 '''
 import FIPSCodeMapper as fips
 import Audit_Simple as audit
-import xml.etree.cElementTree as ET
-import pandas as pd
+import OSMParser as parser
+import PBFReader as pbf
+import StreetTypeAudit as street_audit
+import TableSinks as sinks
+import contextlib
+import json
+import os
 import re
 from itertools import chain
+from functools import lru_cache, partial
 
 PROBLEMCHARS = re.compile(r'[=\+/&<>;\'"\?%#$@\,\. \t\r\n]')
 
+#Categories of child tag keys, each handled by a different branch of data_correction (see classify_key)
+PROBLEM = 'problem'
+ZIP = 'zip'
+COUNTY = 'county'
+STATE = 'state'
+AMENITY = 'amenity'
+STREET = 'street'
+GENERIC = 'generic'
+
+#Max number of distinct tag keys whose classification is cached
+KEY_CACHE_SIZE = 65536
+
 
 OSMFILE = '../SW_WestVirginia.osm'
+OUTPUT_DIR = '../CSV for SQL Tables/'
+CENSUS_FILE = '../2010_FIPSCodes.csv'
+
+#Max number of rows per table held in memory before they're written to disk when streaming
+BATCH_SIZE = 10000
+
+#Approximate number of bytes of XML handed to a worker process at a time when correcting in parallel
+CHUNK_SIZE = 2**20
+
+#Approximate number of bytes of XML corrected between checkpoints, when checkpointing
+CHECKPOINT_INTERVAL = 2**26
 
-def correct_and_record(osm_file):
+#Start of a top-level (parent) tag in the raw bytes of an OSM file
+TOP_LEVEL_START = re.compile(rb'<(?:node|way|relation)[\s/>]')
+
+def correct_and_record(osm_file, output_dir=OUTPUT_DIR, streaming=False, batch_size=BATCH_SIZE, workers=1,
+                       chunk_size=CHUNK_SIZE, sink=None, node_store=None, backend=None, checkpoint_file=None,
+                       checkpoint_interval=CHECKPOINT_INTERVAL, profiler=None):
     '''
     Churns through the OSM file being investigated, checking different components using results of the
     previous audits and correcting data as needed. Data are then, as corrected, appended to CSV files.
     
-    osm_file: str. Filepath for OpenStreetMap file of interest. 
+    osm_file: str. Filepath for OpenStreetMap file of interest, which may be compressed (see OSMParser.open_osm) or
+                a PBF file (see PBFReader.py).
+    output_dir: str. Directory the CSV files for each SQL table are written into.
+    streaming: bool. If False, every row is held in memory until the whole file is parsed and the tables are then
+                written via pandas DataFrames. If True, rows are written to the CSVs in batches of batch_size as
+                they're corrected, keeping peak memory flat regardless of the size of osm_file.
+    batch_size: int. Max number of rows per table held in memory before being written out. Only used if
+                streaming is True.
+    workers: int. Number of processes running the data correction. If greater than 1, this process only splits
+                the file into chunks of complete nodes/ways (or, for PBF files, into its blocks), which a pool of 
+                worker processes then parse and correct. Results are recorded in file order, so the output is 
+                identical to that of a single-process run.
+    chunk_size: int. Approximate number of bytes of XML sent to a worker process at a time. Only used if 
+                workers > 1.
+    sink: object from TableSinks (e.g. TableSinks.SQLiteSink) that the corrected rows are written into. If 
+                given, output_dir, streaming and batch_size are ignored in favor of the sink's own settings.
+    node_store: NodeStore.NodeStore that the (corrected) coordinates of every node are added to as they're 
+                recorded, so that way geometries can be resolved afterwards without another pass over osm_file.
+                It still needs to be finalized once this returns.
+    backend: str. Name of the XML parser backend to use (see OSMParser.BACKENDS), or None for the default.
+    checkpoint_file: str. If given, the CSVs are streamed (as if streaming were True) and, every checkpoint_interval
+                bytes of osm_file, flushed to disk along with a checkpoint recording how far through osm_file they
+                go. If this run is interrupted (e.g. crashes or is killed), running it again with the same 
+                checkpoint_file picks up from the last checkpoint instead of starting over, and produces the same 
+                CSVs an uninterrupted run would have. The checkpoint file is removed once the run completes. 
+                Can't be used with sink. A node_store only gets the nodes corrected since the run was resumed.
+    checkpoint_interval: int. Approximate number of bytes of osm_file corrected between checkpoints.
+    profiler: PipelineProfiler.PipelineProfiler that times each stage of the run and counts what goes through it
+                (see PipelineProfiler.py). Its clock starts (and anything from an earlier run is cleared) once the
+                sink is ready and the run begins. If None, nothing is timed or counted.
     '''
     
-    with open(osm_file, "rb") as fileIn:
-        #Setting up the different DataFrames such that they mirror the SQL data schema
-        
-        nodes = []
-        nodes_tags = []        
-               
-        ways = []
-        ways_tags = []
-        ways_nodes = []
-        
-        
-
+    start_offset = 0
+    
+    if checkpoint_file is not None:
+        if sink is not None:
+            raise ValueError('checkpoint_file can only be used when writing CSVs, not with a sink')
         
-        #Iterating through the XML file
-        for _, element in ET.iterparse(fileIn):
-            '''Each time a new node or way is parsed, create a new temporary list of lists
-            to contain only data about that specific node/way'''
-            temp_childTag_data = []
-            lingering_county_FIPS = None
-            
-            ####################    NODES    ######################
+        checkpoint = load_checkpoint(checkpoint_file, osm_file, output_dir)
+        if checkpoint is None:
+            sink = sinks.CSVSink(output_dir, batch_size)
+        else:
+            sink = sinks.CSVSink(output_dir, batch_size, resume_from=checkpoint['outputs'])
+            start_offset = checkpoint['offset']
     
-            if element.tag == 'node':
-                #REMEMBER: we need to check to see if the 'k' attrib of each tag is problematic
-                    #If it is: ignore it entirely
-                    #If it isn't: take only the chars after ":" (if one is present) as key and set 'type' to be
-                        #the chars preceding ":"
-                
-                #dict is needed for clear input into data correction algorithm
-                nodes_dict = {'id': element.attrib['id'],
-                              'lat': element.attrib['lat'],
-                              'lon': element.attrib['lon'],
-                              'user': element.attrib['user'],
-                              'uid': element.attrib['uid'],
-                              'version': element.attrib['version'],
-                              'changeset': element.attrib['changeset'],
-                              'timestamp': element.attrib['timestamp']}
-                
-                nodes.append([nodes_dict['id'],
-                              nodes_dict['lat'],
-                              nodes_dict['lon'],
-                              nodes_dict['user'],
-                              nodes_dict['uid'],
-                              nodes_dict['version'],
-                              nodes_dict['changeset'],
-                              nodes_dict['timestamp']])
-
-                #Iterate through each child tag of the node, running data correction algorithm        
-                for elem in element.iter('tag'):
-                    temp_childTag_data, lingering_county_FIPS = data_correction(elem, nodes_dict, 
-                                                                                temp_childTag_data, 
-                                                                                lingering_county_FIPS)
-                
-                #And now, we add the entirety of the child tags for this parent tag into the nodes_tags list
-                nodes_tags += temp_childTag_data
-                
-            ####################    WAYS    ######################
-            elif element.tag == 'way':
-                wayID = element.attrib['id']
-                
-                #dict is needed for clear input into data correction algorithm
-                ways_dict = {'id': wayID,
-                             'user': element.attrib['user'],
-                             'uid': element.attrib['uid'],
-                             'version': element.attrib['version'],
-                             'changeset': element.attrib['changeset'],
-                             'timestamp': element.attrib['timestamp']}
-                
-                ways.append([ways_dict['id'],
-                             ways_dict['user'],
-                             ways_dict['uid'],
-                             ways_dict['version'],
-                             ways_dict['changeset'],
-                             ways_dict['timestamp']])
-                
-                
-                
-                #Iterate through each child tag of the node, running data correction algorithm        
-                for elem in element.iter('tag'):
-                    temp_childTag_data, lingering_county_FIPS = data_correction(elem, ways_dict, 
-                                                                                temp_childTag_data, 
-                                                                                lingering_county_FIPS)
-                     
-                
-                #And now, we add the entirety of the child tags for this parent tag into the nodes_tags list
-                ways_tags += temp_childTag_data
+    elif sink is None:
+        if streaming:
+            sink = sinks.CSVSink(output_dir, batch_size)
+        else:
+            sink = sinks.DataFrameSink(output_dir)
+    
+    pbf_input = pbf.is_pbf(osm_file)
+    
+    if profiler is None:
+        instrumented = contextlib.nullcontext()
+        shape_record = shape_element
+    else:
+        sink = profiler.wrap_sink(sink)
+        instrumented = profiler.instrument()
+        shape_record = profiler.timed('correct', shape_element)
+    
+    with instrumented, parser.open_osm(osm_file) as fileIn:
+        if pbf_input or workers > 1 or checkpoint_file is not None:
+            fileIn.seek(start_offset)
+            
+            if pbf_input:
+                #PBF files come already split into blocks, which are decoded (and corrected) one at a time
+                chunks = pbf.iter_blobs(fileIn, offsets=True)
+                shape = shape_blob_with_offset
+            else:
+                chunks = iter_chunks(fileIn, chunk_size, offsets=True)
+                shape = partial(shape_chunk_with_offset, backend=backend)
+            
+            if workers > 1:
+                import multiprocessing
                 
+                with multiprocessing.Pool(workers) as pool:
+                    #imap (not imap_unordered) hands back each chunk's rows in the order the chunks were read
+                    shaped_chunks = pool.imap(shape, chunks)
+                    if profiler is not None:
+                        #Time spent waiting on the workers to read, parse and correct each chunk
+                        shaped_chunks = profiler.timed_iter('parse and correct (workers)', shaped_chunks)
                     
+                    record_chunks(shaped_chunks, sink, node_store, start_offset, checkpoint_file, 
+                                  checkpoint_interval, osm_file, output_dir)
+            else:
+                if profiler is not None:
+                    #Each chunk is parsed and corrected in one go, so the two are timed together
+                    chunks = profiler.timed_iter('read', chunks)
+                    shape = profiler.timed('parse and correct', shape)
                 
+                record_chunks(map(shape, chunks), sink, node_store, start_offset, checkpoint_file, 
+                              checkpoint_interval, osm_file, output_dir)
+        
+        else:
+            records = parser.iter_records(fileIn, backend=backend)
+            if profiler is not None:
+                records = profiler.timed_iter('parse', records)
+            
+            for record in records:
+                element_rows = shape_record(record)
+                for table, rows in element_rows.items():
+                    sink.write(table, rows)
                 
-                #Now for way_nodes:
-                i = 0
-                for elem in element.iter('nd'):
-                    ways_nodes.append([wayID,
-                                       elem.attrib['ref'],
-                                       i])
-                    i += 1
-    
-    ####################    Writing to CSV    ######################  
-         
-    #First, let's throw these lists into DataFrames, for ease of writing to CSV and clarity in code
-    nodes_df = pd.DataFrame(data = nodes,
-                            columns=['id', 'lat', 'lon', 'user', 'uid', 'version', 'changeset', 'timestamp'])
-    nodes_tags_df = pd.DataFrame(data = nodes_tags,
-                                 columns=['id', 'key', 'value', 'type'])
-        
-    ways_df = pd.DataFrame(data = ways,
-                           columns=['id', 'user', 'uid', 'version', 'changeset', 'timestamp'])
-    ways_tags_df = pd.DataFrame(data = ways_tags,
-                                columns=['id', 'key', 'value', 'type'])
-    ways_nodes_df = pd.DataFrame(data = ways_nodes,
-                                 columns=['id', 'node_id', 'position'])
-    
-    #We need to make sure there's not duplicative data (e.g. same addr:state entry for same node/way ID)
-    nodes_df.drop_duplicates(inplace=True)
-    nodes_tags_df.drop_duplicates(inplace=True)
-    ways_df.drop_duplicates(inplace=True)
-    ways_tags_df.drop_duplicates(inplace=True)
-    ways_nodes_df.drop_duplicates(inplace=True)
-    
-    #Now let's write the DataFrames to CSV
-    nodes_df.to_csv('../CSV for SQL Tables/nodes.csv', index=False, encoding='utf-8')
-    nodes_tags_df.to_csv('../CSV for SQL Tables/nodes_tags.csv', index=False, encoding='utf-8')
-    ways_df.to_csv('../CSV for SQL Tables/ways.csv', index=False, encoding='utf-8')
-    ways_tags_df.to_csv('../CSV for SQL Tables/ways_tags.csv', index=False, encoding='utf-8')
-    ways_nodes_df.to_csv('../CSV for SQL Tables/ways_nodes.csv', index=False, encoding='utf-8')
-    
-    
-    
-def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_find=None):
+                if node_store is not None:
+                    node_store.add_rows(element_rows.get('nodes', []))
+        
+        sink.close()
+    
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    
+    
+
+def record_chunks(shaped_chunks, sink, node_store, start_offset, checkpoint_file, checkpoint_interval, osm_file,
+                  output_dir):
+    '''
+    Writes the rows of each shaped chunk into sink (and its nodes into node_store), in order, saving a checkpoint
+    whenever another checkpoint_interval bytes of osm_file have been recorded. See correct_and_record for the
+    arguments not described here.
+    
+    shaped_chunks: iterator of tuples of the form (chunk rows, offset), as returned by shape_chunk_with_offset.
+    start_offset: int. Offset into osm_file of the first chunk.
+    '''
+    last_checkpoint = start_offset
+    
+    for chunk_rows, offset in shaped_chunks:
+        for table, rows in chunk_rows.items():
+            sink.write(table, rows)
+        
+        if node_store is not None:
+            node_store.add_rows(chunk_rows.get('nodes', []))
+        
+        if checkpoint_file is not None and offset - last_checkpoint >= checkpoint_interval:
+            save_checkpoint(checkpoint_file, osm_file, output_dir, offset, sink.checkpoint())
+            last_checkpoint = offset
+    
+    
+
+def input_signature(osm_file, output_dir):
+    '''
+    Returns a dict identifying osm_file (by path, size and modification time) and output_dir, so that a checkpoint
+    is only ever resumed from by a run over the same, unchanged file writing to the same place.
+    '''
+    stat = os.stat(osm_file)
+    
+    return {'osm_file': os.path.abspath(osm_file), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'output_dir': os.path.abspath(output_dir)}
+
+
+def save_checkpoint(checkpoint_file, osm_file, output_dir, offset, outputs):
+    '''
+    Saves a checkpoint saying that every element of osm_file before offset has been recorded in the outputs (as 
+    described by outputs, from CSVSink.checkpoint). The file is replaced atomically, so a crash while saving leaves
+    the previous checkpoint intact.
+    
+    offset: int. Byte offset into osm_file of the first element not yet recorded.
+    '''
+    checkpoint = input_signature(osm_file, output_dir)
+    checkpoint['offset'] = offset
+    checkpoint['outputs'] = outputs
+    
+    temp_file = checkpoint_file + '.tmp'
+    with open(temp_file, 'w') as fileOut:
+        json.dump(checkpoint, fileOut)
+        fileOut.flush()
+        os.fsync(fileOut.fileno())
+    
+    os.replace(temp_file, checkpoint_file)
+
+
+def load_checkpoint(checkpoint_file, osm_file, output_dir):
+    '''
+    Returns the checkpoint saved in checkpoint_file (as a dict, see save_checkpoint), or None if there isn't one or
+    it was saved by a run over a different (or since changed) osm_file or output_dir.
+    '''
+    if not os.path.exists(checkpoint_file):
+        return None
+    
+    with open(checkpoint_file, 'r') as fileIn:
+        checkpoint = json.load(fileIn)
+    
+    for key, value in input_signature(osm_file, output_dir).items():
+        if checkpoint.get(key) != value:
+            return None
+    
+    return checkpoint
+    
+    
+
+def iter_chunks(fileIn, chunk_size=CHUNK_SIZE, offsets=False):
+    '''
+    Splits the raw bytes of the OSM file into chunks of roughly chunk_size bytes, each cut at the start of a
+    top-level node/way/relation so that every chunk holds only complete parent tags (with the XML declaration,
+    <osm> wrapper and <bounds> header removed). No XML parsing is done here, so the process reading the file 
+    doesn't become the bottleneck when the actual parsing/correcting is done by a pool of workers.
+    
+    This relies on '<' never appearing unescaped inside OSM attribute values, which the XML spec guarantees.
+    
+    fileIn: file object (opened in binary mode) for the OSM file of interest. It may have been moved (with seek) to
+            the start of any parent tag, e.g. to skip the part of the file already covered by a checkpoint.
+    chunk_size: int. Approximate size, in bytes, of each chunk.
+    offsets: bool. If True, tuples of the form (chunk, offset) are yielded instead, wherein offset is the position
+            in fileIn just past the end of chunk (i.e. where the next chunk starts).
+    '''
+    buffer = b''
+    #Position in fileIn of the start of buffer
+    buffer_offset = fileIn.tell()
+    started = False
+    
+    for block in iter(lambda: fileIn.read(chunk_size), b''):
+        buffer += block
+        
+        #Drop everything preceding the first parent tag (XML declaration, <osm ...>, <bounds .../>)
+        if not started:
+            first_start = TOP_LEVEL_START.search(buffer)
+            if first_start is None:
+                continue
+            buffer = buffer[first_start.start():]
+            buffer_offset += first_start.start()
+            started = True
+        
+        #Hand over everything up to the last parent tag that has (at least) started in this buffer
+        last_start = max(buffer.rfind(b'<node'), buffer.rfind(b'<way'), buffer.rfind(b'<relation'))
+        if last_start > 0:
+            buffer_offset += last_start
+            yield (buffer[:last_start], buffer_offset) if offsets else buffer[:last_start]
+            buffer = buffer[last_start:]
+    
+    if started:
+        buffer_offset += len(buffer)
+        osm_close = buffer.rfind(b'</osm>')
+        if osm_close != -1:
+            buffer = buffer[:osm_close]
+        yield (buffer, buffer_offset) if offsets else buffer
+        
+        
+
+def shape_chunk(chunk, backend=None):
+    '''
+    Parses a chunk of raw OSM XML (as produced by iter_chunks) and runs shape_element on each parent tag in it. 
+    Returns a dict mapping table names to all of the rows for that table, in the order the elements appear in 
+    chunk. This is the unit of work done by each worker process when correcting in parallel.
+    
+    chunk: bytes. UTF-8 encoded XML of one or more complete parent tags.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    chunk_rows = {}
+    
+    for record in parser.records_from_bytes(b'<osm>' + chunk + b'</osm>', backend=backend):
+        for table, rows in shape_element(record).items():
+            chunk_rows.setdefault(table, []).extend(rows)
+    
+    return chunk_rows
+
+
+def shape_chunk_with_offset(chunk_and_offset, backend=None):
+    '''
+    Same as shape_chunk, but takes and returns tuples carrying the chunk's offset (as yielded by iter_chunks with
+    offsets=True), so that progress through the file can be tracked when chunks are shaped by worker processes.
+    
+    chunk_and_offset: tuple of the form (chunk, offset).
+    
+    Returns: tuple of the form (chunk rows, offset).
+    '''
+    chunk, offset = chunk_and_offset
+    
+    return shape_chunk(chunk, backend), offset
+
+
+def shape_blob_with_offset(blob_and_offset):
+    '''
+    Same as shape_chunk_with_offset, for a single block of a PBF file.
+    
+    blob_and_offset: tuple of the form (block type, blob, offset), as yielded by PBFReader.iter_blobs with 
+                    offsets=True.
+    
+    Returns: tuple of the form (chunk rows, offset).
+    '''
+    block_type, blob, offset = blob_and_offset
+    chunk_rows = {}
+    
+    if block_type == 'OSMHeader':
+        #Raises an error if the file needs features the reader doesn't have
+        pbf.decode_header(pbf.decompress_blob(blob))
+    
+    elif block_type == 'OSMData':
+        for record in pbf.decode_blob(blob):
+            for table, rows in shape_element(record).items():
+                chunk_rows.setdefault(table, []).extend(rows)
+    
+    return chunk_rows, offset
+    
+    
+
+def shape_element(record):
+    '''
+    Corrects and formats the data of a single node, way or relation, returning a dict wherein the keys are the 
+    names of the SQL tables described in data_wrangling_schema.sql and the values are lists of rows (lists) for 
+    that table. Returns an empty dict for any other type of tag. Rows are unique, so they can be written as-is to
+    any sink. Numeric attributes (IDs, refs, lat/lon, uid, version and changeset) are parsed into ints and floats
+    here, once, matching the column types in TableSinks.TABLE_TYPES. Elements without metadata (e.g. from the
+    metadata-stripped PBF extracts Geofabrik publishes) get an empty user and timestamp and a uid, version and
+    changeset of 0, which is what PBF uses for missing values.
+    
+    record: OSMParser.OSMElement representing a node, way or relation parent tag.
+    '''
+    
+    '''Each time a new node or way is parsed, create a new temporary list of lists
+    to contain only data about that specific node/way'''
+    temp_childTag_data = []
+    lingering_county_FIPS = None
+    attrs = record.attrs
+    
+    ####################    NODES    ######################
+
+    if record.type == 'node':
+        #REMEMBER: we need to check to see if the 'k' attrib of each tag is problematic
+            #If it is: ignore it entirely
+            #If it isn't: take only the chars after ":" (if one is present) as key and set 'type' to be
+                #the chars preceding ":"
+        
+        #dict is needed for clear input into data correction algorithm
+        nodes_dict = {'elem_type': 'node',
+                      'id': int(attrs['id']),
+                      'lat': float(attrs['lat']),
+                      'lon': float(attrs['lon']),
+                      'user': attrs.get('user', ''),
+                      'uid': int(attrs.get('uid', 0)),
+                      'version': int(attrs.get('version', 0)),
+                      'changeset': int(attrs.get('changeset', 0)),
+                      'timestamp': attrs.get('timestamp', '')}
+        
+        node = [nodes_dict['id'],
+                nodes_dict['lat'],
+                nodes_dict['lon'],
+                nodes_dict['user'],
+                nodes_dict['uid'],
+                nodes_dict['version'],
+                nodes_dict['changeset'],
+                nodes_dict['timestamp']]
+
+        #Iterate through each child tag of the node, running data correction algorithm        
+        for k, v in record.tags:
+            temp_childTag_data, lingering_county_FIPS = data_correction(k, v, nodes_dict, 
+                                                                        temp_childTag_data, 
+                                                                        lingering_county_FIPS)
+        
+        #And now, we add the entirety of the child tags for this parent tag into the nodes_tags table, minus
+        #any repeats of the same row (e.g. the same addr:state entry for the same node)
+        return {'nodes': [node],
+                'nodes_tags': unique_rows(temp_childTag_data)}
+        
+    ####################    WAYS    ######################
+    elif record.type == 'way':
+        wayID = int(attrs['id'])
+        
+        #dict is needed for clear input into data correction algorithm
+        ways_dict = {'elem_type': 'way',
+                     'id': wayID,
+                     'user': attrs.get('user', ''),
+                     'uid': int(attrs.get('uid', 0)),
+                     'version': int(attrs.get('version', 0)),
+                     'changeset': int(attrs.get('changeset', 0)),
+                     'timestamp': attrs.get('timestamp', '')}
+        
+        way = [ways_dict['id'],
+               ways_dict['user'],
+               ways_dict['uid'],
+               ways_dict['version'],
+               ways_dict['changeset'],
+               ways_dict['timestamp']]
+        
+        #Iterate through each child tag of the way, running data correction algorithm        
+        for k, v in record.tags:
+            temp_childTag_data, lingering_county_FIPS = data_correction(k, v, ways_dict, 
+                                                                        temp_childTag_data, 
+                                                                        lingering_county_FIPS)
+        
+        #Now for way_nodes:
+        ways_nodes = []
+        i = 0
+        for ref in record.nds:
+            ways_nodes.append([wayID,
+                               int(ref),
+                               i])
+            i += 1
+        
+        #way_nodes rows are unique by construction, as no two share a position
+        return {'ways': [way],
+                'ways_tags': unique_rows(temp_childTag_data),
+                'ways_nodes': ways_nodes}
+    
+    ####################    RELATIONS    ######################
+    elif record.type == 'relation':
+        relationID = int(attrs['id'])
+        
+        #dict is needed for clear input into data correction algorithm
+        relations_dict = {'elem_type': 'relation',
+                          'id': relationID,
+                          'user': attrs.get('user', ''),
+                          'uid': int(attrs.get('uid', 0)),
+                          'version': int(attrs.get('version', 0)),
+                          'changeset': int(attrs.get('changeset', 0)),
+                          'timestamp': attrs.get('timestamp', '')}
+        
+        relation = [relations_dict['id'],
+                    relations_dict['user'],
+                    relations_dict['uid'],
+                    relations_dict['version'],
+                    relations_dict['changeset'],
+                    relations_dict['timestamp']]
+        
+        #Relation tags get exactly the same correction as node/way tags
+        for k, v in record.tags:
+            temp_childTag_data, lingering_county_FIPS = data_correction(k, v, relations_dict, 
+                                                                        temp_childTag_data, 
+                                                                        lingering_county_FIPS)
+        
+        #Now for relation members (nodes, ways or other relations), keeping track of their order:
+        relations_members = []
+        i = 0
+        for member in record.members:
+            relations_members.append([relationID,
+                                      member['type'],
+                                      int(member['ref']),
+                                      member['role'],
+                                      i])
+            i += 1
+        
+        #relation_members rows are unique by construction, as no two share a position
+        return {'relations': [relation],
+                'relations_tags': unique_rows(temp_childTag_data),
+                'relations_members': relations_members}
+    
+    else:
+        return {}
+    
+    
+
+def unique_rows(rows):
+    '''
+    Returns rows with any repeats removed, keeping the first occurrence of each row and otherwise preserving order
+    (i.e. the same result as pandas' drop_duplicates). As the county/state/zip expansion in data_correction can
+    only repeat rows within a single node/way, running this on each parent tag's rows (with a seen-set only as 
+    big as that node/way) is equivalent to de-duplicating the whole table afterwards.
+    
+    rows: list of lists.
+    '''
+    seen = set()
+    uniques = []
+    
+    for row in rows:
+        row_key = tuple(row)
+        if row_key not in seen:
+            seen.add(row_key)
+            uniques.append(row)
+    
+    return uniques
+    
+    
+    
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def classify_key(k):
+    '''
+    Works out which branch of data_correction a child tag with key k belongs to, returning a tuple of the form 
+    (category, type, key) wherein category is one of PROBLEM, ZIP, COUNTY, STATE, AMENITY, STREET or GENERIC and 
+    type/key are the schema's type and key for k (e.g. 'addr:street:name' -> ('addr', 'street:name')). 
+    
+    Real extracts only have a few thousand distinct tag keys spread across many millions of tags, so results are
+    cached (up to KEY_CACHE_SIZE keys) and each tag's classification is then just a dict lookup.
+    
+    k: str. The unmodified 'k' attribute of a child tag.
+    '''
+    stripped_k = k.strip()
+    
+    if PROBLEMCHARS.search(stripped_k):
+        category = PROBLEM
+    elif audit.ZIP_RE.search(k) is not None:
+        category = ZIP
+    elif k in audit.COUNTY_KEYS:
+        category = COUNTY
+    elif k in audit.STATE_KEYS:
+        category = STATE
+    elif k in audit.AMENITY_KEYS:
+        category = AMENITY
+    elif street_audit.is_street_name(k):
+        category = STREET
+    else:
+        category = GENERIC
+    
+    if ":" in stripped_k:
+        tag_k_labels = stripped_k.split(":")
+        #Make part before ":" the type, part after ":" the key
+        return category, tag_k_labels[0], ":".join(tag_k_labels[1:])
+    else:
+        return category, 'regular', stripped_k
+    
+    
+    
+def data_correction(k, v, parent_dict, parsed_singleTag_data, county_fips_to_find=None):
     '''
     Corrects data in an individual child tag of a node or a way (excluding nd tags) and returns
     a list of dicts, each of which can be used as the nodes_tags_dict or ways_tags_dict, as appropriate. This is
@@ -169,8 +571,10 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
     lists of zip codes at times, etc.), this data correction algorithm is agnostic with respect to its 
     treatment of nodes vs. ways
     
-    elem: ET element representing a child tag of a node or way
-    parent_dict: dict that describes the parent node or way.
+    k: str. The unmodified 'k' attribute of a child tag of a node, way or relation
+    v: str. The unmodified 'v' attribute of that child tag
+    parent_dict: dict that describes the parent node, way or relation. Its 'elem_type' key says which of those
+                    it is.
     parsed_singleTag_data: list of lists. Each individual list is a row of data representing a child tag
                             of the parent singleTag (e.g. a single node or way). Since some corrections 
                             (e.g. county FIPS code translation) require context from other child tags of the 
@@ -183,22 +587,23 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                     in hand, there will be sufficient context for determining what the state is.
     '''
     
-    k = elem.attrib['k'].strip()
-    v = elem.attrib['v'].strip()
+    tag_category, tag_type, tag_key = classify_key(k)
+    k = k.strip()
+    v = v.strip()
     tag_dict = {}
     
     #Only do anything meaningful with this tag if it isn't problematic
-    if not PROBLEMCHARS.search(k):
+    if tag_category != PROBLEM:
         
         
         ############ ZIP CODES ############
         
         #Deal with the zip identified earlier that needs special attention for correction
-        if audit.isZipCode(elem):
+        if tag_category == ZIP:
             zipList = []
             
-            #latter condition checks if we're looking at a node or a way
-            if parent_dict['id'] == '2625119248' and 'lon' in parent_dict.keys():
+            #latter condition checks if we're looking at a node (rather than a way/relation with the same ID)
+            if parent_dict['id'] == 2625119248 and parent_dict['elem_type'] == 'node':
                 zipList = ['25314']
                 print("'WV' zip code corrected!")
         
@@ -234,7 +639,8 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                         for zip_code in tempList_flat:
                             zipSet.add(zip_code.strip())
                         
-                        zipList = list(zipSet)
+                        #sorted (rather than list) so that row order doesn't depend on the process' hash seed
+                        zipList = sorted(zipSet)
                         
                     else:
                         zipList = [v.strip()]
@@ -254,7 +660,7 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
         ############ COUNTIES ############
         
         #Need unique lists for counties and states, as some nodes/ways have multiple county,state entries in a list
-        elif audit.isCounty(elem):
+        elif tag_category == COUNTY:
             countySet = set()
             countyList = []
             
@@ -289,8 +695,9 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                     else:
                         countySet.add(county)
 
-                countyList = list(countySet)
-                stateList = list(stateSet)
+                #sorted (rather than list) so that row order doesn't depend on the process' hash seed
+                countyList = sorted(countySet)
+                stateList = sorted(stateSet)
                 
                 #Need to make sure, if we've found the county name on its own, we don't keep trying to map the FIPS
                 county_fips_to_find = None
@@ -308,7 +715,7 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
             elif v.isdigit():
                 #No need to worry, county is fully described as 5-digit FIPS code
                 if len(v) == 5:
-                    countyList = [fips.FIPS_to_Name('../2010_FIPSCodes.csv', v, state_name = None)]
+                    countyList = [fips.FIPS_to_Name(CENSUS_FILE, v, state_name = None)]
                 
                 #Now we need to worry about what the state is so we can get the county
                 else:
@@ -327,7 +734,7 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                         #if we have a state to use and we haven't found any earlier, great!
                         elif 'state' in row and not statesFound:
                             #row[2] corresponds to 'value' in our schema
-                            countyList = [fips.FIPS_to_Name('../2010_FIPSCodes.csv', v, state_name = row[2])]
+                            countyList = [fips.FIPS_to_Name(CENSUS_FILE, v, state_name = row[2])]
                             statesFound.append(row[2])
                             
                         #Is there more than one unique state associated with this node/way? Not good.
@@ -388,12 +795,13 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                 
         ############ STATES ############
 
-        elif audit.isState(elem):
+        elif tag_category == STATE:
             stateName = None
             countyName = None
             
-            #Find the way that incorrectly has CA. Latter condition checks to make sure we're not looking at a node
-            if parent_dict['id'] == '398603731' and 'lon' not in parent_dict.keys():
+            #Find the way that incorrectly has CA. Latter condition checks to make sure we're not looking at a 
+            #node/relation
+            if parent_dict['id'] == 398603731 and parent_dict['elem_type'] == 'way':
                 stateName = 'WV'
             
             #If the state name isn't numerical (therefore not a FIPS) 
@@ -402,7 +810,7 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
             
             #If the value is a state FIPS
             elif v.isdigit():
-                stateName = fips.FIPS_to_Name('../2010_FIPSCodes.csv', v)
+                stateName = fips.FIPS_to_Name(CENSUS_FILE, v)
             
             #####
             
@@ -415,7 +823,7 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                         break
                 
                 if countyName != 'Unidentifiable (FIPS ambiguity)':
-                    countyName = fips.FIPS_to_Name('../2010_FIPSCodes.csv', county_fips_to_find, state_name = stateName)
+                    countyName = fips.FIPS_to_Name(CENSUS_FILE, county_fips_to_find, state_name = stateName)
             
             ### APPENDING STATE DATA ###
             if stateName:
@@ -432,7 +840,7 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
         
         
         ############ AMENITIES/SHOPS ############
-        elif audit.isAmenity(elem):
+        elif tag_category == AMENITY:
             if k == 'amenity' and v == 'ATV Trails':
                 parsed_singleTag_data.append([parent_dict['id'],
                                               'amenity',
@@ -450,20 +858,20 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
                                               v,
                                               'regular'])
             
+        
+        ############ STREET NAMES ############
+        elif tag_category == STREET:
+            #Idealize the street type (e.g. 'Braddock Rd.' -> 'Braddock Road'), as found by StreetTypeAudit
+            parsed_singleTag_data.append([parent_dict['id'],
+                                          tag_key,
+                                          street_audit.normalize_street_name(v),
+                                          tag_type])
+            
             
         ############ ALL OTHER TAG TYPES ############
         else:
-            tag_dict = {'value': v, 'id': parent_dict['id']}
-        
-        
-            if ":" in k:
-                tag_k_labels = k.split(":")
-                #Make part before ":" the type, part after ":" the key
-                tag_dict['type'] = tag_k_labels[0]
-                tag_dict['key'] = ":".join(tag_k_labels[1:])
-            else:
-                tag_dict['type'] = 'regular'
-                tag_dict['key'] = k
+            #type/key split was already worked out (and cached) by classify_key
+            tag_dict = {'value': v, 'id': parent_dict['id'], 'type': tag_type, 'key': tag_key}
             
             parsed_singleTag_data.append([tag_dict['id'],
                                           tag_dict['key'],
@@ -484,5 +892,6 @@ def data_correction(elem, parent_dict, parsed_singleTag_data, county_fips_to_fin
 
 
 ######## MAIN EXECUTION SPACE ########
-correct_and_record(OSMFILE) 
+if __name__ == "__main__":
+    correct_and_record(OSMFILE) 
     
\ No newline at end of file
@@ -6,7 +6,7 @@ Created on Jan 21, 2018
 This module uses a CSV data file download from the US Census Bureau for 2010 FIPS codes to take a FIPS code for a
 state or county and return the name of that state or county.
 '''
-import pandas as pd
+import csv
 
 #CSV columns organized as: StateName (2-letter); State_FIPS (2-digit); County_FIPS (3-digit); County_Name; FIPS_Class
 #NOTE: the full FIPS code for a county is structured with the State_FIPS followed by County_FIPS, making a 5-digit #
@@ -25,11 +25,80 @@ C7:  identifies an incorporated place that is an independent city; that is, it a
 ''' 
 
 
-#NOTE: it's possible that there will be a string encoding issue when you pass the names back to the 
-#correction and exporting algorithm. If necessary, use encoding='utf-8' as an arg
+class FIPSResolver(object):
+    '''
+    Loads the Census FIPS code file a single time and indexes it with dicts so that each lookup is O(1), rather than
+    re-reading and filtering the whole file every time a code needs translating.
+    
+    Indexes built:
+        states: state FIPS (2-digit) -> state name (2-letter)
+        counties_by_state_name: (state name, county FIPS) -> county name
+        counties_by_state_FIPS: (state FIPS, county FIPS) -> county name
+        counties_by_full_FIPS: full county FIPS (5-digit) -> county name
+    '''
+    
+    def __init__(self, census_filepath):
+        '''
+        census_filepath: str. Filepath, including filename and extension, for Census data file with FIPS codes.
+        '''
+        self.states = {}
+        self.counties_by_state_name = {}
+        self.counties_by_state_FIPS = {}
+        self.counties_by_full_FIPS = {}
+        
+        with open(census_filepath, 'r', newline='') as fileIn:
+            for state_name, state_FIPS, county_FIPS, county_name, _ in csv.reader(fileIn):
+                #setdefault() keeps the first row seen for each key, same as taking the first row of a filter
+                self.states.setdefault(state_FIPS, state_name)
+                self.counties_by_state_name.setdefault((state_name, county_FIPS), county_name)
+                self.counties_by_state_FIPS.setdefault((state_FIPS, county_FIPS), county_name)
+                self.counties_by_full_FIPS.setdefault(state_FIPS + county_FIPS, county_name)
+    
+    
+    def FIPS_to_Name(self, FIPS_code, state_name=None, state_FIPS=None):
+        '''
+        Takes a FIPS code for a state or county and returns the name of that state (2-letter) or county 
+        (with any "County" suffix removed). See the module-level FIPS_to_Name for details on the args. 
+        Raises KeyError if the code isn't in the Census file.
+        '''
+        digits = len(FIPS_code)
+        
+        if digits == 2:
+            return self.states[FIPS_code]
+        
+        #must have a state name or FIPS code in order to pull the county with only 3 digits available
+        elif digits == 3 and (state_name or state_FIPS):
+            if state_name:
+                return removeCountySuffix(self.counties_by_state_name[(state_name, FIPS_code)])
+            else:
+                return removeCountySuffix(self.counties_by_state_FIPS[(state_FIPS, FIPS_code)])
+            
+        elif digits == 5:
+            return removeCountySuffix(self.counties_by_full_FIPS[FIPS_code])
+        
+        else:
+            return None
+    
+    
+#One resolver per Census file, built the first time that file is asked for
+_resolvers = {}
+
+def get_resolver(census_filepath):
+    '''
+    Returns the FIPSResolver for census_filepath, only loading the file the first time it's requested.
+    
+    census_filepath: str. Filepath, including filename and extension, for Census data file with FIPS codes.
+    '''
+    if census_filepath not in _resolvers:
+        _resolvers[census_filepath] = FIPSResolver(census_filepath)
+    
+    return _resolvers[census_filepath]
+
+
 def FIPS_to_Name(census_filepath, FIPS_code, state_name=None, state_FIPS=None):
     '''
-    Takes a FIPS code for a state or county and returns a tuple of the form (county_name,state_name)
+    Takes a FIPS code for a state or county and returns the name of that state (2-letter) or county. The Census 
+    file is only read the first time it is used; every call after that is a dict lookup (see FIPSResolver).
     
     census_filepath: str. Filepath, including filename and extension, for Census data file with FIPS codes.
     FIPS_code: str. FIPS code (including leading zeroes) of a state or county. 
@@ -44,38 +113,7 @@ def FIPS_to_Name(census_filepath, FIPS_code, state_name=None, state_FIPS=None):
     state_FIPS: str. This is the two-digit FIPS code for a state. Use this arg if you expect to be providing
                 a 3-digit county code and therefore need to provide the state as a reference.
     '''
-    census_df = pd.read_csv(census_filepath, header=None, dtype = 'str', names=['State_Name',
-                                                                                    'State_FIPS',
-                                                                                    'County_FIPS',
-                                                                                    'County_Name',
-                                                                                    'FIPS_Class_Code'])
-    
-    digits = len(FIPS_code)
-    #print("FIPS code value input = {}, state_name = {}, and state_FIPS = {}\n\n".format(FIPS_code, state_name,state_FIPS))
-    if digits == 2:
-        #need to return row index of the first row wherein FIPS matches the code given
-        census_df_oneState = census_df[census_df['State_FIPS'] == FIPS_code]
-        return census_df_oneState['State_Name'].tolist()[0]
-    
-    #must have a state name or FIPS code in order to pull the county with only 3 digits available
-    elif digits == 3 and (state_name or state_FIPS):
-        if state_name:
-            census_df_oneState = census_df[census_df['State_Name'] == state_name]
-            
-        else:
-            census_df_oneState = census_df[census_df['State_FIPS'] == state_FIPS]
-            
-        census_df_oneCounty = census_df_oneState[census_df_oneState['County_FIPS'] == FIPS_code]
-        return removeCountySuffix(census_df_oneCounty['County_Name'].values[0])
-        
-    elif digits == 5:
-        census_df_oneState = census_df[census_df['State_FIPS'] == FIPS_code[:2]]
-        census_df_oneCounty = census_df_oneState[census_df_oneState['County_FIPS'] == FIPS_code[2:]]
-        
-        return removeCountySuffix(census_df_oneCounty['County_Name'].values[0])
-    
-    else:
-        return None
+    return get_resolver(census_filepath).FIPS_to_Name(FIPS_code, state_name, state_FIPS)
     
     
 
@@ -0,0 +1,277 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module keeps the coordinates of every node in an OSM file in a compact, array-backed store, so that way
+geometries (and from them way lengths and centroids) can be worked out without going back to the XML or joining
+ways_nodes to nodes in SQL.
+
+Nodes are appended to flat int64 (id) and float64 (lat, lon) arrays as they're parsed - 24 bytes per node, rather
+than the hundreds a dict of Python objects would take - and then sorted by id once, after which any set of node IDs
+is resolved with a single vectorized binary search (numpy.searchsorted). For extracts too large to comfortably hold
+in memory, the store can be backed by files on disk, which are memory-mapped once parsing is done and can be
+re-opened later without parsing the OSM file again.
+
+Usage:
+    store = NodeStore()
+    correct_and_record(osm_file, node_store=store)    #or store = build_node_store(osm_file)
+    store.finalize()
+    store.way_length(['261114294', '261114295'])
+'''
+from array import array
+import os
+
+import numpy as np
+
+import OSMParser as parser
+
+
+#Mean radius of the Earth in meters (IUGG), used for great-circle distances
+EARTH_RADIUS = 6371008.8
+
+#Number of nodes buffered in memory before they're appended to the store's files (disk-backed stores only)
+SPILL_SIZE = 1000000
+
+ID_FILE = 'node_ids.bin'
+COORD_FILE = 'node_coords.bin'
+
+
+class NodeStore(object):
+    '''
+    Maps node IDs to (lat, lon). Nodes are added (in any order) with add()/add_rows(), after which finalize() must be
+    called before any lookups are made. No more nodes can be added once the store is finalized.
+    '''
+
+    def __init__(self, path=None, spill_size=SPILL_SIZE):
+        '''
+        path: str. Directory for a disk-backed store, whose files are memory-mapped once finalized (see open()). If
+                None, the store is held entirely in memory.
+        spill_size: int. Number of nodes buffered in memory before being appended to the files in path.
+        '''
+        self.path = path
+        self.spill_size = spill_size
+
+        self._ids = array('q')
+        self._coords = array('d')
+
+        #Set by finalize(): sorted int64 IDs and a matching (n, 2) float64 array of lat, lon
+        self.ids = None
+        self.coords = None
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            for filename in [ID_FILE, COORD_FILE]:
+                open(os.path.join(path, filename), 'wb').close()
+
+
+    @classmethod
+    def open(cls, path):
+        '''
+        Returns a finalized, read-only NodeStore memory-mapped from the files of a disk-backed store built earlier.
+
+        path: str. Directory the store was built in.
+        '''
+        store = cls()
+        store.path = path
+        store.ids = np.memmap(os.path.join(path, ID_FILE), dtype=np.int64, mode='r')
+        store.coords = np.memmap(os.path.join(path, COORD_FILE), dtype=np.float64, mode='r').reshape(-1, 2)
+
+        return store
+
+
+    def __len__(self):
+        if self.ids is None:
+            return len(self._ids)
+        return len(self.ids)
+
+
+    def add(self, node_id, lat, lon):
+        '''
+        Adds a single node. IDs, latitudes and longitudes may be given as str (as they are in the XML).
+        '''
+        self._ids.append(int(node_id))
+        self._coords.append(float(lat))
+        self._coords.append(float(lon))
+
+        if self.path is not None and len(self._ids) >= self.spill_size:
+            self._spill()
+
+
+    def add_rows(self, rows):
+        '''
+        Adds the nodes in a list of rows for the nodes table (i.e. [id, lat, lon, ...], as returned by
+        DataCorrection_and_CSVExport.shape_element).
+        '''
+        for row in rows:
+            self.add(row[0], row[1], row[2])
+
+
+    def _spill(self):
+        '''
+        Appends the buffered nodes to the store's files and empties the buffers.
+        '''
+        with open(os.path.join(self.path, ID_FILE), 'ab') as fileOut:
+            self._ids.tofile(fileOut)
+        with open(os.path.join(self.path, COORD_FILE), 'ab') as fileOut:
+            self._coords.tofile(fileOut)
+
+        self._ids = array('q')
+        self._coords = array('d')
+
+
+    def finalize(self):
+        '''
+        Sorts the store by node ID so that it can be searched. OSM files are normally already sorted by ID, in which
+        case no sorting (or copying) is needed. If a node ID was added more than once, the last one added wins.
+        '''
+        if self.path is None:
+            ids = np.frombuffer(self._ids, dtype=np.int64)
+            coords = np.frombuffer(self._coords, dtype=np.float64).reshape(-1, 2)
+        else:
+            self._spill()
+            ids = np.memmap(os.path.join(self.path, ID_FILE), dtype=np.int64, mode='r+')
+            coords = np.memmap(os.path.join(self.path, COORD_FILE), dtype=np.float64, mode='r+').reshape(-1, 2)
+
+        if len(ids) > 1 and not np.all(ids[1:] > ids[:-1]):
+            #A stable sort keeps repeated IDs in the order they were added, so keeping the last of each run of
+            #repeats keeps the most recently added coordinates
+            order = np.argsort(ids, kind='stable')
+            ids = ids[order]
+            coords = coords[order]
+
+            keep = np.append(ids[1:] != ids[:-1], True)
+            ids = ids[keep]
+            coords = coords[keep]
+
+            if self.path is not None:
+                self._rewrite(ids, coords)
+                reopened = self.open(self.path)
+                ids, coords = reopened.ids, reopened.coords
+
+        self.ids = ids
+        self.coords = coords
+
+
+    def _rewrite(self, ids, coords):
+        '''
+        Replaces the contents of the store's files with ids and coords.
+        '''
+        ids.tofile(os.path.join(self.path, ID_FILE))
+        coords.tofile(os.path.join(self.path, COORD_FILE))
+
+
+    def lookup(self, node_ids):
+        '''
+        Returns an (n, 2) float64 array of the lat, lon of each of the n node_ids, with NaN for any IDs not in the
+        store.
+
+        node_ids: iterable of int or str. IDs of the nodes of interest.
+        '''
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        result = np.full((len(node_ids), 2), np.nan)
+
+        if len(self.ids) == 0 or len(node_ids) == 0:
+            return result
+
+        positions = np.searchsorted(self.ids, node_ids)
+        positions[positions == len(self.ids)] = 0
+        found = self.ids[positions] == node_ids
+        result[found] = self.coords[positions[found]]
+
+        return result
+
+
+    def way_geometry(self, node_refs):
+        '''
+        Returns an (n, 2) float64 array of the lat, lon of each node along a way, in order, leaving out any nodes
+        that aren't in the store (e.g. those outside the bounds of the extract).
+
+        node_refs: list of int or str. IDs of the way's nodes, in order (i.e. its nd refs or ways_nodes.node_id).
+        '''
+        coords = self.lookup(node_refs)
+
+        return coords[~np.isnan(coords[:, 0])]
+
+
+    def way_length(self, node_refs):
+        '''
+        Returns the length of a way in meters, i.e. the sum of the great-circle (haversine) distances between each
+        of its consecutive nodes. Nodes not in the store are skipped over.
+
+        node_refs: list of int or str. IDs of the way's nodes, in order.
+        '''
+        coords = np.radians(self.way_geometry(node_refs))
+
+        if len(coords) < 2:
+            return 0.0
+
+        lat, lon = coords[:, 0], coords[:, 1]
+        a = (np.sin(np.diff(lat) / 2) ** 2 +
+             np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+
+        return float(np.sum(2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))))
+
+
+    def way_centroid(self, node_refs):
+        '''
+        Returns a tuple of the form (lat, lon) for the mean position of a way's nodes, counting the closing node of a
+        closed way (e.g. a building outline) only once. Returns (None, None) if none of its nodes are in the store.
+
+        node_refs: list of int or str. IDs of the way's nodes, in order.
+        '''
+        if len(node_refs) > 1 and node_refs[0] == node_refs[-1]:
+            node_refs = node_refs[:-1]
+
+        coords = self.way_geometry(node_refs)
+
+        if len(coords) == 0:
+            return None, None
+
+        lat, lon = coords.mean(axis=0)
+        return float(lat), float(lon)
+
+
+
+def build_node_store(osm_file, path=None, backend=None):
+    '''
+    Reads every node in an OSM file into a new, finalized NodeStore. To fill a store during correction instead,
+    pass it to DataCorrection_and_CSVExport.correct_and_record as node_store.
+
+    osm_file: str. Filepath for the OSM file of interest.
+    path: str. Directory for a disk-backed store (see NodeStore), or None to keep the store in memory.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    store = NodeStore(path)
+
+    for record in parser.iter_records(osm_file, ('node',), backend):
+        store.add(record.attrs['id'], record.attrs['lat'], record.attrs['lon'])
+
+    store.finalize()
+    return store
+
+
+
+def iter_way_metrics(osm_file, store, backend=None):
+    '''
+    Yields a tuple of the form (way ID, length in meters, centroid lat, centroid lon, number of nodes found in store)
+    for every way in an OSM file.
+
+    osm_file: str. Filepath for the OSM file of interest.
+    store: finalized NodeStore holding (at least) the nodes of osm_file.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    for record in parser.iter_records(osm_file, ('way',), backend):
+        lat, lon = store.way_centroid(record.nds)
+
+        yield (record.attrs['id'], store.way_length(record.nds), lat, lon, len(store.way_geometry(record.nds)))
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    OSMFILE = '../test_osm.osm'
+
+    node_store = build_node_store(OSMFILE)
+    for metrics in iter_way_metrics(OSMFILE, node_store):
+        print(metrics)
@@ -0,0 +1,398 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module is the one place OSM XML gets parsed. Every other module asks it for a stream of OSMElement records - a
+plain (type, attrs, tags, nds, members) tuple per node/way/relation - instead of walking ElementTree elements itself,
+so the parser doing the work can be swapped at runtime without touching any of the auditing or correcting code.
+
+Available backends (see BACKENDS):
+    'expat': drives the expat parser from the standard library directly, building only the records (no Element
+                objects, attribute proxies or tree to clear). This is the default and the fastest.
+    'etree': xml.etree.ElementTree.iterparse, clearing the tree as it goes. The original approach of this project.
+    'lxml': lxml.etree.iterparse, in the same manner as 'etree'. Only available if lxml is installed.
+
+Benchmarks.py times each available backend against the others.
+
+Files compressed with bzip2, gzip or xz (e.g. the .osm.bz2 extracts from Geofabrik) can be read directly: see 
+open_osm, which every reader of OSM files uses to open them. PBF files (.osm.pbf) are handed over to PBFReader.py, 
+which produces the same records.
+'''
+import bz2
+from collections import namedtuple
+import gzip
+import importlib.util
+import io
+import lzma
+import queue
+import threading
+from xml.sax.saxutils import quoteattr
+import xml.parsers.expat
+
+
+#A single top-level OSM element:
+#    type: str. 'node', 'way' or 'relation' (or the name of any other element asked for, e.g. 'bounds' or 'create').
+#    attrs: dict of str. The element's XML attributes (id, lat, lon, user, etc.).
+#    tags: list of tuples of the form (k, v), one per child tag.
+#    nds: list of str. The ref of each child nd, in order (ways only).
+#    members: list of dicts. The attributes (type, ref, role) of each child member, in order (relations only).
+OSMElement = namedtuple('OSMElement', ['type', 'attrs', 'tags', 'nds', 'members'])
+
+#Element types whose children are gathered into their records
+ENTITY_TYPES = ('node', 'way', 'relation')
+
+DEFAULT_BACKEND = 'expat'
+
+#Number of bytes handed to the parser at a time
+BLOCK_SIZE = 2**16
+
+#Leading bytes of each supported compressed file format and the function that opens that format for reading
+COMPRESSION_FORMATS = [(b'BZh', bz2.open),
+                       (b'\x1f\x8b', gzip.open),
+                       (b'\xfd7zXZ\x00', lzma.open)]
+
+#Number of bytes decompressed at a time by a BackgroundReader, and the number of those blocks it may get ahead
+DECOMPRESS_BLOCK_SIZE = 2**20
+DECOMPRESS_READAHEAD = 8
+
+
+class BackgroundReader(object):
+    '''
+    Wraps a decompressing file object (e.g. a bz2.BZ2File), decompressing it in a background thread so that the 
+    next blocks are being decompressed while the current ones are being parsed. The bz2, zlib and lzma 
+    decompressors release the GIL while they work, so the two really do run at the same time. Only reading (and 
+    seeking forwards) is supported.
+    '''
+
+    def __init__(self, fileIn, block_size=DECOMPRESS_BLOCK_SIZE, readahead=DECOMPRESS_READAHEAD):
+        '''
+        fileIn: file object (opened in binary mode) to read from.
+        block_size: int. Number of bytes read from fileIn at a time.
+        readahead: int. Max number of blocks held, decompressed, waiting to be read.
+        '''
+        self.fileIn = fileIn
+        self.block_size = block_size
+        self.blocks = queue.Queue(readahead)
+        self.buffer = b''
+        self.position = 0
+        self.finished = False
+        self.error = None
+        self.stopping = threading.Event()
+
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+
+    def _fill(self):
+        '''
+        Runs in the background thread, queueing up blocks of fileIn until it's exhausted (signalled by an empty 
+        block) or the reader is closed. Any exception raised is passed on to be re-raised by read() (every time it's
+        called from then on, since the thread has stopped and nothing more will be queued).
+        '''
+        try:
+            while not self.stopping.is_set():
+                block = self.fileIn.read(self.block_size)
+                self._put(block)
+                if not block:
+                    return
+        except Exception as error:
+            self._put(error)
+
+
+    def _put(self, item):
+        while not self.stopping.is_set():
+            try:
+                self.blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            if self.error is not None:
+                raise self.error
+            block = self.blocks.get()
+            if isinstance(block, Exception):
+                self.error = block
+                raise block
+            if not block:
+                self.finished = True
+            self.buffer += block
+
+        if size < 0:
+            size = len(self.buffer)
+
+        data = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        self.position += len(data)
+
+        return data
+
+
+    def tell(self):
+        return self.position
+
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        '''
+        Moves forward to offset (in decompressed bytes) by reading up to it. Moving backwards isn't supported.
+        '''
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('BackgroundReader can only seek relative to the start or current position')
+        if offset < self.position:
+            raise io.UnsupportedOperation('BackgroundReader can only seek forwards')
+
+        while self.position < offset:
+            if not self.read(min(offset - self.position, self.block_size)):
+                break
+
+        return self.position
+
+
+    def close(self):
+        self.stopping.set()
+        self.thread.join()
+        self.fileIn.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+def open_osm(filepath, background=True):
+    '''
+    Opens an OSM (or osmChange) file for reading in binary mode. Files compressed with bzip2, gzip or xz are 
+    recognized from their first few bytes (regardless of their file extension) and decompressed as they're read,
+    so there's no need to decompress them to disk first. Multi-stream files (e.g. from pbzip2) are read in full.
+    
+    filepath: str. Filepath for the OSM file of interest.
+    background: bool. If True, compressed files are decompressed in a background thread (see BackgroundReader),
+                overlapping decompression with parsing. The returned file object then can't seek backwards.
+    '''
+    with open(filepath, 'rb') as fileIn:
+        magic = fileIn.read(6)
+
+    for prefix, opener in COMPRESSION_FORMATS:
+        if magic.startswith(prefix):
+            fileIn = opener(filepath, 'rb')
+            return BackgroundReader(fileIn) if background else fileIn
+
+    return open(filepath, 'rb')
+
+
+def iter_expat(fileIn, types=ENTITY_TYPES):
+    '''
+    expat backend for iter_records (see there for arguments).
+    '''
+    entity_types = frozenset(ENTITY_TYPES)
+    wanted = None if types is None else frozenset(types)
+    finished = []
+    current = None
+
+    def start(name, attrs):
+        nonlocal current
+
+        if current is not None:
+            if name == 'tag':
+                current.tags.append((attrs['k'], attrs['v']))
+            elif name == 'nd':
+                current.nds.append(attrs['ref'])
+            elif name == 'member':
+                current.members.append(attrs)
+
+        elif name in entity_types:
+            current = OSMElement(name, attrs, [], [], [])
+
+        #Anything else (e.g. <osm>, <bounds>, or <create> in an osmChange file) is recorded as soon as it starts
+        elif wanted is None or name in wanted:
+            finished.append(OSMElement(name, attrs, [], [], []))
+
+    def end(name):
+        nonlocal current
+
+        if current is not None and name == current.type:
+            if wanted is None or name in wanted:
+                finished.append(current)
+            current = None
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.buffer_text = True
+
+    for block in iter(lambda: fileIn.read(BLOCK_SIZE), b''):
+        parser.Parse(block, False)
+        if finished:
+            yield from finished
+            del finished[:]
+
+    parser.Parse(b'', True)
+    yield from finished
+
+
+
+def _iter_iterparse(context, types):
+    '''
+    Shared by the etree and lxml backends, which have the same iterparse API. Records are built from each element
+    at its 'end' event (or 'start', for elements other than nodes/ways/relations), after which the element is removed
+    from the tree, so the tree never holds more than the element currently being parsed.
+    
+    context: iterator of (event, element) tuples from an iterparse with events=('start', 'end').
+    '''
+    wanted = None if types is None else frozenset(types)
+    open_elements = []
+    depth = 0
+
+    for event, elem in context:
+        tag = elem.tag
+
+        if event == 'start':
+            if depth == 0 and tag not in ENTITY_TYPES and (wanted is None or tag in wanted):
+                yield OSMElement(tag, dict(elem.attrib), [], [], [])
+            if tag in ENTITY_TYPES:
+                depth += 1
+            open_elements.append(elem)
+            continue
+
+        open_elements.pop()
+
+        if tag in ENTITY_TYPES:
+            depth -= 1
+            if depth == 0:
+                if wanted is None or tag in wanted:
+                    yield OSMElement(tag, dict(elem.attrib),
+                                     [(child.get('k'), child.get('v')) for child in elem.iter('tag')],
+                                     [child.get('ref') for child in elem.iter('nd')],
+                                     [dict(child.attrib) for child in elem.iter('member')])
+
+                #We're done with this element, so free up the memory its subtree was using
+                elem.clear()
+                if open_elements:
+                    open_elements[-1].remove(elem)
+
+
+def iter_etree(fileIn, types=ENTITY_TYPES):
+    '''
+    etree backend for iter_records (see there for arguments).
+    '''
+    import xml.etree.ElementTree as ET
+
+    return _iter_iterparse(ET.iterparse(fileIn, events=('start', 'end')), types)
+
+
+def iter_lxml(fileIn, types=ENTITY_TYPES):
+    '''
+    lxml backend for iter_records (see there for arguments).
+    '''
+    from lxml import etree
+
+    return _iter_iterparse(etree.iterparse(fileIn, events=('start', 'end')), types)
+
+
+
+BACKENDS = {'expat': iter_expat,
+            'etree': iter_etree,
+            'lxml': iter_lxml}
+
+
+def available_backends():
+    '''
+    Returns the names of the backends that can be used in this environment.
+    '''
+    available = ['expat', 'etree']
+
+    if importlib.util.find_spec('lxml') is not None:
+        available.append('lxml')
+
+    return available
+
+
+def iter_records(fileIn, types=ENTITY_TYPES, backend=None):
+    '''
+    Yields an OSMElement for each top-level element of the given type(s) in an OSM (or osmChange) file, in file
+    order. Nodes, ways and relations are yielded once fully parsed, with all of their child tags, nds and members;
+    any other element asked for is yielded (without children) as soon as it starts, so e.g. the <create>/<modify>/
+    <delete> around a group of elements in an osmChange file comes before the elements themselves.
+
+    fileIn: file object (opened in binary mode) or str filepath for the OSM file of interest, which may be
+            compressed (see open_osm). If given as a filepath, it may also be a PBF file (see PBFReader.py).
+    types: tuple of str. Element types to yield, or None for every top-level element (including <osm> itself).
+    backend: str. Name of the parser backend to use (a key of BACKENDS). Defaults to DEFAULT_BACKEND. Not used for
+            PBF files.
+    '''
+    #PBFReader imports this module, so it's only imported once it's needed
+    import PBFReader
+
+    parse = BACKENDS[backend or DEFAULT_BACKEND]
+
+    if isinstance(fileIn, str) and PBFReader.is_pbf(fileIn):
+        yield from PBFReader.iter_pbf(fileIn, types)
+    elif isinstance(fileIn, str):
+        with open_osm(fileIn) as osm_file:
+            yield from parse(osm_file, types)
+    else:
+        yield from parse(fileIn, types)
+
+
+def records_from_bytes(xml_bytes, types=ENTITY_TYPES, backend=None):
+    '''
+    Same as iter_records, for OSM XML already held in memory.
+
+    xml_bytes: bytes. UTF-8 encoded XML of a complete document.
+    '''
+    return iter_records(io.BytesIO(xml_bytes), types, backend)
+
+
+
+def count_elements(fileIn, backend=None):
+    '''
+    Returns a dict counting how many XML elements of each type (osm, bounds, node, tag, nd, etc.) are in an OSM file.
+
+    fileIn: file object (opened in binary mode) or str filepath for the OSM file of interest.
+    backend: str. Name of the parser backend to use.
+    '''
+    counts = {}
+
+    for record in iter_records(fileIn, None, backend):
+        counts[record.type] = counts.get(record.type, 0) + 1
+
+        for child_type, children in [('tag', record.tags), ('nd', record.nds), ('member', record.members)]:
+            if children:
+                counts[child_type] = counts.get(child_type, 0) + len(children)
+
+    return counts
+
+
+
+def to_xml(record, indent='  '):
+    '''
+    Returns the XML (as UTF-8 encoded bytes) for a node/way/relation record, in the layout used by OSM extracts.
+
+    record: OSMElement.
+    indent: str. Indentation of the element itself; its children are indented by two more spaces.
+    '''
+    def attributes(attrs):
+        return ''.join(' {}={}'.format(name, quoteattr(value)) for name, value in attrs.items())
+
+    children = ([('tag', {'k': k, 'v': v}) for k, v in record.tags] +
+                [('nd', {'ref': ref}) for ref in record.nds] +
+                [('member', member) for member in record.members])
+
+    if not children:
+        return '{}<{}{}/>\n'.format(indent, record.type, attributes(record.attrs)).encode('utf-8')
+
+    lines = ['{}<{}{}>\n'.format(indent, record.type, attributes(record.attrs))]
+    for child_type, child_attrs in children:
+        lines.append('{}  <{}{}/>\n'.format(indent, child_type, attributes(child_attrs)))
+    lines.append('{}</{}>\n'.format(indent, record.type))
+
+    return ''.join(lines).encode('utf-8')
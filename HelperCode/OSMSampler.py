@@ -0,0 +1,253 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module makes smaller sample files (e.g. test fixtures) from a large OSM extract. Any number of samplers can be
+run over the extract together, each choosing its own elements from the same pass through the file:
+
+    EveryKthSampler: every k-th element (the original approach of SampleMapData_Small.py)
+    ReservoirSampler: a uniformly random, fixed-size sample, either across all element types or with a fixed number
+                        of each type (stratified), optionally restricted to a bounding box
+
+Samplers only ever hold the elements they've chosen so far, so memory use depends on the size of the samples and
+not on the size of the extract. The one exception is the bounding box filter, which remembers the IDs of the nodes
+(and ways) found inside the box so that the ways (and relations) using them can be recognized as inside it too.
+
+Since nodes come before the ways that use them in an OSM file, a sampled way's nodes have already gone by (and
+mostly not been sampled) by the time the way is chosen. To keep samples referentially complete, the nodes of every
+sampled way are fetched in a second pass, which is shared by all of the samplers. Members of sampled relations are
+not fetched.
+
+Usage:
+    samplers = {'../sample_1000.osm': ReservoirSampler(1000, seed=1),
+                '../sample_by_type.osm': ReservoirSampler({'node': 500, 'way': 200, 'relation': 20}, seed=1),
+                '../sample_bbox.osm': ReservoirSampler(1000, bbox=(37.7, -81.3, 37.8, -81.1), seed=1)}
+    write_samples('../SW_WestVirginia.osm', samplers)
+'''
+from abc import ABC, abstractmethod
+import random
+
+import OSMParser as parser
+
+
+class Sampler(ABC):
+    '''
+    Base class for all samplers. Subclasses implement choose(), which is offered every element that passes the
+    filters (in file order) along with its position in the file, and chosen(), which returns a list of
+    (position, record) tuples for the elements chosen.
+    '''
+
+    def __init__(self, types=parser.ENTITY_TYPES, tagged_only=False, bbox=None):
+        '''
+        types: tuple of str. Element types that may be sampled.
+        tagged_only: bool. If True, elements without any child tags are never sampled.
+        bbox: tuple of the form (min_lat, min_lon, max_lat, max_lon), or None. If given, only nodes inside the box,
+                ways with at least one node inside it and relations with at least one such node or way as a member
+                are sampled.
+        '''
+        self.types = frozenset(types)
+        self.tagged_only = tagged_only
+        self.bbox = bbox
+
+        #IDs of the nodes and ways inside bbox seen so far
+        self.inside = {'node': set(), 'way': set()}
+
+
+    def in_bbox(self, record):
+        '''
+        Returns True if record is inside the sampler's bounding box (see __init__), remembering it if it's a node or
+        way.
+        '''
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+
+        if record.type == 'node':
+            inside = (min_lat <= float(record.attrs['lat']) <= max_lat and
+                      min_lon <= float(record.attrs['lon']) <= max_lon)
+        elif record.type == 'way':
+            inside_nodes = self.inside['node']
+            inside = any(ref in inside_nodes for ref in record.nds)
+        else:
+            inside = any(member['ref'] in self.inside.get(member['type'], ()) for member in record.members)
+
+        if inside and record.type in self.inside:
+            self.inside[record.type].add(record.attrs['id'])
+
+        return inside
+
+
+    def offer(self, record, position):
+        '''
+        Passes record on to choose() if it is of a type being sampled and passes the sampler's filters.
+
+        record: OSMParser.OSMElement.
+        position: int. Index of record among all of the elements in the file.
+        '''
+        if self.bbox is not None and not self.in_bbox(record):
+            return
+        if record.type not in self.types or (self.tagged_only and not record.tags):
+            return
+
+        self.choose(record, position)
+
+
+    @abstractmethod
+    def choose(self, record, position):
+        pass
+
+
+    @abstractmethod
+    def chosen(self):
+        pass
+
+
+
+class EveryKthSampler(Sampler):
+    '''
+    Chooses every k-th element offered, starting with the first.
+    '''
+
+    def __init__(self, k, types=parser.ENTITY_TYPES, tagged_only=True, bbox=None):
+        '''
+        k: int. Sampling interval.
+        Other arguments are as for Sampler.
+        '''
+        Sampler.__init__(self, types, tagged_only, bbox)
+        self.k = k
+        self.offered = 0
+        self.sample = []
+
+    def choose(self, record, position):
+        if self.offered % self.k == 0:
+            self.sample.append((position, record))
+        self.offered += 1
+
+    def chosen(self):
+        return list(self.sample)
+
+
+
+class ReservoirSampler(Sampler):
+    '''
+    Chooses a uniformly random sample of a fixed size from everything offered, using reservoir sampling (Vitter's
+    Algorithm R), so the total number of elements doesn't need to be known in advance. If size is a dict, each
+    element type gets its own reservoir of the given size (i.e. the sample is stratified by type).
+    '''
+
+    def __init__(self, size, types=parser.ENTITY_TYPES, tagged_only=False, bbox=None, seed=None):
+        '''
+        size: int, or dict mapping element types to int. Number of elements to sample, in total or of each type.
+        seed: int. Seed for the random number generator, so that samples can be reproduced.
+        Other arguments are as for Sampler. If size is a dict, only the types in it are sampled.
+        '''
+        if isinstance(size, dict):
+            types = tuple(size)
+            self.sizes = dict(size)
+        else:
+            self.sizes = {None: size}
+
+        Sampler.__init__(self, types, tagged_only, bbox)
+        self.random = random.Random(seed)
+
+        #Each reservoir holds (position, record) tuples; seen counts the elements offered to it so far
+        self.reservoirs = {stratum: [] for stratum in self.sizes}
+        self.seen = {stratum: 0 for stratum in self.sizes}
+
+    def choose(self, record, position):
+        stratum = record.type if record.type in self.sizes else None
+        reservoir = self.reservoirs[stratum]
+        seen = self.seen[stratum]
+
+        if seen < self.sizes[stratum]:
+            reservoir.append((position, record))
+        else:
+            #Keep this element with probability size / (seen + 1), in place of a random one already chosen
+            replace = self.random.randrange(seen + 1)
+            if replace < self.sizes[stratum]:
+                reservoir[replace] = (position, record)
+
+        self.seen[stratum] = seen + 1
+
+    def chosen(self):
+        return [item for reservoir in self.reservoirs.values() for item in reservoir]
+
+
+
+def run_samplers(osm_file, samplers, complete_ways=True, backend=None):
+    '''
+    Runs every sampler over osm_file in a single pass and returns a list of the records each one chose (in the same
+    order as samplers), each in file order.
+
+    osm_file: str. Filepath for the OSM file to be sampled.
+    samplers: list of Sampler objects.
+    complete_ways: bool. If True, the nodes of each sampled way are added to its sample (with one more pass through
+                    osm_file, shared by all of the samplers) so that the sample is referentially complete.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    for position, record in enumerate(parser.iter_records(osm_file, backend=backend)):
+        for sampler in samplers:
+            sampler.offer(record, position)
+
+    samples = [sampler.chosen() for sampler in samplers]
+
+    if complete_ways:
+        #The node IDs each sample needs but doesn't have yet
+        missing = []
+        for sample in samples:
+            have = {record.attrs['id'] for _, record in sample if record.type == 'node'}
+            missing.append({ref for _, record in sample if record.type == 'way' for ref in record.nds} - have)
+
+        all_missing = set().union(*missing)
+
+        if all_missing:
+            #Ways and relations are still counted, so that positions match those from the first pass
+            for position, record in enumerate(parser.iter_records(osm_file, backend=backend)):
+                if record.type == 'node' and record.attrs['id'] in all_missing:
+                    for sample, needed in zip(samples, missing):
+                        if record.attrs['id'] in needed:
+                            sample.append((position, record))
+
+    return [[record for _, record in sorted(sample, key=lambda item: item[0])] for sample in samples]
+
+
+
+def write_osm(records, output_file):
+    '''
+    Writes records to output_file as an OSM XML file.
+
+    records: list of OSMParser.OSMElement.
+    output_file: str. Filepath of the file to (over)write.
+    '''
+    with open(output_file, 'wb') as fileOut:
+        fileOut.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        fileOut.write(b'<osm>\n')
+
+        for record in records:
+            fileOut.write(parser.to_xml(record))
+
+        fileOut.write(b'</osm>\n')
+
+
+
+def write_samples(osm_file, samplers, complete_ways=True, backend=None):
+    '''
+    Runs every sampler over osm_file together (see run_samplers) and writes each sample to its own OSM file.
+
+    osm_file: str. Filepath for the OSM file to be sampled.
+    samplers: dict mapping the filepath each sample is written to to the Sampler that makes it.
+    complete_ways: bool. If True, the nodes of each sampled way are added to its sample.
+    backend: str. Name of the XML parser backend to use, or None for the default.
+    '''
+    output_files = list(samplers)
+    samples = run_samplers(osm_file, [samplers[output_file] for output_file in output_files], complete_ways, backend)
+
+    for output_file, sample in zip(output_files, samples):
+        write_osm(sample, output_file)
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    write_samples('../data_sample.osm', {'../data_sample_reservoir_100.osm': ReservoirSampler(100, seed=0),
+                                         '../data_sample_stratified.osm': ReservoirSampler({'node': 50, 'way': 10},
+                                                                                           seed=0)})
@@ -0,0 +1,837 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module reads OpenStreetMap PBF files (.osm.pbf), the binary format the same extracts are also published in.
+A PBF file is a series of independently zlib-compressed blocks, each holding a few thousand nodes, ways or relations
+as protobuf messages, with IDs and coordinates delta-encoded and every string kept once in a per-block string table.
+That makes it much smaller than the XML and faster to decode, even with the pure Python (plus zlib) protobuf decoding
+used here, which needs nothing beyond the standard library.
+
+Every node/way/relation is decoded into the same OSMParser.OSMElement records the XML backends produce (with the
+same attribute strings, e.g. lat="41.9707380" and timestamp="2011-06-29T14:14:14Z"), so the auditing and correcting
+code can't tell the two formats apart. OSMParser.iter_records hands PBF files over to this module automatically.
+
+Since each block can be decoded on its own, iter_pbf (and correct_and_record) can decode blocks in parallel, in a
+pool of worker processes.
+
+write_pbf does the reverse, so that PBF test fixtures can be made from (samples of) XML files, e.g.:
+    write_pbf(OSMParser.iter_records('../test_osm.osm', types=None), '../test_osm.osm.pbf')
+
+File format reference: https://wiki.openstreetmap.org/wiki/PBF_Format
+'''
+import bz2
+import calendar
+from collections import namedtuple
+import lzma
+import struct
+import time
+import zlib
+
+import OSMParser as parser
+
+
+PBFFILE = '../test_osm.osm.pbf'
+
+#What the first few bytes of every PBF file look like, once the 4-byte length of its first BlobHeader is skipped
+#(a protobuf string field 1, of length 9, holding the type of the first block)
+HEADER_SIGNATURE = b'\n\tOSMHeader'
+
+#Features a reader has to support to read a given file (see the OSMHeader block). These are all handled here.
+SUPPORTED_FEATURES = {'OsmSchema-V0.6', 'DenseNodes', 'HistoricalInformation'}
+
+#Values of Relation.MemberType
+MEMBER_TYPES = ['node', 'way', 'relation']
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+#Attributes held in an element's Info (or DenseInfo) message, all of which are left out of metadata-stripped files
+METADATA_ATTRS = ('version', 'timestamp', 'changeset', 'uid', 'user')
+
+#Max number of elements write_pbf puts in each block (the format recommends no more than 8000)
+BLOCK_ELEMENTS = 8000
+
+#Settings of a single PrimitiveBlock needed to decode its elements
+BlockInfo = namedtuple('BlockInfo', ['strings', 'granularity', 'lat_offset', 'lon_offset', 'date_granularity',
+                                     'decimals'])
+
+
+######## PROTOBUF DECODING ########
+
+def read_varint(buf, pos):
+    '''
+    Returns a tuple of the form (value, position after it) for the varint starting at pos in buf.
+    '''
+    result = 0
+    shift = 0
+
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def iter_fields(buf):
+    '''
+    Yields a tuple of the form (field number, value) for each field of a protobuf message, in order. value is an int
+    for varint fields (as an unsigned 64-bit number, see signed()) and a memoryview of the bytes of length-delimited
+    fields (strings, embedded messages and packed repeated fields).
+
+    buf: bytes or memoryview. An encoded protobuf message.
+    '''
+    buf = memoryview(buf)
+    pos = 0
+    end = len(buf)
+
+    while pos < end:
+        key, pos = read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+
+        if wire_type == 0:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError('Unsupported protobuf wire type {}'.format(wire_type))
+
+        yield field, value
+
+
+def unpack_varints(value):
+    '''
+    Returns a list of the (unsigned) ints in a packed repeated varint field. An int (i.e. a field that was written
+    unpacked) is returned as a list of just that int.
+    '''
+    if isinstance(value, int):
+        return [value]
+
+    values = []
+    append = values.append
+    current = 0
+    shift = 0
+
+    for byte in value:
+        if byte < 0x80:
+            append(current | (byte << shift))
+            current = 0
+            shift = 0
+        else:
+            current |= (byte & 0x7f) << shift
+            shift += 7
+
+    return values
+
+
+def signed(value):
+    '''
+    Converts an unsigned varint to the (two's complement) int64 value it encodes, i.e. for int32/int64 fields.
+    '''
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def unzigzag(value):
+    '''
+    Decodes a zigzag-encoded varint, i.e. for sint32/sint64 fields.
+    '''
+    return (value >> 1) ^ -(value & 1)
+
+
+def undelta(values):
+    '''
+    Returns the running totals of a list of zigzag-encoded deltas (how PBF stores IDs, coordinates, etc.).
+    '''
+    totals = []
+    append = totals.append
+    total = 0
+
+    for value in values:
+        total += (value >> 1) ^ -(value & 1)
+        append(total)
+
+    return totals
+
+
+
+######## PBF DECODING ########
+
+def is_pbf(filepath):
+    '''
+    Returns True if filepath is an OSM PBF file, based on its first few bytes (not its file extension).
+    '''
+    with open(filepath, 'rb') as fileIn:
+        return fileIn.read(4 + len(HEADER_SIGNATURE))[4:] == HEADER_SIGNATURE
+
+
+def iter_blobs(fileIn, offsets=False):
+    '''
+    Yields a tuple of the form (block type, blob) for each block of a PBF file, in order, wherein block type is
+    'OSMHeader' or 'OSMData' and blob is the (still compressed) bytes of the block's Blob message. This only reads
+    the file - no decompressing or decoding is done - so that can be left to worker processes.
+
+    fileIn: file object (opened in binary mode) for the PBF file of interest. It may have been moved (with seek) to
+            the start of any block, e.g. to skip the part of the file already covered by a checkpoint.
+    offsets: bool. If True, tuples of the form (block type, blob, offset) are yielded instead, wherein offset is the
+            position in fileIn just past the end of the block (i.e. where the next one starts).
+    '''
+    offset = fileIn.tell()
+
+    while True:
+        size_bytes = fileIn.read(4)
+        if len(size_bytes) < 4:
+            return
+
+        header_size = struct.unpack('>I', size_bytes)[0]
+        block_type = None
+        data_size = 0
+
+        for field, value in iter_fields(fileIn.read(header_size)):
+            if field == 1:
+                block_type = bytes(value).decode('utf-8')
+            elif field == 3:
+                data_size = value
+
+        blob = fileIn.read(data_size)
+        offset += 4 + header_size + data_size
+
+        yield (block_type, blob, offset) if offsets else (block_type, blob)
+
+
+def decompress_blob(blob):
+    '''
+    Returns the decompressed contents of a Blob message (i.e. an encoded HeaderBlock or PrimitiveBlock).
+    '''
+    for field, value in iter_fields(blob):
+        if field == 1:
+            return bytes(value)
+        elif field == 3:
+            return zlib.decompress(value)
+        elif field == 4:
+            return lzma.decompress(value)
+        elif field == 5:
+            return bz2.decompress(value)
+        elif field != 2:
+            raise ValueError('Unsupported PBF blob compression (Blob field {})'.format(field))
+
+    return b''
+
+
+def decode_header(data):
+    '''
+    Returns a dict describing a PBF file's (decompressed) HeaderBlock, with keys 'bbox' (a tuple of the form
+    (min_lat, min_lon, max_lat, max_lon) in degrees, or None), 'required_features' (list of str) and
+    'writingprogram' (str, or None). Raises ValueError if the file needs features not in SUPPORTED_FEATURES.
+    '''
+    header = {'bbox': None, 'required_features': [], 'writingprogram': None}
+
+    for field, value in iter_fields(data):
+        if field == 1:
+            #HeaderBBox has left, right, top, bottom (sint64, in nanodegrees)
+            edges = {edge: unzigzag(edge_value) / 1e9 for edge, edge_value in iter_fields(value)}
+            header['bbox'] = (edges.get(4), edges.get(1), edges.get(3), edges.get(2))
+        elif field == 4:
+            header['required_features'].append(bytes(value).decode('utf-8'))
+        elif field == 16:
+            header['writingprogram'] = bytes(value).decode('utf-8')
+
+    unsupported = set(header['required_features']) - SUPPORTED_FEATURES
+    if unsupported:
+        raise ValueError('PBF file requires unsupported features: {}'.format(', '.join(sorted(unsupported))))
+
+    return header
+
+
+def header_records(header, types=parser.ENTITY_TYPES):
+    '''
+    Returns the records equivalent to the <osm> and <bounds> elements of an XML file for a decoded HeaderBlock, for
+    those of the two in types (or both, if types is None).
+    '''
+    records = []
+
+    if types is None or 'osm' in types:
+        attrs = {'version': '0.6'}
+        if header['writingprogram']:
+            attrs['generator'] = header['writingprogram']
+        records.append(parser.OSMElement('osm', attrs, [], [], []))
+
+    if header['bbox'] is not None and (types is None or 'bounds' in types):
+        min_lat, min_lon, max_lat, max_lon = header['bbox']
+        records.append(parser.OSMElement('bounds', {'minlat': '{:.7f}'.format(min_lat),
+                                                    'minlon': '{:.7f}'.format(min_lon),
+                                                    'maxlat': '{:.7f}'.format(max_lat),
+                                                    'maxlon': '{:.7f}'.format(max_lon)}, [], [], []))
+
+    return records
+
+
+def format_degrees(nanodegrees, decimals):
+    '''
+    Formats a coordinate given in nanodegrees as a decimal string with a fixed number of decimal places, the way
+    they're written in OSM XML (e.g. 41970738000 with 7 decimals -> '41.9707380'). Done with integers throughout,
+    so there's no floating point rounding.
+    '''
+    sign = '-' if nanodegrees < 0 else ''
+
+    if decimals == 0:
+        return sign + str(abs(nanodegrees) // 10**9)
+
+    whole, fraction = divmod(abs(nanodegrees) // 10**(9 - decimals), 10**decimals)
+    return '%s%d.%0*d' % (sign, whole, decimals, fraction)
+
+
+def coordinate_decimals(granularity, offset):
+    '''
+    Returns the number of decimal places needed to write coordinates exactly, given a block's granularity and
+    lat/lon offset (both in nanodegrees). For the default granularity of 100, that's 7.
+    '''
+    decimals = 9
+
+    while decimals > 0 and granularity % 10 == 0 and offset % 10 == 0:
+        granularity //= 10
+        offset //= 10
+        decimals -= 1
+
+    return decimals
+
+
+def format_timestamp(timestamp, date_granularity):
+    '''
+    Formats a timestamp (in units of date_granularity milliseconds since the epoch) the way it's written in OSM XML.
+    '''
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(timestamp * date_granularity // 1000))
+
+
+def info_attrs(attrs, info, block):
+    '''
+    Adds the attributes held in an Info message (version, changeset, timestamp, user, uid) to attrs.
+    '''
+    fields = dict(iter_fields(info))
+
+    if 1 in fields:
+        attrs['version'] = str(signed(fields[1]))
+    if 3 in fields:
+        attrs['changeset'] = str(signed(fields[3]))
+    if 2 in fields:
+        attrs['timestamp'] = format_timestamp(signed(fields[2]), block.date_granularity)
+    if 5 in fields:
+        attrs['user'] = block.strings[fields[5]]
+    if 4 in fields:
+        attrs['uid'] = str(signed(fields[4]))
+
+
+def decode_tags(keys, values, strings):
+    '''
+    Returns a list of (k, v) tuples from the parallel lists of string table indexes in keys and values.
+    '''
+    return [(strings[k], strings[v]) for k, v in zip(keys, values)]
+
+
+def decode_dense_nodes(dense, block):
+    '''
+    Returns a list of node records for a DenseNodes message, in which each attribute of every node is stored in its
+    own packed (and mostly delta-encoded) field, and all of their tags in a single list of alternating key/value
+    string indexes, with 0 marking the end of each node's tags.
+    '''
+    ids = lats = lons = keys_vals = []
+    dense_info = {}
+
+    for field, value in iter_fields(dense):
+        if field == 1:
+            ids = undelta(unpack_varints(value))
+        elif field == 5:
+            for info_field, info_value in iter_fields(value):
+                dense_info[info_field] = unpack_varints(info_value)
+        elif field == 8:
+            lats = undelta(unpack_varints(value))
+        elif field == 9:
+            lons = undelta(unpack_varints(value))
+        elif field == 10:
+            keys_vals = unpack_varints(value)
+
+    strings = block.strings
+    #Nodes added in the same edit share a timestamp, so each one is only formatted once
+    timestamp_strings = {}
+    versions = dense_info.get(1)
+    timestamps = undelta(dense_info[2]) if 2 in dense_info else None
+    changesets = undelta(dense_info[3]) if 3 in dense_info else None
+    uids = undelta(dense_info[4]) if 4 in dense_info else None
+    user_sids = undelta(dense_info[5]) if 5 in dense_info else None
+
+    records = []
+    tag_index = 0
+
+    for i, node_id in enumerate(ids):
+        attrs = {'id': str(node_id)}
+
+        if versions is not None:
+            attrs['version'] = str(signed(versions[i]))
+        if changesets is not None:
+            attrs['changeset'] = str(changesets[i])
+        if timestamps is not None:
+            timestamp = timestamps[i]
+            if timestamp not in timestamp_strings:
+                timestamp_strings[timestamp] = format_timestamp(timestamp, block.date_granularity)
+            attrs['timestamp'] = timestamp_strings[timestamp]
+        if user_sids is not None:
+            attrs['user'] = strings[user_sids[i]]
+        if uids is not None:
+            attrs['uid'] = str(uids[i])
+
+        attrs['lat'] = format_degrees(block.lat_offset + block.granularity * lats[i], block.decimals)
+        attrs['lon'] = format_degrees(block.lon_offset + block.granularity * lons[i], block.decimals)
+
+        tags = []
+        while tag_index < len(keys_vals) and keys_vals[tag_index] != 0:
+            tags.append((strings[keys_vals[tag_index]], strings[keys_vals[tag_index + 1]]))
+            tag_index += 2
+        tag_index += 1
+
+        records.append(parser.OSMElement('node', attrs, tags, [], []))
+
+    return records
+
+
+def decode_node(node, block):
+    '''
+    Returns the record for a (non-dense) Node message.
+    '''
+    keys = values = []
+    info = None
+    lat = lon = 0
+
+    for field, value in iter_fields(node):
+        if field == 1:
+            node_id = unzigzag(value)
+        elif field == 2:
+            keys = unpack_varints(value)
+        elif field == 3:
+            values = unpack_varints(value)
+        elif field == 4:
+            info = value
+        elif field == 8:
+            lat = unzigzag(value)
+        elif field == 9:
+            lon = unzigzag(value)
+
+    attrs = {'id': str(node_id)}
+    if info is not None:
+        info_attrs(attrs, info, block)
+    attrs['lat'] = format_degrees(block.lat_offset + block.granularity * lat, block.decimals)
+    attrs['lon'] = format_degrees(block.lon_offset + block.granularity * lon, block.decimals)
+
+    return parser.OSMElement('node', attrs, decode_tags(keys, values, block.strings), [], [])
+
+
+def decode_way(way, block):
+    '''
+    Returns the record for a Way message.
+    '''
+    keys = values = refs = []
+    info = None
+
+    for field, value in iter_fields(way):
+        if field == 1:
+            way_id = signed(value)
+        elif field == 2:
+            keys = unpack_varints(value)
+        elif field == 3:
+            values = unpack_varints(value)
+        elif field == 4:
+            info = value
+        elif field == 8:
+            refs = undelta(unpack_varints(value))
+
+    attrs = {'id': str(way_id)}
+    if info is not None:
+        info_attrs(attrs, info, block)
+
+    return parser.OSMElement('way', attrs, decode_tags(keys, values, block.strings), [str(ref) for ref in refs], [])
+
+
+def decode_relation(relation, block):
+    '''
+    Returns the record for a Relation message.
+    '''
+    keys = values = roles = member_ids = member_types = []
+    info = None
+
+    for field, value in iter_fields(relation):
+        if field == 1:
+            relation_id = signed(value)
+        elif field == 2:
+            keys = unpack_varints(value)
+        elif field == 3:
+            values = unpack_varints(value)
+        elif field == 4:
+            info = value
+        elif field == 8:
+            roles = unpack_varints(value)
+        elif field == 9:
+            member_ids = undelta(unpack_varints(value))
+        elif field == 10:
+            member_types = unpack_varints(value)
+
+    attrs = {'id': str(relation_id)}
+    if info is not None:
+        info_attrs(attrs, info, block)
+
+    members = [{'type': MEMBER_TYPES[member_type], 'ref': str(member_id), 'role': block.strings[role]}
+               for member_type, member_id, role in zip(member_types, member_ids, roles)]
+
+    return parser.OSMElement('relation', attrs, decode_tags(keys, values, block.strings), [], members)
+
+
+def decode_block(data, types=parser.ENTITY_TYPES):
+    '''
+    Returns a list of the records for every node/way/relation (of the given types) in a decompressed
+    PrimitiveBlock, in the order they're stored.
+
+    data: bytes. A decompressed PrimitiveBlock (see decompress_blob).
+    types: tuple of str. Element types to return, or None for all of them.
+    '''
+    strings = []
+    groups = []
+    settings = {17: 100, 18: 1000, 19: 0, 20: 0}
+
+    for field, value in iter_fields(data):
+        if field == 1:
+            strings = [bytes(string).decode('utf-8') for _, string in iter_fields(value)]
+        elif field == 2:
+            groups.append(value)
+        elif field in settings:
+            settings[field] = signed(value)
+
+    granularity, date_granularity, lat_offset, lon_offset = settings[17], settings[18], settings[19], settings[20]
+    decimals = max(coordinate_decimals(granularity, lat_offset), coordinate_decimals(granularity, lon_offset))
+    block = BlockInfo(strings, granularity, lat_offset, lon_offset, date_granularity, decimals)
+
+    wanted = set(parser.ENTITY_TYPES if types is None else types)
+    records = []
+
+    for group in groups:
+        for field, value in iter_fields(group):
+            if field == 2 and 'node' in wanted:
+                records.extend(decode_dense_nodes(value, block))
+            elif field == 1 and 'node' in wanted:
+                records.append(decode_node(value, block))
+            elif field == 3 and 'way' in wanted:
+                records.append(decode_way(value, block))
+            elif field == 4 and 'relation' in wanted:
+                records.append(decode_relation(value, block))
+
+    return records
+
+
+def decode_blob(blob, types=parser.ENTITY_TYPES):
+    '''
+    Decompresses and decodes the blob of an OSMData block (as yielded by iter_blobs), returning its records. This is
+    the unit of work done by each worker process when decoding in parallel.
+    '''
+    return decode_block(decompress_blob(blob), types)
+
+
+def iter_pbf(fileIn, types=parser.ENTITY_TYPES, workers=1):
+    '''
+    Yields an OSMParser.OSMElement for each node/way/relation (of the given types) in a PBF file, in file order,
+    just as OSMParser.iter_records does for XML. If types is None (or includes them), the file's header is also
+    yielded first as 'osm' and 'bounds' records.
+
+    fileIn: file object (opened in binary mode) or str filepath for the PBF file of interest.
+    types: tuple of str. Element types to yield, or None for all of them.
+    workers: int. Number of processes decoding blocks. If greater than 1, this process only reads the blocks from
+            the file, and a pool of worker processes then decompress and decode them.
+    '''
+    if isinstance(fileIn, str):
+        with open(fileIn, 'rb') as pbf_file:
+            yield from iter_pbf(pbf_file, types, workers)
+        return
+
+    blobs = iter_blobs(fileIn)
+
+    #The header always comes first, and has to be checked before anything else is decoded
+    block_type, blob = next(blobs, (None, None))
+    if block_type != 'OSMHeader':
+        raise ValueError('Not a PBF file (no OSMHeader block at the start)')
+    yield from header_records(decode_header(decompress_blob(blob)), types)
+
+    data_blobs = (blob for block_type, blob in blobs if block_type == 'OSMData')
+
+    if workers > 1:
+        import multiprocessing
+        from functools import partial
+
+        with multiprocessing.Pool(workers) as pool:
+            #imap (not imap_unordered) hands back each block's records in file order
+            for records in pool.imap(partial(decode_blob, types=types), data_blobs):
+                yield from records
+
+    else:
+        for blob in data_blobs:
+            yield from decode_blob(blob, types)
+
+
+
+######## PBF ENCODING ########
+
+def encode_varint(value):
+    '''
+    Returns the varint encoding of value. Negative values are encoded as 64-bit two's complement (as for int64).
+    '''
+    value &= (1 << 64) - 1
+    encoded = bytearray()
+
+    while value >= 0x80:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+
+    return bytes(encoded)
+
+
+def zigzag(value):
+    '''
+    Zigzag-encodes value, i.e. for sint32/sint64 fields.
+    '''
+    return (value << 1) ^ (value >> 63)
+
+
+def varint_field(field, value):
+    return encode_varint(field << 3) + encode_varint(value)
+
+
+def bytes_field(field, payload):
+    return encode_varint((field << 3) | 2) + encode_varint(len(payload)) + payload
+
+
+def packed_field(field, values):
+    return bytes_field(field, b''.join(encode_varint(value) for value in values)) if values else b''
+
+
+def delta_field(field, values):
+    '''
+    Packed field of the zigzag-encoded deltas between consecutive values.
+    '''
+    previous = 0
+    deltas = []
+
+    for value in values:
+        deltas.append(zigzag(value - previous))
+        previous = value
+
+    return packed_field(field, deltas)
+
+
+def parse_timestamp(timestamp):
+    '''
+    Returns the number of seconds since the epoch for an OSM XML timestamp.
+    '''
+    return calendar.timegm(time.strptime(timestamp, TIMESTAMP_FORMAT))
+
+
+def to_fixed_point(coordinate):
+    '''
+    Converts a coordinate (a decimal str, in degrees) to an int count of 100 nanodegree units (i.e. of the default
+    granularity), without any floating point rounding.
+    '''
+    whole, _, fraction = coordinate.strip().lstrip('-').partition('.')
+    units = int(whole) * 10**7 + int((fraction + '0' * 7)[:7])
+
+    return -units if coordinate.strip().startswith('-') else units
+
+
+class StringTable(object):
+    '''
+    Builds the string table of a single PrimitiveBlock. Index 0 is always the empty string, which DenseNodes uses
+    to separate the tags of each node.
+    '''
+
+    def __init__(self):
+        self.indexes = {'': 0}
+        self.strings = ['']
+
+    def index(self, string):
+        if string not in self.indexes:
+            self.indexes[string] = len(self.strings)
+            self.strings.append(string)
+        return self.indexes[string]
+
+    def encode(self):
+        return b''.join(bytes_field(1, string.encode('utf-8')) for string in self.strings)
+
+
+def has_metadata(attrs):
+    return any(attr in attrs for attr in METADATA_ATTRS)
+
+
+def encode_info(attrs, strings):
+    '''
+    Returns an encoded Info message for the version, timestamp, changeset, uid and user in attrs.
+    '''
+    return (varint_field(1, int(attrs.get('version', 0))) +
+            varint_field(2, parse_timestamp(attrs['timestamp']) if 'timestamp' in attrs else 0) +
+            varint_field(3, int(attrs.get('changeset', 0))) +
+            varint_field(4, int(attrs.get('uid', 0))) +
+            varint_field(5, strings.index(attrs.get('user', ''))))
+
+
+def info_field(attrs, strings):
+    '''
+    Returns the encoded Info field of a way or relation, or nothing if its metadata has been stripped.
+    '''
+    if not has_metadata(attrs):
+        return b''
+    return bytes_field(4, encode_info(attrs, strings))
+
+
+def encode_dense_nodes(nodes, strings):
+    '''
+    Returns an encoded PrimitiveGroup holding nodes as a single DenseNodes message, without any DenseInfo if none of
+    the nodes have metadata.
+    '''
+    keys_vals = []
+    for node in nodes:
+        for k, v in node.tags:
+            keys_vals += [strings.index(k), strings.index(v)]
+        keys_vals.append(0)
+
+    dense_info = b''
+    if any(has_metadata(node.attrs) for node in nodes):
+        dense_info = bytes_field(5, packed_field(1, [int(node.attrs.get('version', 0)) for node in nodes]) +
+                                 delta_field(2, [parse_timestamp(node.attrs['timestamp'])
+                                                 if 'timestamp' in node.attrs else 0 for node in nodes]) +
+                                 delta_field(3, [int(node.attrs.get('changeset', 0)) for node in nodes]) +
+                                 delta_field(4, [int(node.attrs.get('uid', 0)) for node in nodes]) +
+                                 delta_field(5, [strings.index(node.attrs.get('user', '')) for node in nodes]))
+
+    dense = (delta_field(1, [int(node.attrs['id']) for node in nodes]) +
+             dense_info +
+             delta_field(8, [to_fixed_point(node.attrs['lat']) for node in nodes]) +
+             delta_field(9, [to_fixed_point(node.attrs['lon']) for node in nodes]) +
+             packed_field(10, keys_vals))
+
+    return bytes_field(2, dense)
+
+
+def encode_way(way, strings):
+    '''
+    Returns an encoded Way message.
+    '''
+    return (varint_field(1, int(way.attrs['id'])) +
+            packed_field(2, [strings.index(k) for k, _ in way.tags]) +
+            packed_field(3, [strings.index(v) for _, v in way.tags]) +
+            info_field(way.attrs, strings) +
+            delta_field(8, [int(ref) for ref in way.nds]))
+
+
+def encode_relation(relation, strings):
+    '''
+    Returns an encoded Relation message.
+    '''
+    members = relation.members
+
+    return (varint_field(1, int(relation.attrs['id'])) +
+            packed_field(2, [strings.index(k) for k, _ in relation.tags]) +
+            packed_field(3, [strings.index(v) for _, v in relation.tags]) +
+            info_field(relation.attrs, strings) +
+            packed_field(8, [strings.index(member.get('role', '')) for member in members]) +
+            delta_field(9, [int(member['ref']) for member in members]) +
+            packed_field(10, [MEMBER_TYPES.index(member['type']) for member in members]))
+
+
+def encode_block(records):
+    '''
+    Returns an encoded PrimitiveBlock holding records, which must all be of the same type.
+    '''
+    strings = StringTable()
+
+    if records[0].type == 'node':
+        group = encode_dense_nodes(records, strings)
+    elif records[0].type == 'way':
+        group = b''.join(bytes_field(3, encode_way(way, strings)) for way in records)
+    else:
+        group = b''.join(bytes_field(4, encode_relation(relation, strings)) for relation in records)
+
+    return bytes_field(1, strings.encode()) + bytes_field(2, group)
+
+
+def write_block(fileOut, block_type, data):
+    '''
+    Compresses data and writes it to fileOut as a block of the given type.
+    '''
+    blob = varint_field(2, len(data)) + bytes_field(3, zlib.compress(data, 9))
+    header = bytes_field(1, block_type.encode('utf-8')) + varint_field(3, len(blob))
+
+    fileOut.write(struct.pack('>I', len(header)))
+    fileOut.write(header)
+    fileOut.write(blob)
+
+
+def encode_header(bounds=None):
+    '''
+    Returns an encoded HeaderBlock, including a bounding box if given the attributes of a <bounds> element.
+    '''
+    header = b''
+
+    if bounds is not None:
+        #HeaderBBox has left, right, top, bottom (sint64, in nanodegrees)
+        edges = [bounds['minlon'], bounds['maxlon'], bounds['maxlat'], bounds['minlat']]
+        header += bytes_field(1, b''.join(varint_field(field, zigzag(to_fixed_point(edge) * 100))
+                                          for field, edge in enumerate(edges, 1)))
+
+    return (header + bytes_field(4, b'OsmSchema-V0.6') + bytes_field(4, b'DenseNodes') +
+            bytes_field(16, b'P2-WrangleOSM'))
+
+
+def write_pbf(records, output_file, block_elements=BLOCK_ELEMENTS):
+    '''
+    Writes node/way/relation records (e.g. from OSMParser.iter_records) to a new PBF file. Consecutive records of
+    the same type are stored together in blocks of up to block_elements, so records should be in the usual order
+    of an OSM file (nodes, then ways, then relations). A 'bounds' record (if it comes before them) becomes the
+    file's bounding box; anything else is skipped.
+
+    records: iterable of OSMParser.OSMElement.
+    output_file: str. Filepath of the file to (over)write.
+    block_elements: int. Max number of elements per block.
+    '''
+    bounds = None
+    header_written = False
+
+    with open(output_file, 'wb') as fileOut:
+        pending = []
+        for record in records:
+            if record.type == 'bounds':
+                bounds = record.attrs
+            if record.type not in parser.ENTITY_TYPES:
+                continue
+
+            if not header_written:
+                write_block(fileOut, 'OSMHeader', encode_header(bounds))
+                header_written = True
+
+            if pending and (record.type != pending[0].type or len(pending) >= block_elements):
+                write_block(fileOut, 'OSMData', encode_block(pending))
+                pending = []
+            pending.append(record)
+
+        if not header_written:
+            write_block(fileOut, 'OSMHeader', encode_header(bounds))
+        if pending:
+            write_block(fileOut, 'OSMData', encode_block(pending))
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    for element in iter_pbf(PBFFILE):
+        print(element)
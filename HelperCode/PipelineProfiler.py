@@ -0,0 +1,379 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module instruments a single correct_and_record run, to show where its time goes. Pass a PipelineProfiler to
+correct_and_record (or use `WrangleCLI.py correct --profile report.json`) and it records:
+
+    - cumulative time spent in each stage: parsing, correcting (shape_element) and writing to the sink, including
+        the final write done when the sink is closed (e.g. DataFrameSink's to_csv calls)
+    - calls to (and time spent in) each branch of data_correction: zip, county, state, amenity, street and generic
+    - FIPS code lookups, and how many of them found a name
+    - rows written to each table
+
+along with a progress line (elements/sec and resident memory) every progress_interval seconds while the run is going.
+At the end, report() returns all of it as a JSON-serializable dict and summary() as a human-readable table.
+
+The clock starts when the run does (when instrument() is entered, which correct_and_record does at the start of its
+run), not when the profiler is made, so setting up the sink etc. beforehand isn't counted. Each run starts over, so a
+profiler can be reused and report() only ever describes the latest run.
+
+None of this costs anything unless a profiler is given: correct_and_record only wraps its parser, shape_element and
+sink (and data_correction/FIPS_to_Name are only swapped for counting versions, see instrument()) when it has one.
+
+When correcting with worker processes, parsing and correcting happen in the workers, so they're timed together (as
+the time spent waiting on the workers) and data_correction branches and FIPS lookups aren't counted.
+'''
+from collections import defaultdict
+import contextlib
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError: #not available on Windows
+    resource = None
+
+
+#Tables with one row per node/way/relation, used to count elements
+ELEMENT_TABLES = frozenset(['nodes', 'ways', 'relations'])
+
+#Seconds between progress lines
+PROGRESS_INTERVAL = 10.0
+
+#Number of elements recorded between checks of whether a progress line is due
+PROGRESS_CHECK_ELEMENTS = 4096
+
+
+def current_rss_bytes():
+    '''
+    Returns the resident memory of this process in bytes. Where the current value isn't available (i.e. outside of
+    Linux), returns the peak so far instead, or None if neither can be determined.
+    '''
+    try:
+        with open('/proc/self/statm', 'r') as fileIn:
+            return int(fileIn.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    #Linux reports this in KiB, macOS in bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+
+class ProfiledSink(object):
+    '''
+    Wraps a TableSinks sink, timing its write() and close() calls and counting the rows written to each table.
+    '''
+
+    def __init__(self, sink, profiler):
+        self.sink = sink
+        self.profiler = profiler
+
+    def write(self, table, rows):
+        start = time.perf_counter()
+        self.sink.write(table, rows)
+        self.profiler.add_time('write', time.perf_counter() - start)
+        self.profiler.count_rows(table, len(rows))
+
+    def close(self):
+        start = time.perf_counter()
+        self.sink.close()
+        self.profiler.add_time('write (close)', time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        #Anything else (e.g. CSVSink.checkpoint) goes straight to the wrapped sink
+        return getattr(self.sink, name)
+
+
+
+class PipelineProfiler(object):
+    '''
+    Collects timings and counts from a correct_and_record run. See the module docstring for what's recorded.
+    '''
+
+    def __init__(self, progress_interval=PROGRESS_INTERVAL, progress_stream=sys.stderr):
+        '''
+        progress_interval: float. Seconds between progress lines, or None for no progress lines.
+        progress_stream: file object the progress lines are written to.
+        '''
+        self.progress_interval = progress_interval
+        self.progress_stream = progress_stream
+
+        self.reset()
+
+
+    def reset(self):
+        '''
+        Clears everything recorded so far, leaving the profiler as it was before its first run.
+        '''
+        self.stage_times = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.branch_times = defaultdict(float)
+        self.branch_calls = defaultdict(int)
+        self.fips_time = 0.0
+        self.fips_lookups = 0
+        self.fips_hits = 0
+        self.rows = defaultdict(int)
+
+        self.elements = 0
+        self.next_check = PROGRESS_CHECK_ELEMENTS
+        self.start_time = None
+        self.last_progress = None
+        self.end_time = None
+        self.peak_rss = None
+
+
+    def start(self):
+        '''
+        Marks the start of a run, clearing anything recorded in an earlier one.
+        '''
+        self.reset()
+        self.start_time = time.perf_counter()
+        self.last_progress = self.start_time
+        self.peak_rss = current_rss_bytes()
+
+
+    def add_time(self, stage, seconds):
+        self.stage_times[stage] += seconds
+        self.stage_calls[stage] += 1
+
+
+    def count_rows(self, table, count):
+        '''
+        Counts rows written to table, which for the nodes/ways/relations tables is also the number of elements
+        recorded. Writes a progress line if one is due.
+        '''
+        self.rows[table] += count
+
+        if table in ELEMENT_TABLES:
+            self.elements += count
+
+            if self.elements >= self.next_check:
+                self.next_check = self.elements + PROGRESS_CHECK_ELEMENTS
+                self.check_progress()
+
+
+    def check_progress(self):
+        '''
+        Updates the peak resident memory and writes a progress line if progress_interval seconds have passed since
+        the last one. Does nothing if no run has been started.
+        '''
+        if self.start_time is None:
+            return
+
+        now = time.perf_counter()
+        rss = current_rss_bytes()
+
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+        if self.progress_interval is not None and now - self.last_progress >= self.progress_interval:
+            self.last_progress = now
+            elapsed = now - self.start_time
+
+            self.progress_stream.write('[profile] {:.1f}s: {:,} elements ({:,.0f} elements/s), RSS {}\n'.format(
+                elapsed, self.elements, self.elements / elapsed, format_bytes(rss)))
+            self.progress_stream.flush()
+
+
+    def timed(self, stage, function):
+        '''
+        Returns a version of function that adds the time spent in each call to stage.
+        '''
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add_time(stage, time.perf_counter() - start)
+
+        return timed_function
+
+
+    def timed_iter(self, stage, iterable):
+        '''
+        Yields everything in iterable, adding the time spent getting each item (e.g. parsing each element) to stage.
+        '''
+        iterator = iter(iterable)
+
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add_time(stage, time.perf_counter() - start)
+
+            yield item
+
+
+    def wrap_sink(self, sink):
+        '''
+        Returns a ProfiledSink wrapping sink.
+        '''
+        return ProfiledSink(sink, self)
+
+
+    @contextlib.contextmanager
+    def instrument(self):
+        '''
+        Context manager for a single run: starts the clock (see start()) and, while active, replaces
+        DataCorrection_and_CSVExport.data_correction and FIPSCodeMapper.FIPS_to_Name with versions that count (and
+        time) each call, by data_correction branch and by whether the FIPS code was found. The originals are put back
+        and the clock stopped on exit.
+        '''
+        import DataCorrection_and_CSVExport as correction
+        import FIPSCodeMapper as fips
+
+        data_correction = correction.data_correction
+        FIPS_to_Name = fips.FIPS_to_Name
+        classify_key = correction.classify_key
+
+        def counted_data_correction(k, v, *args):
+            branch = classify_key(k)[0]
+            start = time.perf_counter()
+            try:
+                return data_correction(k, v, *args)
+            finally:
+                self.branch_times[branch] += time.perf_counter() - start
+                self.branch_calls[branch] += 1
+
+        def counted_FIPS_to_Name(*args, **kwargs):
+            #Codes not in the Census file raise KeyError, which is counted as a miss and passed on to the caller
+            start = time.perf_counter()
+            try:
+                name = FIPS_to_Name(*args, **kwargs)
+            except KeyError:
+                self.fips_time += time.perf_counter() - start
+                self.fips_lookups += 1
+                raise
+
+            self.fips_time += time.perf_counter() - start
+            self.fips_lookups += 1
+            if name is not None:
+                self.fips_hits += 1
+
+            return name
+
+        self.start()
+        correction.data_correction = counted_data_correction
+        fips.FIPS_to_Name = counted_FIPS_to_Name
+
+        try:
+            yield self
+        finally:
+            correction.data_correction = data_correction
+            fips.FIPS_to_Name = FIPS_to_Name
+            self.finish()
+
+
+    def finish(self):
+        '''
+        Marks the end of the run, so that later calls to report() don't count time spent after it.
+        '''
+        self.end_time = time.perf_counter()
+        self.check_progress()
+
+
+    def report(self):
+        '''
+        Returns a JSON-serializable dict of everything recorded so far (all zeros if no run has been started).
+        '''
+        if self.start_time is None:
+            total = 0.0
+        else:
+            total = (self.end_time or time.perf_counter()) - self.start_time
+
+        return {'total_seconds': total,
+                'elements': self.elements,
+                'elements_per_second': self.elements / total if total else None,
+                'peak_rss_bytes': self.peak_rss,
+                'stages': {stage: {'seconds': self.stage_times[stage], 'calls': self.stage_calls[stage]}
+                           for stage in self.stage_times},
+                'data_correction_branches': {branch: {'seconds': self.branch_times[branch],
+                                                      'calls': self.branch_calls[branch]}
+                                             for branch in sorted(self.branch_calls)},
+                'fips_lookups': {'seconds': self.fips_time,
+                                 'calls': self.fips_lookups,
+                                 'hits': self.fips_hits,
+                                 'hit_rate': self.fips_hits / self.fips_lookups if self.fips_lookups else None},
+                'rows': dict(self.rows)}
+
+
+    def write_report(self, report_file):
+        '''
+        Writes report() to report_file as JSON.
+        '''
+        with open(report_file, 'w') as fileOut:
+            json.dump(self.report(), fileOut, indent=2)
+
+
+    def summary(self):
+        '''
+        Returns report() as a human-readable, multi-line str.
+        '''
+        report = self.report()
+        total = report['total_seconds']
+
+        lines = ['{:,} elements in {:.2f}s ({:,.0f} elements/s), peak RSS {}'.format(
+            report['elements'], total, report['elements_per_second'] or 0, format_bytes(report['peak_rss_bytes']))]
+
+        lines.append('')
+        lines.append('{:<32}{:>10}{:>8}{:>12}'.format('Stage', 'seconds', '%', 'calls'))
+        for stage, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append('{:<32}{:>10.3f}{:>8.1f}{:>12,}'.format(stage, stats['seconds'],
+                                                                100 * stats['seconds'] / total if total else 0,
+                                                                stats['calls']))
+
+        if report['data_correction_branches']:
+            lines.append('')
+            lines.append('{:<32}{:>10}{:>8}{:>12}'.format('data_correction branch', 'seconds', '%', 'calls'))
+            for branch, stats in sorted(report['data_correction_branches'].items(),
+                                        key=lambda item: -item[1]['seconds']):
+                lines.append('{:<32}{:>10.3f}{:>8.1f}{:>12,}'.format(branch, stats['seconds'],
+                                                                    100 * stats['seconds'] / total if total else 0,
+                                                                    stats['calls']))
+
+        fips_stats = report['fips_lookups']
+        if fips_stats['calls']:
+            lines.append('')
+            lines.append('FIPS lookups: {:,} in {:.3f}s, {:.1%} found'.format(fips_stats['calls'],
+                                                                              fips_stats['seconds'],
+                                                                              fips_stats['hit_rate']))
+
+        lines.append('')
+        lines.append('{:<32}{:>12}'.format('Table', 'rows'))
+        for table, count in report['rows'].items():
+            lines.append('{:<32}{:>12,}'.format(table, count))
+
+        return '\n'.join(lines)
+
+
+
+def format_bytes(num_bytes):
+    '''
+    Formats a number of bytes in MB, e.g. for RSS.
+    '''
+    if num_bytes is None:
+        return 'unknown'
+    return '{:,.1f} MB'.format(num_bytes / 2**20)
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    import DataCorrection_and_CSVExport as correction
+
+    profiler = PipelineProfiler()
+    correction.correct_and_record('../test_osm.osm', profiler=profiler)
+    print(profiler.summary())
@@ -9,7 +9,8 @@ Created on Nov 12, 2017
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import xml.etree.ElementTree as ET  # Use cElementTree or lxml if too slow
+import OSMParser as parser  # See OSMParser.BACKENDS for faster (or lxml) parsing
+import OSMSampler
 
 k = 100 # Parameter: take every k-th top level element
 
@@ -17,30 +18,27 @@ OSM_FILE = "../SW_WestVirginia.osm"
 SAMPLE_FILE = "../data_sample_"+ str(k) + "_elemsWithTags_UTF-8Encoding.osm"
 #SAMPLE_FILE = "../SW_WestVirginia_ASCIIEncoded.osm"
 
-def get_element(osm_file, tags=('node', 'way', 'relation')):
-    """Yield element if it is the right type of tag
+def get_element(osm_file, tags=('node', 'way', 'relation'), backend=None):
+    """Yield element (as an OSMParser.OSMElement record) if it is the right type of tag
 
     Reference:
     http://stackoverflow.com/questions/3095434/inserting-newlines-in-xml-file-generated-via-xml-etree-elementtree-in-python
     """
-    context = iter(ET.iterparse(osm_file, events=('start', 'end')))
-    _, root = next(context)
-    for event, elem in context:
-        if event == 'end' and elem.tag in tags and list(elem.iter(tag = "tag")) != []:
-            #the last piece of the preceding conditional filters out any nodes/ways/relations 
-            #that don't have any children of 'tag' type, for clarity of reading the sampled data
-            yield elem
-            root.clear()
+    for record in parser.iter_records(osm_file, tags, backend):
+        if record.tags:
+            #filters out any nodes/ways/relations that don't have any children of 'tag' type, for clarity of 
+            #reading the sampled data
+            yield record
 
 
-with open(SAMPLE_FILE, 'wb') as output:
-    output.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
-    output.write(b'<osm>\n  ')
-
+def write_sample(osm_file=OSM_FILE, sample_file=SAMPLE_FILE, k=k, backend=None):
+    """Write every k-th top level element (that has child tags) of osm_file to sample_file
     
-    # Write every kth top level element
-    for i, element in enumerate(get_element(OSM_FILE)):
-        if i % k == 0:                              
-            output.write(ET.tostring(element, encoding="utf-8"))
+    See OSMSampler.py for random (reservoir), stratified and bounding box samples.
+    """
+    OSMSampler.write_samples(osm_file, {sample_file: OSMSampler.EveryKthSampler(k)}, complete_ways=False,
+                             backend=backend)
+
 
-    output.write(b'</osm>')
\ No newline at end of file
+if __name__ == "__main__":
+    write_sample()
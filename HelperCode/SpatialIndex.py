@@ -0,0 +1,144 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module builds a spatial index over an OpenStreetMap SQL database (see data_wrangling_schema.sql) and uses it to
+answer "what's inside this bounding box?" questions without scanning the whole nodes table.
+
+Two tables make up the index:
+    nodes_bbox: one row per node, with min_lat = max_lat = lat and min_lon = max_lon = lon
+    ways_bbox: one row per way, holding the bounding box of all of the way's nodes (from ways_nodes)
+
+Both are SQLite R*Tree virtual tables when SQLite was compiled with R*Tree support (it almost always is). If not, they
+are regular tables with a B-tree index instead, which is slower but answers the same queries.
+'''
+import sqlite3
+
+
+DATABASE = '../SW_WV_OSM.db'
+
+SPATIAL_TABLES = ['nodes_bbox', 'ways_bbox']
+
+WAY_BOXES = '''SELECT ways_nodes.id, MIN(nodes.lat), MAX(nodes.lat), MIN(nodes.lon), MAX(nodes.lon)
+               FROM ways_nodes JOIN nodes ON ways_nodes.node_id = nodes.id'''
+
+
+def has_rtree(conn):
+    '''
+    Returns True if the SQLite library behind conn supports R*Tree virtual tables.
+
+    conn: sqlite3 Connection.
+    '''
+    try:
+        conn.execute('CREATE VIRTUAL TABLE temp.rtree_check USING rtree(id, min_x, max_x)')
+        conn.execute('DROP TABLE temp.rtree_check')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+
+def create_spatial_tables(conn):
+    '''
+    Creates the (empty) nodes_bbox and ways_bbox tables, replacing any that already exist.
+
+    conn: sqlite3 Connection to the database being indexed.
+    '''
+    rtree = has_rtree(conn)
+
+    for table in SPATIAL_TABLES:
+        conn.execute('DROP TABLE IF EXISTS {}'.format(table))
+
+        if rtree:
+            conn.execute('CREATE VIRTUAL TABLE {} USING rtree(id, min_lat, max_lat, min_lon, max_lon)'.format(table))
+        else:
+            conn.execute('''CREATE TABLE {0} (id INTEGER PRIMARY KEY NOT NULL, min_lat REAL, max_lat REAL,
+                                              min_lon REAL, max_lon REAL)'''.format(table))
+            conn.execute('CREATE INDEX {0}_lat_lon_idx ON {0} (min_lat, min_lon)'.format(table))
+
+
+
+def build_spatial_index(conn):
+    '''
+    (Re)builds nodes_bbox and ways_bbox from the nodes and ways_nodes tables. Ways whose nodes aren't in the nodes
+    table (e.g. ones running off the edge of the extract) get the bounding box of the nodes that are present, and
+    ways with no nodes present are left out entirely.
+
+    conn: sqlite3 Connection to the database being indexed. Committing is left to the caller.
+    '''
+    create_spatial_tables(conn)
+
+    conn.execute('''INSERT INTO nodes_bbox (id, min_lat, max_lat, min_lon, max_lon)
+                    SELECT id, lat, lat, lon, lon FROM nodes''')
+    conn.execute('INSERT INTO ways_bbox (id, min_lat, max_lat, min_lon, max_lon) ' + WAY_BOXES +
+                 ' GROUP BY ways_nodes.id')
+
+
+
+def update_spatial_index(conn, node_ids, way_ids):
+    '''
+    Brings the spatial index up to date for nodes and ways whose rows have just been changed (or deleted), along with
+    any ways that use one of the changed nodes. Does nothing if the database has no spatial index.
+
+    conn: sqlite3 Connection to the database being updated. Committing is left to the caller.
+    node_ids: iterable of str/int. IDs of nodes that were created, modified or deleted.
+    way_ids: iterable of str/int. IDs of ways that were created, modified or deleted.
+    '''
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'nodes_bbox'").fetchone()[0] == 0:
+        return
+
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS changed_nodes (id INTEGER PRIMARY KEY)')
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS changed_ways (id INTEGER PRIMARY KEY)')
+    conn.execute('DELETE FROM changed_nodes')
+    conn.execute('DELETE FROM changed_ways')
+    conn.executemany('INSERT OR IGNORE INTO changed_nodes (id) VALUES (?)', ((node_id,) for node_id in node_ids))
+    conn.executemany('INSERT OR IGNORE INTO changed_ways (id) VALUES (?)', ((way_id,) for way_id in way_ids))
+
+    #Moving a node moves the bounding box of every way it belongs to
+    conn.execute('''INSERT OR IGNORE INTO changed_ways (id)
+                    SELECT DISTINCT id FROM ways_nodes WHERE node_id IN (SELECT id FROM changed_nodes)''')
+
+    conn.execute('DELETE FROM nodes_bbox WHERE id IN (SELECT id FROM changed_nodes)')
+    conn.execute('''INSERT INTO nodes_bbox (id, min_lat, max_lat, min_lon, max_lon)
+                    SELECT id, lat, lat, lon, lon FROM nodes WHERE id IN (SELECT id FROM changed_nodes)''')
+
+    conn.execute('DELETE FROM ways_bbox WHERE id IN (SELECT id FROM changed_ways)')
+    conn.execute('INSERT INTO ways_bbox (id, min_lat, max_lat, min_lon, max_lon) ' + WAY_BOXES +
+                 ' WHERE ways_nodes.id IN (SELECT id FROM changed_ways) GROUP BY ways_nodes.id')
+
+
+
+def bbox_query(min_lat, min_lon, max_lat, max_lon, db_name=DATABASE, conn=None):
+    '''
+    Returns the nodes and ways inside (or, for ways, overlapping) a bounding box as a dict of the form
+    {'nodes': [(id, lat, lon), ...], 'ways': [(id, min_lat, max_lat, min_lon, max_lon), ...]}.
+
+    Nodes are checked against their exact coordinates. Way bounding boxes come from the R*Tree, which stores
+    coordinates as 32-bit floats rounded outwards, so ways within ~1e-5 degrees of the box's edge may be included.
+
+    min_lat, min_lon, max_lat, max_lon: float. Edges of the bounding box, in degrees.
+    db_name: str. Filepath of the SQLite database, which must have had build_spatial_index run on it.
+    conn: sqlite3 Connection. If given, used instead of opening (and closing) a connection to db_name.
+    '''
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_name)
+
+    try:
+        nodes = conn.execute('''SELECT nodes.id, nodes.lat, nodes.lon
+                                FROM nodes_bbox JOIN nodes ON nodes_bbox.id = nodes.id
+                                WHERE nodes_bbox.max_lat >= ? AND nodes_bbox.min_lat <= ?
+                                    AND nodes_bbox.max_lon >= ? AND nodes_bbox.min_lon <= ?
+                                    AND nodes.lat BETWEEN ? AND ? AND nodes.lon BETWEEN ? AND ?''',
+                             (min_lat, max_lat, min_lon, max_lon, min_lat, max_lat, min_lon, max_lon)).fetchall()
+
+        ways = conn.execute('''SELECT id, min_lat, max_lat, min_lon, max_lon
+                               FROM ways_bbox
+                               WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?''',
+                            (min_lat, max_lat, min_lon, max_lon)).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+
+    return {'nodes': nodes, 'ways': ways}
@@ -13,11 +13,13 @@ about missing ones that are of type "Rd"
 
 This code is taken from the Udacity Data Analyst Nanodegree case study of OpenStreetMap data
 '''
-import xml.etree.cElementTree as ET
 from collections import defaultdict
+from functools import lru_cache
 import re
 import pprint
 
+import OSMParser as parser
+
 #OSMFILE = "../data_sample_100_elemsWithTags.osm"
 OSMFILE = "../SW_WestVirginia.osm"
 #comment code at end of next line needed to ignore false Eclipse Undefined Variable error for re.IGNORECASE
@@ -51,6 +53,13 @@ mapping = { "St": "Street",
             "hill": "Hill"
             }
 
+#Hash lookups for the above, so that checking a street type doesn't mean scanning a list
+EXPECTED_TYPES = frozenset(expected)
+STREET_TYPE_MAPPING = {street_type: better for street_type, better in mapping.items() if street_type != better}
+
+#Max number of distinct street names whose normalized versions are cached
+STREET_NAME_CACHE_SIZE = 65536
+
 
 
 to_be_mapped = set()
@@ -87,45 +96,42 @@ def audit_street_type(street_types, street_name):
         street_type = m.group()
         #Look to see if the street type string identified by the regex is non-ideal
         #Basically this just ignores any street names that are already idealized
-        if street_type not in expected:
+        if street_type not in EXPECTED_TYPES:
             #print("Found one!")
             street_types[street_type].add(street_name)
             mapping_check(to_be_mapped, street_type)
 
 
-def is_street_name(elem):
+def is_street_name(k):
     '''
-    Determines if the element input is actually a street name
+    Determines if a child tag with key k is actually a street name
     
-    elem: ET element.
+    k: str. The 'k' attribute of the child tag.
     
-    Returns: boolean. Represents status of elem as a street name or not (True or False, resp.)
+    Returns: boolean. Represents status of the tag as a street name or not (True or False, resp.)
     '''
-    return (elem.attrib['k'] == "addr:street")
+    return (k == "addr:street")
 
 
-def audit(osmfile):
+def audit(osmfile, backend=None):
     '''
     Audits the OSM file to determine what street addresses need to be updated to have the ideal street types
     
     osmfile: str. Filepath to the OSM file being audited
+    backend: str. Name of the XML parser backend to use (see OSMParser.BACKENDS), or None for the default.
     
     Returns: dict of sets. EXAMPLE: {'Ave': set(['N. Lincoln Ave', 'North Lincoln Ave']),
                                     'Rd.': set(['Baldwin Rd.']),
                                     'St.': set(['West Lexington St.'])}
     '''
-    osm_file = open(osmfile, "rb")
     street_types = defaultdict(set)
     
-    #parses through the XML file provided and pulls out the tags iteratively
-    for _, elem in ET.iterparse(osm_file, events=("start",)):
-        #elem.iter("tag") here parses through the child-level tags of elem and builds an iterable out of those of
-            #'tag' type, if the parent tag is 'node' or 'way' type and audits that child tag if it is a street name
-        if elem.tag == "node" or elem.tag == "way":
-            for tag in elem.iter("tag"):
-                if is_street_name(tag):
-                    audit_street_type(street_types, tag.attrib['v'])
-    osm_file.close()
+    #parses through the XML file provided, one node/way (with all of its child tags) at a time, and audits each
+        #child tag that is a street name
+    for record in parser.iter_records(osmfile, ('node', 'way'), backend):
+        for k, v in record.tags:
+            if is_street_name(k):
+                audit_street_type(street_types, v)
     return street_types
 
 
@@ -160,22 +166,39 @@ def update_name(name, mapping, printUpdate = True):
 
 
 
-''''This section of code goes through the OSM file, audits it, provides the dict of street types which we need to
-check for any non-ideal street types not already captured by our mapping variable, then updates the names it
-can, using the existing mapping variable'''
-
-
-#Building the street_types dict and checking it out
-st_types = audit(OSMFILE)
-pprint.pprint(dict(st_types))
-print("\nNeed to map these:")
-pprint.pprint(to_be_mapped)
+@lru_cache(maxsize=STREET_NAME_CACHE_SIZE)
+def normalize_street_name(name):
+    '''
+    Returns name with its street type (its last word) replaced by the ideal street type from mapping, or name 
+    unchanged if its street type is already ideal or isn't in mapping. This is the version of update_name used 
+    when correcting data: the same street names turn up over and over again in an extract (every address on
+    "Main St" has one), so results are cached (up to STREET_NAME_CACHE_SIZE names) and each one after the first is
+    just a dict lookup.
+    
+    name: str. Street name (e.g. the 'v' attribute of an 'addr:street' tag), with surrounding whitespace removed.
+    '''
+    prefix, space, street_type = name.rpartition(' ')
+    
+    if street_type in EXPECTED_TYPES or street_type not in STREET_TYPE_MAPPING:
+        return name
+    
+    return prefix + space + STREET_TYPE_MAPPING[street_type]
 
-#We'll now go through each set in the st_types dict and update the street names to have idealized street types
-for st_type, st_names in st_types.items():
-        for name in st_names:
-            better_name = update_name(name, mapping)
 
 
+''''This section of code goes through the OSM file, audits it, provides the dict of street types which we need to
+check for any non-ideal street types not already captured by our mapping variable, then updates the names it
+can, using the existing mapping variable'''
 
 
+if __name__ == "__main__":
+    #Building the street_types dict and checking it out
+    st_types = audit(OSMFILE)
+    pprint.pprint(dict(st_types))
+    print("\nNeed to map these:")
+    pprint.pprint(to_be_mapped)
+    
+    #We'll now go through each set in the st_types dict and update the street names to have idealized street types
+    for st_type, st_names in st_types.items():
+            for name in st_names:
+                better_name = update_name(name, mapping)
@@ -0,0 +1,410 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+This module holds the different "sinks" that the data correction pipeline can write its rows into. Each sink
+receives rows that are already formatted to match the SQL schema described in data_wrangling_schema.sql (and
+de-duplicated, see DataCorrection_and_CSVExport.shape_element), one table at a time, and is responsible for getting
+them to their final destination (e.g. CSV files on disk).
+
+All sinks share the same interface:
+    write(table, rows): takes the name of a table (a key of TABLE_COLUMNS) and a list of rows (lists)
+    close(): flushes anything still buffered and releases any open files/connections
+'''
+from array import array
+import csv
+import os
+import sqlite3
+
+import SpatialIndex as spatial
+
+
+#Column order for each of the SQL tables, mirroring data_wrangling_schema.sql
+TABLE_COLUMNS = {'nodes': ['id', 'lat', 'lon', 'user', 'uid', 'version', 'changeset', 'timestamp'],
+                 'nodes_tags': ['id', 'key', 'value', 'type'],
+                 'ways': ['id', 'user', 'uid', 'version', 'changeset', 'timestamp'],
+                 'ways_tags': ['id', 'key', 'value', 'type'],
+                 'ways_nodes': ['id', 'node_id', 'position'],
+                 'relations': ['id', 'user', 'uid', 'version', 'changeset', 'timestamp'],
+                 'relations_tags': ['id', 'key', 'value', 'type'],
+                 'relations_members': ['id', 'type', 'ref', 'role', 'position']}
+
+#array typecodes for each table's numeric columns ('q' = int64, 'd' = float64); columns not listed hold text
+TABLE_TYPES = {'nodes': {'id': 'q', 'lat': 'd', 'lon': 'd', 'uid': 'q', 'version': 'q', 'changeset': 'q'},
+               'nodes_tags': {'id': 'q'},
+               'ways': {'id': 'q', 'uid': 'q', 'version': 'q', 'changeset': 'q'},
+               'ways_tags': {'id': 'q'},
+               'ways_nodes': {'id': 'q', 'node_id': 'q', 'position': 'q'},
+               'relations': {'id': 'q', 'uid': 'q', 'version': 'q', 'changeset': 'q'},
+               'relations_tags': {'id': 'q'},
+               'relations_members': {'id': 'q', 'ref': 'q', 'position': 'q'}}
+
+#Text columns with few distinct values, which are dictionary-encoded by ParquetSink
+DICTIONARY_COLUMNS = {'user', 'key', 'type', 'role'}
+
+#Order in which tables are written out (and reported on)
+TABLES = ['nodes', 'nodes_tags', 'ways', 'ways_tags', 'ways_nodes', 'relations', 'relations_tags',
+          'relations_members']
+
+DATABASE = '../SW_WV_OSM.db'
+SCHEMA_FILE = '../data_wrangling_schema.sql'
+
+#Settings used while bulk loading into SQLite. These trade crash safety for speed, which is fine since a failed
+#load is simply re-run into a fresh database file.
+SQLITE_PRAGMAS = {'journal_mode': 'OFF',
+                  'synchronous': 'OFF',
+                  'cache_size': -262144, #negative values are in KiB, so this is 256 MB
+                  'temp_store': 'MEMORY',
+                  'locking_mode': 'EXCLUSIVE'}
+
+
+def new_columns(table):
+    '''
+    Returns an empty buffer for each column of table, in column order: a typed array (see TABLE_TYPES) for numeric
+    columns and a list for text columns.
+    '''
+    return [array(TABLE_TYPES[table][column]) if column in TABLE_TYPES[table] else []
+            for column in TABLE_COLUMNS[table]]
+
+
+class DataFrameSink(object):
+    '''
+    Collects every row in memory and, once closed, builds one pandas DataFrame per table and writes each table to
+    CSV. This is the original behavior of correct_and_record and requires enough RAM to hold the entire data set.
+    Rows are kept column by column, with numeric columns in typed arrays (8 bytes per value) rather than as Python 
+    objects, and become int64/float64 DataFrame columns without being copied.
+    '''
+
+    def __init__(self, output_dir):
+        '''
+        output_dir: str. Directory the CSV files (e.g. nodes.csv) will be written into.
+        '''
+        self.output_dir = output_dir
+        self.columns = {table: new_columns(table) for table in TABLES}
+
+
+    def write(self, table, rows):
+        if rows:
+            for column, values in zip(self.columns[table], zip(*rows)):
+                column.extend(values)
+
+
+    def close(self):
+        import numpy as np
+        import pandas as pd
+
+        for table in TABLES:
+            data = {}
+            for name, column in zip(TABLE_COLUMNS[table], self.columns[table]):
+                data[name] = np.frombuffer(column, dtype=column.typecode) if isinstance(column, array) else column
+            
+            table_df = pd.DataFrame(data, columns=TABLE_COLUMNS[table])
+            table_df.to_csv(os.path.join(self.output_dir, table + '.csv'), index=False, encoding='utf-8')
+
+        self.columns = {table: new_columns(table) for table in TABLES}
+
+
+class CSVSink(object):
+    '''
+    Writes rows straight to CSV files as they arrive, holding at most batch_size rows per table in memory before
+    flushing them to disk. Output is formatted the same way as pandas' DataFrame.to_csv (header row, minimal
+    quoting, '\\n' line endings, UTF-8), so the resulting files can be used interchangeably with those made by
+    DataFrameSink.
+    '''
+
+    def __init__(self, output_dir, batch_size=10000, resume_from=None):
+        '''
+        output_dir: str. Directory the CSV files (e.g. nodes.csv) will be written into.
+        batch_size: int. Maximum number of rows buffered per table before they are written to disk.
+        resume_from: dict returned by checkpoint() when a previous CSVSink was writing to output_dir. If given, each
+                        CSV file is cut back to its size at that checkpoint (dropping any rows written, possibly only
+                        in part, after it) and then appended to, rather than the files being started afresh.
+        '''
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+
+        self.files = {}
+        self.writers = {}
+        self.buffers = {}
+
+        for table in TABLES:
+            filepath = os.path.join(output_dir, table + '.csv')
+
+            if resume_from is None:
+                fileOut = open(filepath, 'w', encoding='utf-8', newline='')
+            else:
+                os.truncate(filepath, resume_from[table])
+                fileOut = open(filepath, 'a', encoding='utf-8', newline='')
+
+            self.files[table] = fileOut
+            self.writers[table] = csv.writer(fileOut, lineterminator='\n')
+            self.buffers[table] = []
+
+            if resume_from is None:
+                self.writers[table].writerow(TABLE_COLUMNS[table])
+
+
+    def write(self, table, rows):
+        buffer = self.buffers[table]
+        buffer += rows
+
+        if len(buffer) >= self.batch_size:
+            self.writers[table].writerows(buffer)
+            del buffer[:]
+
+
+    def flush(self):
+        '''
+        Writes all buffered rows to disk.
+        '''
+        for table in TABLES:
+            if self.buffers[table]:
+                self.writers[table].writerows(self.buffers[table])
+                del self.buffers[table][:]
+            self.files[table].flush()
+
+
+    def checkpoint(self):
+        '''
+        Flushes every table to disk (fsync included) and returns a dict mapping each table to the size of its CSV
+        file in bytes, which can be saved (e.g. as JSON) and later used to resume writing from this point (see 
+        resume_from in __init__).
+        '''
+        self.flush()
+
+        sizes = {}
+        for table in TABLES:
+            os.fsync(self.files[table].fileno())
+            sizes[table] = os.fstat(self.files[table].fileno()).st_size
+
+        return sizes
+
+
+    def close(self):
+        self.flush()
+
+        for fileOut in self.files.values():
+            fileOut.close()
+
+
+
+class ParquetSink(object):
+    '''
+    Writes each table to its own Parquet file (e.g. nodes.parquet), one row group at a time as rows arrive, so
+    memory use stays flat like CSVSink. Numeric columns keep their types (see TABLE_TYPES) and the text columns in
+    DICTIONARY_COLUMNS are dictionary-encoded, so readers can load just the columns they need without re-parsing 
+    anything. Requires pyarrow.
+    '''
+
+    def __init__(self, output_dir, row_group_size=100000):
+        '''
+        output_dir: str. Directory the Parquet files (e.g. nodes.parquet) will be written into.
+        row_group_size: int. Number of rows buffered per table before they're written out as a row group.
+        '''
+        #pyarrow is only needed by this sink, so only import it once it's actually used
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.row_group_size = row_group_size
+
+        self.schemas = {}
+        self.writers = {}
+        self.columns = {}
+
+        for table in TABLES:
+            fields = []
+            for column in TABLE_COLUMNS[table]:
+                if column in TABLE_TYPES[table]:
+                    field_type = pa.int64() if TABLE_TYPES[table][column] == 'q' else pa.float64()
+                elif column in DICTIONARY_COLUMNS:
+                    field_type = pa.dictionary(pa.int32(), pa.string())
+                else:
+                    field_type = pa.string()
+                fields.append(pa.field(column, field_type))
+
+            self.schemas[table] = pa.schema(fields)
+            self.writers[table] = pq.ParquetWriter(os.path.join(output_dir, table + '.parquet'), self.schemas[table])
+            self.columns[table] = new_columns(table)
+
+
+    def write(self, table, rows):
+        if rows:
+            columns = self.columns[table]
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+
+            if len(columns[0]) >= self.row_group_size:
+                self._write_row_group(table)
+
+
+    def _write_row_group(self, table):
+        '''
+        Writes the rows buffered for table as a single row group and empties the buffer.
+        '''
+        import numpy as np
+
+        pa = self.pa
+        arrays = []
+
+        for field, column in zip(self.schemas[table], self.columns[table]):
+            if isinstance(column, array):
+                arrays.append(pa.array(np.frombuffer(column, dtype=column.typecode), type=field.type))
+            elif pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(column, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(column, type=field.type))
+
+        self.writers[table].write_table(pa.Table.from_arrays(arrays, schema=self.schemas[table]),
+                                        row_group_size=self.row_group_size)
+        self.columns[table] = new_columns(table)
+
+
+    def flush(self):
+        '''
+        Writes all buffered rows to disk, as one (possibly small) row group per table.
+        '''
+        for table in TABLES:
+            if len(self.columns[table][0]):
+                self._write_row_group(table)
+
+
+    def close(self):
+        self.flush()
+
+        for writer in self.writers.values():
+            writer.close()
+
+
+
+def read_schema(schema_file=SCHEMA_FILE):
+    '''
+    Reads the SQL schema file and returns a tuple of the form (table statements, index statements), each a list
+    of str. Indexes are kept separate so they can be built once all of the data are loaded, which is much faster
+    than updating them on every insert.
+    
+    schema_file: str. Filepath for the SQL schema (e.g. data_wrangling_schema.sql).
+    '''
+    #Drop comment lines first, so that they can't hide what kind of statement follows them
+    with open(schema_file, 'r') as fileIn:
+        schema = ''.join(line for line in fileIn if not line.strip().startswith('--'))
+    
+    statements = [statement.strip() for statement in schema.split(';') if statement.strip()]
+    
+    table_statements = []
+    index_statements = []
+    
+    for statement in statements:
+        if statement.upper().startswith('CREATE INDEX') or statement.upper().startswith('CREATE UNIQUE INDEX'):
+            index_statements.append(statement)
+        else:
+            table_statements.append(statement)
+    
+    return table_statements, index_statements
+
+
+def insert_statement(table, verb='INSERT'):
+    '''
+    Returns a parameterized SQL statement for inserting a full row into table, e.g.
+    'INSERT INTO ways_nodes (id, node_id, position) VALUES (?, ?, ?)'
+    
+    table: str. Name of the table (a key of TABLE_COLUMNS).
+    verb: str. Statement verb to use, e.g. 'INSERT OR REPLACE'.
+    '''
+    return '{} INTO {} ({}) VALUES ({})'.format(verb, table,
+                                                ', '.join(TABLE_COLUMNS[table]),
+                                                ', '.join(['?'] * len(TABLE_COLUMNS[table])))
+
+
+class SQLiteSink(object):
+    '''
+    Loads rows straight into an SQLite database built from data_wrangling_schema.sql, skipping the CSV files 
+    entirely. Rows are inserted with executemany in batches of batch_size, inside transactions of (at least)
+    transaction_size rows, using the pragmas in SQLITE_PRAGMAS. Any indexes in the schema (and, optionally, the
+    spatial index from SpatialIndex.py) are only created once close() is called.
+    
+    NOTE: db_name is expected to be a new (or empty) database, as the schema's tables are created from scratch.
+    '''
+    
+    def __init__(self, db_name=DATABASE, schema_file=SCHEMA_FILE, batch_size=50000, transaction_size=1000000,
+                 pragmas=SQLITE_PRAGMAS, spatial_index=True):
+        '''
+        db_name: str. Filepath of the SQLite database to load into.
+        schema_file: str. Filepath for the SQL schema describing the tables (and indexes) to create.
+        batch_size: int. Max number of rows per table buffered before they're inserted.
+        transaction_size: int. Number of rows inserted before the open transaction is committed.
+        pragmas: dict. Maps SQLite pragma names to the values they're set to for the duration of the load.
+        spatial_index: bool. If True, builds the nodes_bbox/ways_bbox spatial index once everything is loaded.
+        '''
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.spatial_index = spatial_index
+        
+        #isolation_level=None stops sqlite3 from managing transactions itself, so we can make them as large as we like
+        self.conn = sqlite3.connect(db_name, isolation_level=None)
+        for pragma, value in pragmas.items():
+            self.conn.execute('PRAGMA {} = {}'.format(pragma, value))
+        
+        table_statements, self.index_statements = read_schema(schema_file)
+        for statement in table_statements:
+            self.conn.execute(statement)
+        
+        self.inserts = {}
+        self.buffers = {}
+        for table in TABLES:
+            self.inserts[table] = insert_statement(table)
+            self.buffers[table] = []
+        
+        self.rows_in_transaction = 0
+        self.conn.execute('BEGIN')
+        
+        
+    def write(self, table, rows):
+        buffer = self.buffers[table]
+        buffer += rows
+        
+        if len(buffer) >= self.batch_size:
+            self._insert(table)
+            
+            
+    def _insert(self, table):
+        '''
+        Inserts everything buffered for table, committing the open transaction if it has grown large enough.
+        '''
+        buffer = self.buffers[table]
+        
+        self.conn.executemany(self.inserts[table], buffer)
+        self.rows_in_transaction += len(buffer)
+        del buffer[:]
+        
+        if self.rows_in_transaction >= self.transaction_size:
+            self.conn.execute('COMMIT')
+            self.conn.execute('BEGIN')
+            self.rows_in_transaction = 0
+            
+            
+    def flush(self):
+        '''
+        Inserts all buffered rows and commits them.
+        '''
+        for table in TABLES:
+            if self.buffers[table]:
+                self._insert(table)
+        
+        self.conn.execute('COMMIT')
+        self.conn.execute('BEGIN')
+        self.rows_in_transaction = 0
+        
+        
+    def close(self):
+        self.flush()
+        
+        #Now that everything is loaded, build the indexes in one go
+        for statement in self.index_statements:
+            self.conn.execute(statement)
+        if self.spatial_index:
+            spatial.build_spatial_index(self.conn)
+        self.conn.execute('COMMIT')
+        
+        self.conn.close()
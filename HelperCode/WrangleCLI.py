@@ -0,0 +1,192 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Command line entry point for the OSM wrangling pipeline, so that each step can be run (e.g. by a job runner)
+without editing the MAIN EXECUTION SPACE of the individual modules. Each module is only imported once its
+subcommand is chosen, keeping start-up fast.
+
+Usage (from within HelperCode):
+    python WrangleCLI.py correct ../SW_WestVirginia.osm --streaming --workers 4
+    python WrangleCLI.py correct ../SW_WestVirginia.osm --db ../SW_WV_OSM.db
+    python WrangleCLI.py correct ../SW_WestVirginia.osm --format parquet
+    python WrangleCLI.py correct ../SW_WestVirginia.osm --checkpoint ../correct.checkpoint
+    python WrangleCLI.py correct ../SW_WestVirginia.osm --profile ../correct_profile.json
+    python WrangleCLI.py audit ../SW_WestVirginia.osm --options zips 'street types'
+    python WrangleCLI.py count-tags ../data_sample.osm
+    python WrangleCLI.py sample ../SW_WestVirginia.osm ../data_sample_100.osm -k 100
+    python WrangleCLI.py sample ../SW_WestVirginia.osm ../data_sample_1000.osm --size 1000 --seed 0
+    python WrangleCLI.py apply-changes ../daily_update.osc --db ../SW_WV_OSM.db
+    python WrangleCLI.py query "SELECT COUNT(*) FROM nodes" --db ../SW_WV_OSM.db
+    python WrangleCLI.py bbox 37.7 -81.3 37.8 -81.1 --db ../SW_WV_OSM.db
+    python WrangleCLI.py --parser etree count-tags ../data_sample.osm
+'''
+import argparse
+import pprint
+
+
+DATABASE = '../SW_WV_OSM.db'
+
+
+def correct(args):
+    import DataCorrection_and_CSVExport as correction
+    import TableSinks as sinks
+
+    if args.db:
+        sink = sinks.SQLiteSink(args.db)
+    elif args.format == 'parquet':
+        sink = sinks.ParquetSink(args.output_dir)
+    else:
+        sink = None
+
+    if args.profile:
+        import PipelineProfiler
+        profiler = PipelineProfiler.PipelineProfiler()
+    else:
+        profiler = None
+
+    correction.correct_and_record(args.osm_file, output_dir=args.output_dir, streaming=args.streaming,
+                                  batch_size=args.batch_size, workers=args.workers, chunk_size=args.chunk_size,
+                                  sink=sink, backend=args.parser, checkpoint_file=args.checkpoint,
+                                  profiler=profiler)
+
+    if profiler is not None:
+        profiler.write_report(args.profile)
+        print(profiler.summary())
+
+
+def audit(args):
+    import Audit_Simple
+
+    Audit_Simple.audit(args.osm_file, args.options, args.parser)
+
+
+def count_tags(args):
+    import TagCounting
+
+    pprint.pprint(TagCounting.count_tags(args.osm_file, args.parser))
+
+
+def sample(args):
+    import OSMSampler
+
+    if args.size is None:
+        sampler = OSMSampler.EveryKthSampler(args.k, tagged_only=not args.all_elements, bbox=args.bbox)
+    else:
+        size = {elem_type: args.size for elem_type in args.stratify} if args.stratify else args.size
+        sampler = OSMSampler.ReservoirSampler(size, tagged_only=not args.all_elements, bbox=args.bbox,
+                                              seed=args.seed)
+
+    OSMSampler.write_samples(args.osm_file, {args.sample_file: sampler}, complete_ways=not args.incomplete,
+                             backend=args.parser)
+
+
+def apply_changes(args):
+    import ChangeFileIngest
+
+    pprint.pprint(ChangeFileIngest.apply_changes(args.osc_file, args.db, args.parser))
+
+
+def query(args):
+    import DBQuerying
+
+    print(DBQuerying.run_query([args.sql], args.db))
+
+
+def bbox(args):
+    import SpatialIndex
+
+    pprint.pprint(SpatialIndex.bbox_query(args.min_lat, args.min_lon, args.max_lat, args.max_lon, args.db))
+
+
+
+def build_parser():
+    '''
+    Returns the argparse parser for all of the subcommands.
+    '''
+    #Only the defaults are needed here, which are cheap to import
+    from DataCorrection_and_CSVExport import OUTPUT_DIR, BATCH_SIZE, CHUNK_SIZE
+    from AuditEngine import VISITORS
+    from OSMParser import BACKENDS
+
+    parser = argparse.ArgumentParser(description='Audit, correct and load OpenStreetMap data.')
+    parser.add_argument('--parser', choices=sorted(BACKENDS), help='XML parser backend (default: expat)')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    correct_parser = subparsers.add_parser('correct', help='correct an OSM file and record it as CSV or SQLite')
+    correct_parser.add_argument('osm_file')
+    correct_parser.add_argument('--output-dir', default=OUTPUT_DIR, help='directory the table files are written to')
+    correct_parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                                help='file format for the tables (parquet requires pyarrow)')
+    correct_parser.add_argument('--streaming', action='store_true',
+                                help='write CSVs in batches as the file is parsed, keeping memory use flat')
+    correct_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    correct_parser.add_argument('--workers', type=int, default=1, help='number of correction processes')
+    correct_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                                help='bytes of XML per worker task (only used with --workers > 1)')
+    correct_parser.add_argument('--db', help='load straight into this SQLite database instead of writing CSVs')
+    correct_parser.add_argument('--checkpoint', help='save progress to this file as the CSVs are written, and resume '
+                                                     'from it if it exists (e.g. after a crash)')
+    correct_parser.add_argument('--profile', metavar='REPORT_FILE',
+                                help='time each stage of the correction, printing a summary and writing a JSON '
+                                     'report to this file')
+    correct_parser.set_defaults(func=correct)
+
+    audit_names = [visitor.name for visitor in VISITORS]
+    audit_parser = subparsers.add_parser('audit', help='run any of the audits in a single pass')
+    audit_parser.add_argument('osm_file')
+    audit_parser.add_argument('--options', nargs='+', choices=audit_names, default=audit_names)
+    audit_parser.set_defaults(func=audit)
+
+    count_parser = subparsers.add_parser('count-tags', help='count the XML elements of each type')
+    count_parser.add_argument('osm_file')
+    count_parser.set_defaults(func=count_tags)
+
+    sample_parser = subparsers.add_parser('sample', help='write every k-th element (with tags), or a random sample, '
+                                                         'to a new file')
+    sample_parser.add_argument('osm_file')
+    sample_parser.add_argument('sample_file')
+    sample_parser.add_argument('-k', type=int, default=100)
+    sample_parser.add_argument('--size', type=int, help='take a random sample of this many elements instead')
+    sample_parser.add_argument('--stratify', nargs='+', choices=['node', 'way', 'relation'],
+                               help='with --size, take that many elements of each of these types')
+    sample_parser.add_argument('--bbox', nargs=4, type=float, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                               help='only sample elements inside this bounding box')
+    sample_parser.add_argument('--seed', type=int, help='random seed, for reproducible samples')
+    sample_parser.add_argument('--all-elements', action='store_true',
+                               help='sample elements without any tags too')
+    sample_parser.add_argument('--incomplete', action='store_true',
+                               help="don't add the nodes of sampled ways to the sample")
+    sample_parser.set_defaults(func=sample)
+
+    changes_parser = subparsers.add_parser('apply-changes', help='apply an osmChange (.osc) diff to a database')
+    changes_parser.add_argument('osc_file')
+    changes_parser.add_argument('--db', default=DATABASE)
+    changes_parser.set_defaults(func=apply_changes)
+
+    query_parser = subparsers.add_parser('query', help='run a SQL query and print the results')
+    query_parser.add_argument('sql')
+    query_parser.add_argument('--db', default=DATABASE)
+    query_parser.set_defaults(func=query)
+
+    bbox_parser = subparsers.add_parser('bbox', help='list the nodes and ways inside a bounding box')
+    for edge in ['min_lat', 'min_lon', 'max_lat', 'max_lon']:
+        bbox_parser.add_argument(edge, type=float)
+    bbox_parser.add_argument('--db', default=DATABASE)
+    bbox_parser.set_defaults(func=bbox)
+
+    return parser
+
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+
+######## MAIN EXECUTION SPACE ########
+if __name__ == "__main__":
+    main()
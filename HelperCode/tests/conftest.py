@@ -0,0 +1,31 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Shared setup for the tests. The helper modules are imported as top-level modules and their default filepaths
+(e.g. CENSUS_FILE, SCHEMA_FILE) are relative to HelperCode/, just as when they're run from there, so every test runs
+with HelperCode/ as its working directory.
+'''
+import os
+import sys
+
+import pytest
+
+
+HELPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(HELPER_DIR)
+
+sys.path.insert(0, HELPER_DIR)
+
+
+@pytest.fixture(autouse=True)
+def helper_dir(monkeypatch):
+    monkeypatch.chdir(HELPER_DIR)
+
+
+def fixture_path(filename):
+    '''
+    Returns the absolute filepath of one of the OSM files bundled at the top of the repo (e.g. test_osm.osm).
+    '''
+    return os.path.join(REPO_DIR, filename)
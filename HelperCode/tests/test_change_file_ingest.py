@@ -0,0 +1,55 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests applying test_osm_change.osc to a database loaded from test_osm.osm.
+'''
+import sqlite3
+
+import ChangeFileIngest as ingest
+import DataCorrection_and_CSVExport as correction
+import TableSinks as sinks
+
+from conftest import fixture_path
+
+
+def row_counts(conn):
+    return {table: conn.execute('SELECT COUNT(*) FROM {}'.format(table)).fetchone()[0] for table in sinks.TABLES}
+
+
+def test_apply_changes_twice(tmp_path):
+    db_name = str(tmp_path / 'test_osm.db')
+    correction.correct_and_record(fixture_path('test_osm.osm'), sink=sinks.SQLiteSink(db_name))
+
+    ingest.apply_changes(fixture_path('test_osm_change.osc'), db_name)
+
+    conn = sqlite3.connect(db_name)
+    try:
+        #Created
+        assert conn.execute('SELECT lat, lon FROM nodes WHERE id = 9000000001').fetchall() == [(41.9712, -87.6905)]
+
+        #Modified
+        assert conn.execute('SELECT version FROM nodes WHERE id = 2406124091').fetchone() == (3,)
+        tags = dict(conn.execute('SELECT key, value FROM nodes_tags WHERE id = 2406124091'))
+        assert tags['street'] == 'North Lincoln Avenue'
+        assert 'phone' not in tags
+
+        #Deleted
+        for table in ['ways', 'ways_tags', 'ways_nodes']:
+            assert conn.execute('SELECT COUNT(*) FROM {} WHERE id = 258219703'.format(table)).fetchone() == (0,)
+        assert conn.execute('SELECT COUNT(*) FROM nodes WHERE id = 757860928').fetchone() == (0,)
+        assert conn.execute('SELECT COUNT(*) FROM nodes_tags WHERE id = 757860928').fetchone() == (0,)
+
+        counts = row_counts(conn)
+    finally:
+        conn.close()
+
+    #Applying the same diff again changes nothing
+    ingest.apply_changes(fixture_path('test_osm_change.osc'), db_name)
+
+    conn = sqlite3.connect(db_name)
+    try:
+        assert row_counts(conn) == counts
+    finally:
+        conn.close()
@@ -0,0 +1,98 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests that a correct_and_record run killed partway through and resumed from its checkpoint_file writes exactly the
+same CSVs as an uninterrupted run.
+'''
+import bz2
+import filecmp
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import Benchmarks
+import DataCorrection_and_CSVExport as correction
+import TableSinks as sinks
+
+from conftest import HELPER_DIR, fixture_path
+
+
+CHUNK_SIZE = 2**15
+CHECKPOINT_INTERVAL = 2**17
+
+#The run is killed just before saving this (1-based) checkpoint, after its rows have been flushed to the CSVs, so the
+#CSVs hold rows past the last checkpoint that was actually saved
+KILL_AT_CHECKPOINT = 3
+
+#Run in a child process of its own session, so that killing the session also kills any worker processes. The CSVs
+#get flushed for the checkpoint before save_checkpoint is called, which is where the whole session is SIGKILLed.
+INTERRUPTED_RUN = textwrap.dedent('''
+    import os, signal
+    import DataCorrection_and_CSVExport as correction
+
+    save_checkpoint = correction.save_checkpoint
+    saved = []
+
+    def save_checkpoint_then_die(*args):
+        if len(saved) + 1 == {kill_at}:
+            os.killpg(os.getpgid(0), signal.SIGKILL)
+        save_checkpoint(*args)
+        saved.append(args)
+
+    correction.save_checkpoint = save_checkpoint_then_die
+    correction.correct_and_record({osm_file!r}, {output_dir!r}, workers={workers}, chunk_size={chunk_size},
+                                  checkpoint_file={checkpoint_file!r}, checkpoint_interval={checkpoint_interval})
+''')
+
+
+@pytest.fixture(scope='module')
+def scaled_fixture(tmp_path_factory):
+    osm_file = str(tmp_path_factory.mktemp('fixture') / 'data_sample_x2.osm')
+    Benchmarks.scale_fixture(fixture_path('data_sample.osm'), 2, osm_file)
+
+    return osm_file
+
+
+@pytest.mark.parametrize('compression, workers', [(None, 1), (None, 2), ('bz2', 1)])
+def test_kill_and_resume(scaled_fixture, tmp_path, compression, workers):
+    osm_file = scaled_fixture
+    if compression == 'bz2':
+        osm_file = str(tmp_path / 'data_sample_x2.osm.bz2')
+        with open(scaled_fixture, 'rb') as fileIn, bz2.open(osm_file, 'wb') as fileOut:
+            fileOut.write(fileIn.read())
+
+    expected_dir = tmp_path / 'expected'
+    resumed_dir = tmp_path / 'resumed'
+    expected_dir.mkdir()
+    resumed_dir.mkdir()
+    checkpoint_file = str(tmp_path / 'correct.checkpoint')
+
+    correction.correct_and_record(osm_file, str(expected_dir), streaming=True)
+
+    run = subprocess.run([sys.executable, '-c',
+                          INTERRUPTED_RUN.format(kill_at=KILL_AT_CHECKPOINT, osm_file=osm_file,
+                                                 output_dir=str(resumed_dir), workers=workers,
+                                                 chunk_size=CHUNK_SIZE, checkpoint_file=checkpoint_file,
+                                                 checkpoint_interval=CHECKPOINT_INTERVAL)],
+                         cwd=HELPER_DIR, start_new_session=True)
+
+    assert run.returncode == -signal.SIGKILL
+
+    #The resumed run has to pick up partway through osm_file and cut off the rows written after the checkpoint
+    checkpoint = correction.load_checkpoint(checkpoint_file, osm_file, str(resumed_dir))
+    assert checkpoint['offset'] > 0
+    assert any(os.path.getsize(str(resumed_dir / (table + '.csv'))) > size
+               for table, size in checkpoint['outputs'].items())
+
+    correction.correct_and_record(osm_file, str(resumed_dir), workers=workers, chunk_size=CHUNK_SIZE,
+                                  checkpoint_file=checkpoint_file, checkpoint_interval=CHECKPOINT_INTERVAL)
+
+    assert not os.path.exists(checkpoint_file)
+    for table in sinks.TABLES:
+        assert filecmp.cmp(str(expected_dir / (table + '.csv')), str(resumed_dir / (table + '.csv')), shallow=False)
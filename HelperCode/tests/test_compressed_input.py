@@ -0,0 +1,112 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests reading bzip2, gzip and xz compressed OSM files through OSMParser.open_osm and its BackgroundReader.
+'''
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+
+import OSMParser as parser
+
+from conftest import fixture_path
+
+
+COMPRESSORS = {'bz2': bz2.compress, 'gz': gzip.compress, 'xz': lzma.compress}
+
+
+class FailingFile(object):
+    '''
+    File object that gives a few blocks of data and then fails, like a corrupt compressed file.
+    '''
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.closed = False
+
+    def read(self, size):
+        if not self.blocks:
+            raise OSError('Invalid data stream')
+        return self.blocks.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def compress_fixture(tmp_path, filename, extension):
+    with open(fixture_path(filename), 'rb') as fileIn:
+        data = fileIn.read()
+
+    compressed_file = tmp_path / (filename + '.' + extension)
+    compressed_file.write_bytes(COMPRESSORS[extension](data))
+    return str(compressed_file)
+
+
+@pytest.mark.parametrize('extension', sorted(COMPRESSORS))
+@pytest.mark.parametrize('background', [True, False])
+def test_compressed_records_match_plain(tmp_path, extension, background):
+    compressed_file = compress_fixture(tmp_path, 'test_osm.osm', extension)
+
+    with parser.open_osm(compressed_file, background=background) as fileIn:
+        assert isinstance(fileIn, parser.BackgroundReader) == background
+        records = list(parser.iter_records(fileIn, types=None))
+
+    assert records == list(parser.iter_records(fixture_path('test_osm.osm'), types=None))
+
+
+@pytest.mark.parametrize('extension', sorted(COMPRESSORS))
+def test_compression_detected_without_extension(tmp_path, extension):
+    compressed_file = tmp_path / 'test_osm.osm'
+    with open(compress_fixture(tmp_path, 'test_osm.osm', extension), 'rb') as fileIn:
+        compressed_file.write_bytes(fileIn.read())
+
+    assert list(parser.iter_records(str(compressed_file))) == list(parser.iter_records(fixture_path('test_osm.osm')))
+
+
+def test_small_blocks_and_seek():
+    with open(fixture_path('test_osm.osm'), 'rb') as fileIn:
+        data = fileIn.read()
+
+    reader = parser.BackgroundReader(io.BytesIO(data), block_size=7, readahead=2)
+    try:
+        assert reader.read(10) == data[:10]
+        assert reader.seek(100) == 100
+        assert reader.tell() == 100
+        with pytest.raises(io.UnsupportedOperation):
+            reader.seek(50)
+        assert reader.read() == data[100:]
+        assert reader.read() == b''
+    finally:
+        reader.close()
+
+
+def test_reader_thread_error_reaches_consumer():
+    fileIn = FailingFile([b'<osm>', b'<node id="1"/>'])
+    reader = parser.BackgroundReader(fileIn, block_size=5)
+
+    assert reader.read(5) == b'<osm>'
+    with pytest.raises(OSError, match='Invalid data stream'):
+        reader.read()
+    #The thread has stopped, so later reads must raise again rather than wait for more blocks
+    with pytest.raises(OSError, match='Invalid data stream'):
+        reader.read(100)
+
+    reader.close()
+    assert not reader.thread.is_alive()
+    assert fileIn.closed
+
+
+def test_truncated_file_raises(tmp_path):
+    compressed_file = compress_fixture(tmp_path, 'test_osm.osm', 'bz2')
+    with open(compressed_file, 'rb') as fileIn:
+        data = fileIn.read()
+    with open(compressed_file, 'wb') as fileOut:
+        fileOut.write(data[:len(data) // 2])
+
+    with pytest.raises(EOFError):
+        list(parser.iter_records(compressed_file))
@@ -0,0 +1,79 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests for correct_and_record and shape_element.
+'''
+import csv
+import filecmp
+import sqlite3
+
+import pytest
+
+import DataCorrection_and_CSVExport as correction
+import TableSinks as sinks
+
+from conftest import fixture_path
+
+
+def correct_to(output_dir, osm_file, **kwargs):
+    output_dir.mkdir()
+    correction.correct_and_record(osm_file, str(output_dir), **kwargs)
+    return output_dir
+
+
+def assert_same_tables(expected_dir, actual_dir):
+    for table in sinks.TABLES:
+        assert filecmp.cmp(str(expected_dir / (table + '.csv')), str(actual_dir / (table + '.csv')), shallow=False)
+
+
+@pytest.mark.parametrize('chunk_size', [64, 500, 2000])
+def test_workers_match_serial(tmp_path, chunk_size):
+    osm_file = fixture_path('test_osm.osm')
+
+    #Reads this small end partway through elements, so iter_chunks has to carry them over into the next chunk
+    with open(osm_file, 'rb') as fileIn:
+        chunks = list(correction.iter_chunks(fileIn, chunk_size))
+    assert len(chunks) > 3
+
+    serial_dir = correct_to(tmp_path / 'serial', osm_file)
+    workers_dir = correct_to(tmp_path / 'workers', osm_file, workers=2, chunk_size=chunk_size)
+
+    assert_same_tables(serial_dir, workers_dir)
+
+
+#The one relation in test_osm.osm (a turn restriction), as it should come out of correction
+RELATION_ROWS = {'relations': [[1557627, 'fredr', 939355, 2, 14326854, '2012-12-19T05:32:37Z']],
+                 'relations_tags': [[1557627, 'restriction', 'only_right_turn', 'regular'],
+                                    [1557627, 'type', 'restriction', 'regular']],
+                 'relations_members': [[1557627, 'node', 1258927212, 'via', 0],
+                                       [1557627, 'way', 110160127, 'from', 1],
+                                       [1557627, 'way', 34073105, 'to', 2]]}
+
+
+def read_csv_rows(path):
+    with open(str(path), encoding='utf-8') as fileIn:
+        return list(csv.reader(fileIn))
+
+
+def test_relations_csv(tmp_path):
+    output_dir = correct_to(tmp_path / 'csv', fixture_path('test_osm.osm'))
+
+    for table, rows in RELATION_ROWS.items():
+        assert read_csv_rows(output_dir / (table + '.csv')) == ([sinks.TABLE_COLUMNS[table]] +
+                                                                [[str(value) for value in row] for row in rows])
+
+
+def test_relations_sqlite(tmp_path):
+    db_name = str(tmp_path / 'test_osm.db')
+    correction.correct_and_record(fixture_path('test_osm.osm'), sink=sinks.SQLiteSink(db_name))
+
+    conn = sqlite3.connect(db_name)
+    try:
+        for table, rows in RELATION_ROWS.items():
+            order = 'position' if table == 'relations_members' else 'rowid'
+            assert conn.execute('SELECT * FROM {} ORDER BY {}'.format(table, order)).fetchall() == \
+                   [tuple(row) for row in rows]
+    finally:
+        conn.close()
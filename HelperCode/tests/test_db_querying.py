@@ -0,0 +1,68 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests that DBQuerying never returns results from before a write to the database.
+'''
+import sqlite3
+
+import DBQuerying
+
+
+def make_database(db_name):
+    '''
+    Returns an open connection to a new WAL-mode database with a single-row table, whose writes stay in the -wal
+    file for as long as the connection is open.
+    '''
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('CREATE TABLE counts (n INTEGER)')
+    conn.execute('INSERT INTO counts VALUES (1)')
+
+    return conn
+
+
+def test_requery_after_write(tmp_path):
+    db_name = str(tmp_path / 'wal.db')
+    writer = make_database(db_name)
+    client = DBQuerying.QueryClient(db_name)
+
+    try:
+        assert client.query('SELECT n FROM counts', as_frame=False) == [(1,)]
+
+        writer.execute('UPDATE counts SET n = 2')
+        assert client.query('SELECT n FROM counts', as_frame=False) == [(2,)]
+    finally:
+        client.close()
+        writer.close()
+
+
+def test_cached_requery_after_wal_write(tmp_path):
+    db_name = str(tmp_path / 'wal.db')
+    writer = make_database(db_name)
+    client = DBQuerying.QueryClient(db_name)
+
+    try:
+        assert client.query('SELECT n FROM counts', as_frame=False, cache=True) == [(1,)]
+        assert client.query('SELECT n FROM counts', as_frame=False, cache=True) == [(1,)]
+        assert len(client.results) == 1
+
+        #Only the -wal file changes here, not the database file itself
+        writer.execute('UPDATE counts SET n = 2')
+        assert client.query('SELECT n FROM counts', as_frame=False, cache=True) == [(2,)]
+    finally:
+        client.close()
+        writer.close()
+
+
+def test_run_query_does_not_cache_by_default(tmp_path):
+    db_name = str(tmp_path / 'wal.db')
+    writer = make_database(db_name)
+
+    try:
+        assert DBQuerying.run_query(['SELECT n', 'FROM counts'], db_name)['n'].tolist() == [1]
+        assert not DBQuerying.get_client(db_name).results
+    finally:
+        DBQuerying.get_client(db_name).close()
+        writer.close()
@@ -0,0 +1,40 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests for OSMParser.
+'''
+import pytest
+
+import OSMParser as parser
+
+from conftest import fixture_path
+
+
+@pytest.mark.parametrize('backend', parser.available_backends())
+@pytest.mark.parametrize('filename, types', [('test_osm.osm', parser.ENTITY_TYPES),
+                                             ('test_osm.osm', None),
+                                             ('data_sample_100_elemsWithTags.osm', parser.ENTITY_TYPES),
+                                             ('test_osm_change.osc', None)])
+def test_backends_agree(backend, filename, types):
+    expected = list(parser.iter_records(fixture_path(filename), types, backend='expat'))
+    records = list(parser.iter_records(fixture_path(filename), types, backend=backend))
+
+    assert records == expected
+    assert all(isinstance(record, parser.OSMElement) for record in records)
+
+
+def test_expat_records():
+    records = list(parser.iter_records(fixture_path('test_osm.osm'), backend='expat'))
+
+    assert [record.type for record in records].count('node') == 23
+    assert records[-1] == parser.OSMElement('relation',
+                                            {'id': '1557627', 'visible': 'true', 'version': '2',
+                                             'changeset': '14326854', 'timestamp': '2012-12-19T05:32:37Z',
+                                             'user': 'fredr', 'uid': '939355'},
+                                            [('restriction', 'only_right_turn'), ('type', 'restriction')],
+                                            [],
+                                            [{'type': 'node', 'ref': '1258927212', 'role': 'via'},
+                                             {'type': 'way', 'ref': '110160127', 'role': 'from'},
+                                             {'type': 'way', 'ref': '34073105', 'role': 'to'}])
@@ -0,0 +1,136 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests for the samplers in OSMSampler.py and SampleMapData_Small.write_sample.
+'''
+from collections import Counter
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import OSMParser as parser
+import OSMSampler as sampling
+import SampleMapData_Small
+
+from conftest import fixture_path
+
+
+#Two ways (each with two nodes) and three relations, of which node 5, way 10 and relation 20 (and nodes 1 and 2)
+#are inside TINY_BBOX
+TINY_OSM = b'''<?xml version="1.0" encoding="UTF-8"?>
+<osm>
+ <node id="1" lat="10.0" lon="10.0"><tag k="name" v="one"/></node>
+ <node id="2" lat="10.5" lon="10.5"/>
+ <node id="3" lat="20.0" lon="20.0"/>
+ <node id="4" lat="20.5" lon="20.5"><tag k="name" v="four"/></node>
+ <node id="5" lat="10.2" lon="10.2"><tag k="name" v="five"/></node>
+ <way id="10"><nd ref="1"/><nd ref="2"/><tag k="highway" v="residential"/></way>
+ <way id="11"><nd ref="3"/><nd ref="4"/><tag k="highway" v="residential"/></way>
+ <relation id="20"><member type="way" ref="10" role=""/><tag k="type" v="route"/></relation>
+ <relation id="21"><member type="way" ref="11" role=""/><tag k="type" v="route"/></relation>
+ <relation id="22"><member type="node" ref="3" role=""/><tag k="type" v="route"/></relation>
+</osm>
+'''
+
+TINY_BBOX = (9.0, 9.0, 11.0, 11.0)
+
+
+@pytest.fixture
+def tiny_osm(tmp_path):
+    osm_file = tmp_path / 'tiny.osm'
+    osm_file.write_bytes(TINY_OSM)
+    return str(osm_file)
+
+
+def ids(records):
+    return [(record.type, record.attrs['id']) for record in records]
+
+
+def test_sampler_must_override_abstract_methods():
+    class ChoosesNothing(sampling.Sampler):
+        def choose(self, record, position):
+            pass
+
+    with pytest.raises(TypeError):
+        ChoosesNothing()
+
+
+def test_reservoir_size_and_seed():
+    osm_file = fixture_path('data_sample.osm')
+
+    sample, same_seed, other_seed = sampling.run_samplers(osm_file,
+                                                          [sampling.ReservoirSampler(50, seed=1),
+                                                           sampling.ReservoirSampler(50, seed=1),
+                                                           sampling.ReservoirSampler(50, seed=2)],
+                                                          complete_ways=False)
+
+    assert len(sample) == 50
+    assert len(set(ids(sample))) == 50
+    assert ids(sample) == ids(same_seed)
+    assert ids(sample) != ids(other_seed)
+
+
+def test_stratified_counts():
+    sizes = {'node': 20, 'way': 5, 'relation': 2}
+
+    sample, = sampling.run_samplers(fixture_path('data_sample.osm'), [sampling.ReservoirSampler(sizes, seed=0)],
+                                    complete_ways=False)
+
+    assert Counter(record.type for record in sample) == sizes
+
+
+def test_bbox(tiny_osm):
+    sample, = sampling.run_samplers(tiny_osm, [sampling.ReservoirSampler(100, bbox=TINY_BBOX, seed=0)],
+                                    complete_ways=False)
+
+    assert ids(sample) == [('node', '1'), ('node', '2'), ('node', '5'), ('way', '10'), ('relation', '20')]
+
+
+@pytest.mark.parametrize('complete_ways', [True, False])
+def test_complete_ways(tiny_osm, complete_ways):
+    sample, = sampling.run_samplers(tiny_osm, [sampling.EveryKthSampler(1, types=('way',))],
+                                    complete_ways=complete_ways)
+
+    if complete_ways:
+        #The ways' nodes are fetched in the second pass and put back in file order
+        assert ids(sample) == [('node', '1'), ('node', '2'), ('node', '3'), ('node', '4'),
+                               ('way', '10'), ('way', '11')]
+    else:
+        assert ids(sample) == [('way', '10'), ('way', '11')]
+
+
+def write_baseline_sample(osm_file, sample_file, k):
+    '''
+    The original SampleMapData_Small sampling: every k-th node/way/relation with child tags, copied out with
+    ElementTree.
+    '''
+    with open(sample_file, 'wb') as output:
+        output.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        output.write(b'<osm>\n  ')
+
+        context = iter(ET.iterparse(osm_file, events=('start', 'end')))
+        _, root = next(context)
+        tagged = (elem for event, elem in context
+                  if event == 'end' and elem.tag in ('node', 'way', 'relation') and list(elem.iter(tag='tag')))
+
+        for i, element in enumerate(tagged):
+            if i % k == 0:
+                output.write(ET.tostring(element, encoding='utf-8'))
+            root.clear()
+
+        output.write(b'</osm>')
+
+
+def test_write_sample_matches_baseline(tmp_path):
+    osm_file = fixture_path('data_sample.osm')
+    baseline_file = str(tmp_path / 'baseline.osm')
+    sample_file = str(tmp_path / 'sample.osm')
+
+    write_baseline_sample(osm_file, baseline_file, 10)
+    SampleMapData_Small.write_sample(osm_file, sample_file, 10)
+
+    sample = list(parser.iter_records(sample_file))
+    assert len(sample) > 10
+    assert sample == list(parser.iter_records(baseline_file))
@@ -0,0 +1,62 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests that ParquetSink writes typed (and dictionary-encoded) columns holding the same rows as the CSVs.
+'''
+import csv
+
+import pytest
+
+import DataCorrection_and_CSVExport as correction
+import TableSinks as sinks
+
+from conftest import fixture_path
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+CONVERTERS = {'q': int, 'd': float}
+
+
+def read_csv_table(path, table):
+    '''
+    Returns the rows of a CSV written by CSVSink as dicts, with numeric columns parsed according to TABLE_TYPES.
+    '''
+    types = sinks.TABLE_TYPES[table]
+
+    with open(str(path), encoding='utf-8') as fileIn:
+        return [{column: CONVERTERS[types[column]](value) if column in types else value
+                 for column, value in row.items()}
+                for row in csv.DictReader(fileIn)]
+
+
+def test_parquet_matches_csv(tmp_path):
+    parquet_dir = tmp_path / 'parquet'
+    csv_dir = tmp_path / 'csv'
+    parquet_dir.mkdir()
+    csv_dir.mkdir()
+
+    #A tiny row group size, so that tables span several row groups
+    correction.correct_and_record(fixture_path('test_osm.osm'), sink=sinks.ParquetSink(str(parquet_dir), 5))
+    correction.correct_and_record(fixture_path('test_osm.osm'), str(csv_dir), streaming=True)
+
+    for table in sinks.TABLES:
+        parquet_table = pq.read_table(str(parquet_dir / (table + '.parquet')))
+
+        assert parquet_table.column_names == sinks.TABLE_COLUMNS[table]
+        for field in parquet_table.schema:
+            typecode = sinks.TABLE_TYPES[table].get(field.name)
+            if typecode == 'q':
+                assert field.type == pa.int64()
+            elif typecode == 'd':
+                assert field.type == pa.float64()
+            elif field.name in sinks.DICTIONARY_COLUMNS:
+                assert pa.types.is_dictionary(field.type)
+                assert field.type.value_type == pa.string()
+            else:
+                assert field.type == pa.string()
+
+        assert parquet_table.to_pylist() == read_csv_table(csv_dir / (table + '.csv'), table)
@@ -0,0 +1,86 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests that test_osm.osm.pbf reads (and corrects) the same as test_osm.osm, and that metadata-stripped PBF files
+(like Geofabrik's public extracts) can be corrected.
+'''
+import csv
+import filecmp
+
+import pytest
+
+import DataCorrection_and_CSVExport as correction
+import OSMParser as parser
+import PBFReader as pbf
+import TableSinks as sinks
+
+from conftest import fixture_path
+
+
+def comparable(record):
+    '''
+    Returns record with its coordinates as floats (PBF always writes all 7 decimals, XML may drop trailing zeros)
+    and without the 'visible' attribute, which PBF doesn't store.
+    '''
+    attrs = {k: v for k, v in record.attrs.items() if k != 'visible'}
+    for coordinate in ['lat', 'lon']:
+        if coordinate in attrs:
+            attrs[coordinate] = float(attrs[coordinate])
+
+    return parser.OSMElement(record.type, attrs, record.tags, record.nds, record.members)
+
+
+def test_records_match_xml():
+    xml_records = [comparable(record) for record in parser.iter_records(fixture_path('test_osm.osm'))]
+    pbf_records = [comparable(record) for record in parser.iter_records(fixture_path('test_osm.osm.pbf'))]
+
+    assert pbf_records == xml_records
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_corrected_tables_match_xml(tmp_path, workers):
+    xml_dir = tmp_path / 'xml'
+    pbf_dir = tmp_path / 'pbf'
+    xml_dir.mkdir()
+    pbf_dir.mkdir()
+
+    correction.correct_and_record(fixture_path('test_osm.osm'), str(xml_dir), streaming=True)
+    correction.correct_and_record(fixture_path('test_osm.osm.pbf'), str(pbf_dir), streaming=True, workers=workers)
+
+    for table in sinks.TABLES:
+        assert filecmp.cmp(str(xml_dir / (table + '.csv')), str(pbf_dir / (table + '.csv')), shallow=False)
+
+
+def test_metadata_stripped(tmp_path):
+    #Keep only what a metadata-stripped extract has: IDs, coordinates, tags, node refs and members
+    stripped = [parser.OSMElement(record.type, {k: v for k, v in record.attrs.items() if k in ('id', 'lat', 'lon')},
+                                  record.tags, record.nds, record.members)
+                for record in parser.iter_records(fixture_path('test_osm.osm'))]
+
+    pbf_file = str(tmp_path / 'stripped.osm.pbf')
+    pbf.write_pbf(stripped, pbf_file)
+
+    assert [record.attrs for record in pbf.iter_pbf(pbf_file)] == [record.attrs for record in stripped]
+
+    xml_dir = tmp_path / 'xml'
+    pbf_dir = tmp_path / 'pbf'
+    xml_dir.mkdir()
+    pbf_dir.mkdir()
+
+    correction.correct_and_record(fixture_path('test_osm.osm'), str(xml_dir), streaming=True)
+    correction.correct_and_record(pbf_file, str(pbf_dir), streaming=True)
+
+    for table in ['nodes', 'ways', 'relations']:
+        with open(str(pbf_dir / (table + '.csv')), encoding='utf-8') as fileIn:
+            rows = list(csv.DictReader(fileIn))
+
+        assert rows
+        for row in rows:
+            assert (row['user'], row['uid'], row['version'], row['changeset'], row['timestamp']) == \
+                   ('', '0', '0', '0', '')
+
+    #Everything other than the metadata is unaffected
+    for table in ['nodes_tags', 'ways_tags', 'ways_nodes', 'relations_tags', 'relations_members']:
+        assert filecmp.cmp(str(xml_dir / (table + '.csv')), str(pbf_dir / (table + '.csv')), shallow=False)
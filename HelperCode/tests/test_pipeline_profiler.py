@@ -0,0 +1,66 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests PipelineProfiler's counting of FIPS lookups and when its clock runs.
+'''
+import time
+
+import pytest
+
+import DataCorrection_and_CSVExport as correction
+import FIPSCodeMapper as fips
+import PipelineProfiler
+
+from conftest import fixture_path
+
+
+def test_fips_misses_lower_hit_rate():
+    profiler = PipelineProfiler.PipelineProfiler(progress_interval=None)
+    FIPS_to_Name = fips.FIPS_to_Name
+
+    with profiler.instrument():
+        assert fips.FIPS_to_Name(correction.CENSUS_FILE, '54039') == 'Kanawha'
+
+        #No such county in West Virginia
+        with pytest.raises(KeyError):
+            fips.FIPS_to_Name(correction.CENSUS_FILE, '54999')
+
+    assert fips.FIPS_to_Name is FIPS_to_Name
+
+    lookups = profiler.report()['fips_lookups']
+    assert lookups['calls'] == 2
+    assert lookups['hits'] == 1
+    assert lookups['hit_rate'] < 1
+
+
+def run_profiled(profiler, output_dir):
+    '''
+    Corrects test_osm.osm with profiler, returning how long the correct_and_record call took.
+    '''
+    start = time.perf_counter()
+    correction.correct_and_record(fixture_path('test_osm.osm'), output_dir, streaming=True, profiler=profiler)
+    return time.perf_counter() - start
+
+
+def test_clock_starts_with_run(tmp_path):
+    profiler = PipelineProfiler.PipelineProfiler(progress_interval=None)
+    assert profiler.report()['total_seconds'] == 0.0
+
+    #Time between making the profiler and starting the run isn't counted
+    time.sleep(0.2)
+    run_seconds = run_profiled(profiler, str(tmp_path))
+    first = profiler.report()
+
+    assert 0 < first['total_seconds'] <= run_seconds
+    assert first['elements'] > 0
+
+    #Reusing the profiler reports the second run alone, rather than adding it to the first
+    time.sleep(0.2)
+    run_seconds = run_profiled(profiler, str(tmp_path))
+    second = profiler.report()
+
+    assert 0 < second['total_seconds'] <= run_seconds
+    assert second['elements'] == first['elements']
+    assert second['rows'] == first['rows']
@@ -0,0 +1,62 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests bounding-box queries against a database loaded from test_osm.osm, through both the R*Tree index and the B-tree
+fallback, before and after applying test_osm_change.osc.
+'''
+import sqlite3
+
+import pytest
+
+import ChangeFileIngest as ingest
+import DataCorrection_and_CSVExport as correction
+import SpatialIndex as spatial
+import TableSinks as sinks
+
+from conftest import fixture_path
+
+
+#min_lat, min_lon, max_lat, max_lon
+BOX = (41.9700, -87.6925, 41.9750, -87.6880)
+
+#None of the ways in test_osm.osm have any of their nodes in it, so none of them are in ways_bbox
+NODES_IN_BOX = [261221422, 293816175, 305896090, 757860928, 2636084635]
+
+#The diff deletes node 757860928 and creates node 9000000001 and way 9000000002 (which uses it) inside the box
+NODES_IN_BOX_AFTER_CHANGES = [261221422, 293816175, 305896090, 2636084635, 9000000001]
+WAYS_IN_BOX_AFTER_CHANGES = [9000000002]
+
+
+def query_ids(db_name):
+    results = spatial.bbox_query(*BOX, db_name=db_name)
+    return sorted(node[0] for node in results['nodes']), sorted(way[0] for way in results['ways'])
+
+
+@pytest.mark.parametrize('rtree', [True, False], ids=['rtree', 'btree'])
+def test_bbox_query(tmp_path, monkeypatch, rtree):
+    if rtree:
+        conn = sqlite3.connect(':memory:')
+        if not spatial.has_rtree(conn):
+            pytest.skip('SQLite was built without R*Tree support')
+        conn.close()
+    else:
+        monkeypatch.setattr(spatial, 'has_rtree', lambda conn: False)
+
+    db_name = str(tmp_path / 'test_osm.db')
+    correction.correct_and_record(fixture_path('test_osm.osm'), sink=sinks.SQLiteSink(db_name))
+
+    conn = sqlite3.connect(db_name)
+    try:
+        for table in spatial.SPATIAL_TABLES:
+            sql = conn.execute('SELECT sql FROM sqlite_master WHERE name = ?', (table,)).fetchone()[0]
+            assert ('USING rtree' in sql) == rtree
+    finally:
+        conn.close()
+
+    assert query_ids(db_name) == (NODES_IN_BOX, [])
+
+    ingest.apply_changes(fixture_path('test_osm_change.osc'), db_name)
+
+    assert query_ids(db_name) == (NODES_IN_BOX_AFTER_CHANGES, WAYS_IN_BOX_AFTER_CHANGES)
@@ -0,0 +1,40 @@
+'''
+Created on Oct 18, 2026
+
+@author: emigre459
+
+Tests for StreetTypeAudit.normalize_street_name and its use in data_correction.
+'''
+import pytest
+
+import DataCorrection_and_CSVExport as correction
+import StreetTypeAudit as street_audit
+
+
+@pytest.mark.parametrize('name, expected', [
+    #Mapped street types
+    ('Braddock Rd.', 'Braddock Road'),
+    ('Old Rd,', 'Old Road'),
+    ('Main St', 'Main Street'),
+    ('US 19 HWY', 'US 19 Highway'),
+    ('Turkey hill', 'Turkey Hill'),
+    #Already expected
+    ('Main Street', 'Main Street'),
+    ('Coal River Road', 'Coal River Road'),
+    #Last word isn't a street type at all
+    ('North Lincoln Cir', 'North Lincoln Cir'),
+    ('Route 60', 'Route 60'),
+    #A single word, which rpartition puts entirely in street_type (with an empty prefix)
+    ('St', 'Street'),
+    ('Broadway', 'Broadway'),
+    ('Street', 'Street'),
+    ('', ''),
+])
+def test_normalize_street_name(name, expected):
+    assert street_audit.normalize_street_name(name) == expected
+
+
+def test_data_correction_normalizes_streets():
+    rows, _ = correction.data_correction('addr:street', ' Main St ', {'id': 1, 'elem_type': 'node'}, [], None)
+
+    assert rows == [[1, 'street', 'Main Street', 'addr']]
@@ -40,4 +40,49 @@ CREATE TABLE ways_nodes (
     position INTEGER NOT NULL,
     FOREIGN KEY (id) REFERENCES ways(id),
     FOREIGN KEY (node_id) REFERENCES nodes(id)
-);
\ No newline at end of file
+);
+
+CREATE TABLE relations (
+    id INTEGER PRIMARY KEY NOT NULL,
+    user TEXT,
+    uid INTEGER,
+    version INTEGER,
+    changeset INTEGER,
+    timestamp TEXT
+);
+
+CREATE TABLE relations_tags (
+    id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    type TEXT,
+    FOREIGN KEY (id) REFERENCES relations(id)
+);
+
+CREATE TABLE relations_members (
+    id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    ref INTEGER NOT NULL,
+    role TEXT,
+    position INTEGER NOT NULL,
+    FOREIGN KEY (id) REFERENCES relations(id)
+);
+
+-- Indexes for the common access paths. Loaders should only create these once the tables are full (see
+-- TableSinks.SQLiteSink), as that's much faster than keeping them up to date on every insert.
+-- The (key, value, id) and (id, position, node_id) indexes cover their queries, so the tables themselves never need
+-- to be read for tag lookups or for rebuilding a way's geometry.
+CREATE INDEX nodes_tags_id_idx ON nodes_tags (id);
+CREATE INDEX nodes_tags_key_value_idx ON nodes_tags (key, value, id);
+
+CREATE INDEX ways_tags_id_idx ON ways_tags (id);
+CREATE INDEX ways_tags_key_value_idx ON ways_tags (key, value, id);
+
+CREATE INDEX ways_nodes_id_idx ON ways_nodes (id, position, node_id);
+CREATE INDEX ways_nodes_node_id_idx ON ways_nodes (node_id);
+
+CREATE INDEX relations_tags_id_idx ON relations_tags (id);
+CREATE INDEX relations_tags_key_value_idx ON relations_tags (key, value, id);
+
+CREATE INDEX relations_members_id_idx ON relations_members (id, position);
+CREATE INDEX relations_members_ref_idx ON relations_members (ref, type);